@@ -0,0 +1,221 @@
+"""
+Buffered activity log writer for the POS System
+Collects activity log entries in memory and writes them to the database
+in batched transactions from a background thread (group commit)
+"""
+import os
+import re
+import json
+import atexit
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from config import ACTIVITY_LOG_FLUSH_INTERVAL, ACTIVITY_LOG_SPOOL
+from file_lock import FileLock
+
+
+class ActivityLogWriter:
+    """
+    Asynchronous writer for the activity_logs table.
+
+    Entries are appended to a spool file (no fsync) and kept in memory, then
+    flushed together in one transaction every few seconds, on demand, or on
+    shutdown. If the application crashes before a flush, the spool file is
+    replayed the next time a writer starts, so no audit entry is lost.
+
+    Each process spools to its own file (<spool>.<pid>) and holds a lock on
+    it while running, so a writer only recovers spools of processes that are
+    gone (the UI and the core service can share one database).
+    """
+
+    def __init__(self, db_path, spool_path=ACTIVITY_LOG_SPOOL, flush_interval=ACTIVITY_LOG_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.spool_base = spool_path
+        self.spool_path = f"{spool_path}.{os.getpid()}"
+        self.flush_interval = flush_interval
+        self._owner_lock = FileLock(self.spool_path + ".lock")
+        self._owner_lock.acquire()
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._spool_file = None
+
+        # Recover entries left behind by a previous crash before accepting new ones
+        self.recover()
+
+        self._thread = threading.Thread(target=self._run, name="ActivityLogWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, user_id, username, action, details=""):
+        """Queue an activity log entry (returns immediately)"""
+        # activity_logs.created_at defaults to CURRENT_TIMESTAMP (UTC), so keep the same format
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        entry = (user_id, username, action, details, created_at)
+
+        with self._lock:
+            if self._stop_event.is_set():
+                # Writer already closed - write through so the entry is not lost
+                self._write_batch([entry])
+                return
+            self._buffer.append(entry)
+            try:
+                if self._spool_file is None:
+                    self._spool_file = open(self.spool_path, "a", encoding="utf-8")
+                self._spool_file.write(json.dumps(entry) + "\n")
+                self._spool_file.flush()
+            except OSError as e:
+                print(f"Activity log spool error: {e}")
+
+    def flush(self):
+        """Write all buffered entries in a single transaction"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                batch = self._buffer
+                self._buffer = []
+                # Rotate the spool so entries logged during the write go to a fresh file
+                pending_path = self._rotate_spool()
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Activity log flush failed: {e}")
+                # Put the entries back; the pending spool file stays for recovery
+                with self._lock:
+                    self._buffer[:0] = batch
+                return 0
+
+            if pending_path:
+                try:
+                    os.remove(pending_path)
+                except OSError:
+                    pass
+            return len(batch)
+
+    def _orphaned_spools(self):
+        """Spool paths of writers that are no longer running (plus our own leftovers)"""
+        folder = os.path.dirname(self.spool_base)
+        base = os.path.basename(self.spool_base)
+        # <spool>[.<pid>][.pending|.lock]
+        pattern = re.compile(re.escape(base) + r"(\.\d+)?(\.pending|\.lock)?$")
+        try:
+            names = os.listdir(folder or ".")
+        except OSError:
+            return []
+        owners = {m.group(0)[:len(m.group(0)) - len(m.group(2) or "")] for m in map(pattern.match, names) if m}
+        spools = []
+        for owner in sorted(owners):
+            path = os.path.join(folder, owner)
+            if owner in (base, os.path.basename(self.spool_path)):
+                spools.append((path, None))  # Single spool of older versions, or our own leftovers
+                continue
+            lock = FileLock(path + ".lock")
+            if lock.acquire():
+                spools.append((path, lock))
+        return spools
+
+    def recover(self):
+        """Replay spooled entries of writers that exited without flushing (after a crash)"""
+        recovered = 0
+        for path, lock in self._orphaned_spools():
+            try:
+                recovered += self._recover_spool(path)
+            finally:
+                if lock is not None:
+                    lock.release()
+        return recovered
+
+    def _recover_spool(self, spool_path):
+        entries = []
+        for path in (spool_path + ".pending", spool_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entries.append(tuple(json.loads(line)))
+                        except ValueError:
+                            pass  # Torn last line from a crash mid-write
+            except OSError as e:
+                print(f"Activity log recovery error: {e}")
+                return 0
+
+        if entries:
+            try:
+                self._write_batch(entries)
+            except Exception as e:
+                print(f"Activity log recovery failed: {e}")
+                return 0
+
+        for path in (spool_path + ".pending", spool_path):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(entries)
+
+    def close(self):
+        """Stop the background thread and flush remaining entries"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        with self._lock:
+            if self._spool_file is not None:
+                self._spool_file.close()
+                self._spool_file = None
+            if not self._buffer and os.path.exists(self.spool_path):
+                try:
+                    os.remove(self.spool_path)
+                except OSError:
+                    pass
+            if not self._buffer:
+                self._owner_lock.release()
+
+    def _run(self):
+        """Background loop: flush on a short interval until stopped"""
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _rotate_spool(self):
+        """Move the current spool aside (caller holds self._lock)"""
+        if self._spool_file is None:
+            return None
+        self._spool_file.close()
+        self._spool_file = None
+        pending_path = self.spool_path + ".pending"
+        try:
+            if os.path.exists(pending_path):
+                # A previous failed flush left entries behind; keep them together
+                with open(pending_path, "a", encoding="utf-8") as dst, open(self.spool_path, "r", encoding="utf-8") as src:
+                    dst.write(src.read())
+                os.remove(self.spool_path)
+            else:
+                os.replace(self.spool_path, pending_path)
+        except OSError as e:
+            print(f"Activity log spool rotation error: {e}")
+            return None
+        return pending_path
+
+    def _write_batch(self, entries):
+        """Insert entries with one commit on a dedicated connection"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO activity_logs (user_id, username, action, details, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, entries)
+        finally:
+            conn.close()
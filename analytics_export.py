@@ -0,0 +1,172 @@
+"""
+Columnar analytics export for the POS System
+Writes transactions, transaction items and stock adjustments to Parquet files
+partitioned by month (<export dir>/<table>/month=YYYY-MM/part-*.parquet).
+Each run only appends rows added since the last export (id watermark), and
+the live database is opened read-only.
+Requires pyarrow (pip install pyarrow).
+"""
+import os
+import json
+import sqlite3
+import pathlib
+from datetime import datetime
+from config import DATABASE_NAME, ANALYTICS_EXPORT_DIR, ANALYTICS_EXPORT_BATCH
+
+WATERMARK_FILE = "_watermarks.json"
+
+# table -> (query returning rows with id > ? ordered by id, [(column, type)])
+# The query's last column must be created_at (used for the month partition)
+EXPORT_TABLES = {
+    "transactions": ("""
+        SELECT id, transaction_number, cashier_id, total_amount, tax_amount, discount_amount,
+               payment_method, order_type, status, created_at
+        FROM transactions WHERE id > ? ORDER BY id LIMIT ?
+    """, [
+        ("id", "int64"), ("transaction_number", "string"), ("cashier_id", "int64"),
+        ("total_amount", "float64"), ("tax_amount", "float64"), ("discount_amount", "float64"),
+        ("payment_method", "string"), ("order_type", "string"), ("status", "string"),
+        ("created_at", "timestamp"),
+    ]),
+    "transaction_items": ("""
+        SELECT ti.id, ti.transaction_id, ti.product_id, ti.product_name, ti.variant_name, ti.modifiers,
+               ti.quantity, ti.unit_price, ti.subtotal, t.created_at
+        FROM transaction_items ti
+        LEFT JOIN transactions t ON ti.transaction_id = t.id
+        WHERE ti.id > ? ORDER BY ti.id LIMIT ?
+    """, [
+        ("id", "int64"), ("transaction_id", "int64"), ("product_id", "int64"),
+        ("product_name", "string"), ("variant_name", "string"), ("modifiers", "string"),
+        ("quantity", "float64"), ("unit_price", "float64"), ("subtotal", "float64"),
+        ("created_at", "timestamp"),
+    ]),
+    "stock_adjustments": ("""
+        SELECT id, product_id, adjustment_type, quantity, reason, user_id, created_at
+        FROM stock_adjustments WHERE id > ? ORDER BY id LIMIT ?
+    """, [
+        ("id", "int64"), ("product_id", "int64"), ("adjustment_type", "string"),
+        ("quantity", "float64"), ("reason", "string"), ("user_id", "int64"),
+        ("created_at", "timestamp"),
+    ]),
+}
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+class AnalyticsExporter:
+    def __init__(self, db_path=DATABASE_NAME, export_dir=ANALYTICS_EXPORT_DIR, batch_size=ANALYTICS_EXPORT_BATCH):
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.batch_size = batch_size
+
+    def _connect(self):
+        """Read-only connection, so the export can never modify the POS data"""
+        uri = pathlib.Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, timeout=10)
+
+    def _watermark_path(self):
+        return os.path.join(self.export_dir, WATERMARK_FILE)
+
+    def load_watermarks(self):
+        """Last exported id per table"""
+        try:
+            with open(self._watermark_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_watermarks(self, watermarks):
+        path = self._watermark_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(watermarks, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def export(self, tables=None):
+        """
+        Append new rows of each table to its monthly partitions.
+        Returns {table: rows exported}. Raises RuntimeError if pyarrow is missing.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Analytics export requires pyarrow (pip install pyarrow)")
+
+        types = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string(), "timestamp": pa.timestamp("us")}
+
+        os.makedirs(self.export_dir, exist_ok=True)
+        watermarks = self.load_watermarks()
+        exported = {}
+
+        conn = self._connect()
+        try:
+            for table in (tables or EXPORT_TABLES):
+                query, columns = EXPORT_TABLES[table]
+                schema = pa.schema([(name, types[kind]) for name, kind in columns])
+                timestamp_cols = [i for i, (_, kind) in enumerate(columns) if kind == "timestamp"]
+                exported[table] = 0
+
+                while True:
+                    last_id = watermarks.get(table, 0)
+                    rows = conn.execute(query, (last_id, self.batch_size)).fetchall()
+                    if not rows:
+                        break
+
+                    # Group the batch by month of created_at
+                    months = {}
+                    for row in rows:
+                        created = row[-1]
+                        month = str(created)[:7] if created else "unknown"
+                        months.setdefault(month, []).append(row)
+
+                    for month, month_rows in months.items():
+                        data = []
+                        for i, (name, kind) in enumerate(columns):
+                            values = [r[i] for r in month_rows]
+                            if i in timestamp_cols:
+                                values = [_parse_timestamp(v) for v in values]
+                            data.append(pa.array(values, type=schema.field(name).type))
+                        part_dir = os.path.join(self.export_dir, table, f"month={month}")
+                        os.makedirs(part_dir, exist_ok=True)
+                        # Named by first id: re-running after a crash overwrites instead of duplicating
+                        part_path = os.path.join(part_dir, f"part-{month_rows[0][0]:010d}.parquet")
+                        pq.write_table(pa.Table.from_arrays(data, schema=schema), part_path, compression="zstd")
+
+                    # Advance the watermark only after the batch is on disk
+                    watermarks[table] = rows[-1][0]
+                    watermarks[f"{table}_exported_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    self._save_watermarks(watermarks)
+                    exported[table] += len(rows)
+        finally:
+            conn.close()
+        return exported
+
+    def reset(self, table=None):
+        """Forget the watermark so the next export starts over (old part files are not removed)"""
+        watermarks = self.load_watermarks()
+        for name in ([table] if table else list(EXPORT_TABLES)):
+            watermarks.pop(name, None)
+            watermarks.pop(f"{name}_exported_at", None)
+        os.makedirs(self.export_dir, exist_ok=True)
+        self._save_watermarks(watermarks)
+
+
+if __name__ == "__main__":
+    exporter = AnalyticsExporter()
+    try:
+        result = exporter.export()
+    except RuntimeError as e:
+        print(e)
+    else:
+        for table, count in result.items():
+            print(f"Exported {count} new {table} rows to {os.path.join(exporter.export_dir, table)}")
@@ -0,0 +1,235 @@
+"""
+Online database backups for the POS System
+Copies the live database with the SQLite backup API in small steps from a
+background thread (checkout is never blocked), verifies the copy, stores it
+gzip-compressed and rotates old backups (hourly / daily / weekly)
+"""
+import os
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from config import (DATABASE_NAME, BACKUP_DIR, BACKUP_INTERVAL, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP,
+                    BACKUP_MAX_RESTARTS, BACKUP_KEEP_HOURLY, BACKUP_KEEP_DAILY, BACKUP_KEEP_WEEKLY)
+
+BACKUP_PREFIX = "pos_backup_"
+BACKUP_SUFFIX = ".db.gz"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+class _BackupRestarted(Exception):
+    """Stepped backup kept restarting because of concurrent writes"""
+
+
+class BackupManager:
+    def __init__(self, db_path=DATABASE_NAME, backup_dir=None, interval=BACKUP_INTERVAL,
+                 pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep=BACKUP_STEP_SLEEP, max_restarts=BACKUP_MAX_RESTARTS,
+                 keep_hourly=BACKUP_KEEP_HOURLY, keep_daily=BACKUP_KEEP_DAILY, keep_weekly=BACKUP_KEEP_WEEKLY):
+        self.db_path = db_path
+        # Next to the database (as before), whichever folder the app was started from
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), BACKUP_DIR)
+        self.interval = interval
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_source_mtime = None
+        # (state, path_or_error) of the most recent run: state is running/done/failed
+        self.last_result = None
+
+    # --- Backup ---
+    def create_backup(self):
+        """
+        Take a consistent online backup, verify it and store it compressed.
+        Returns the path of the new backup file.
+        """
+        with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+            final_path = os.path.join(self.backup_dir, f"{BACKUP_PREFIX}{timestamp}{BACKUP_SUFFIX}")
+            fd, raw_path = tempfile.mkstemp(suffix=".db", dir=self.backup_dir)
+            os.close(fd)
+            try:
+                source_mtime = self._source_mtime()
+                self._copy_database(raw_path)
+
+                ok, message = self._integrity_check(raw_path)
+                if not ok:
+                    raise RuntimeError(f"Backup failed integrity check: {message}")
+
+                part_path = final_path + ".part"
+                with open(raw_path, "rb") as src, gzip.open(part_path, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(part_path, final_path)
+                self._last_source_mtime = source_mtime
+            finally:
+                for path in (raw_path, final_path + ".part"):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            self.rotate()
+            return final_path
+
+    def _copy_database(self, dest_path):
+        """
+        Copy pages_per_step pages at a time, pausing between steps so writers can commit.
+        A write from another connection restarts a stepped backup; if that keeps
+        happening the remainder is copied in one step (a short read lock).
+        """
+        source = sqlite3.connect(self.db_path, timeout=10)
+        dest = sqlite3.connect(dest_path)
+        try:
+            state = {"remaining": None, "restarts": 0}
+
+            def progress(status, remaining, total):
+                if state["remaining"] is not None and remaining >= state["remaining"]:
+                    state["restarts"] += 1
+                    if state["restarts"] > self.max_restarts:
+                        raise _BackupRestarted()
+                state["remaining"] = remaining
+                if remaining and self.step_sleep:
+                    time.sleep(self.step_sleep)
+
+            try:
+                source.backup(dest, pages=self.pages_per_step, progress=progress)
+            except _BackupRestarted:
+                source.backup(dest)
+        finally:
+            dest.close()
+            source.close()
+
+    def _integrity_check(self, db_file):
+        conn = sqlite3.connect(db_file)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+        messages = [row[0] for row in result]
+        return messages == ["ok"], "; ".join(messages[:5])
+
+    def verify_backup(self, backup_path):
+        """Decompress a backup to a temp file and run an integrity check. Returns (ok, message)."""
+        fd, raw_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            with gzip.open(backup_path, "rb") as src, open(raw_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            return self._integrity_check(raw_path)
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            return False, str(e)
+        finally:
+            os.remove(raw_path)
+
+    def restore_backup(self, backup_path, dest_path):
+        """Write a verified backup out as a plain database file (the live database is not touched)"""
+        ok, message = self.verify_backup(backup_path)
+        if not ok:
+            raise RuntimeError(f"Backup is damaged: {message}")
+        with gzip.open(backup_path, "rb") as src, open(dest_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return dest_path
+
+    # --- Rotation ---
+    def list_backups(self):
+        """[(datetime, path)] newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        backups = []
+        for name in os.listdir(self.backup_dir):
+            if not (name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)):
+                continue
+            try:
+                taken = datetime.strptime(name[len(BACKUP_PREFIX):-len(BACKUP_SUFFIX)], TIMESTAMP_FORMAT)
+            except ValueError:
+                continue
+            backups.append((taken, os.path.join(self.backup_dir, name)))
+        backups.sort(reverse=True)
+        return backups
+
+    def rotate(self, now=None):
+        """
+        Keep the newest backup of each of the last keep_hourly hours,
+        keep_daily days and keep_weekly weeks; delete the rest.
+        Returns the number of files removed.
+        """
+        now = now or datetime.now()
+        backups = self.list_backups()
+        keep = set()
+        if backups:
+            keep.add(backups[0][1])
+
+        buckets = (
+            (lambda t: t.strftime("%Y%m%d%H"), now - timedelta(hours=self.keep_hourly)),
+            (lambda t: t.strftime("%Y%m%d"), now - timedelta(days=self.keep_daily)),
+            (lambda t: t.strftime("%G%V"), now - timedelta(weeks=self.keep_weekly)),
+        )
+        for bucket_of, cutoff in buckets:
+            seen = set()
+            for taken, path in backups:
+                bucket = bucket_of(taken)
+                if taken >= cutoff and bucket not in seen:
+                    seen.add(bucket)
+                    keep.add(path)
+
+        removed = 0
+        for taken, path in backups:
+            if path not in keep:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    print(f"Failed to remove old backup {path}: {e}")
+        return removed
+
+    # --- Background ---
+    def _source_mtime(self):
+        """Latest modification time of the database and its WAL file"""
+        mtimes = [os.path.getmtime(p) for p in (self.db_path, self.db_path + "-wal") if os.path.exists(p)]
+        return max(mtimes) if mtimes else None
+
+    def backup_in_background(self):
+        """Start a backup on a worker thread; progress is reported in last_result"""
+        self.last_result = ("running", None)
+
+        def work():
+            try:
+                self.last_result = ("done", self.create_backup())
+            except Exception as e:
+                self.last_result = ("failed", str(e))
+
+        threading.Thread(target=work, name="DatabaseBackup", daemon=True).start()
+
+    def start(self):
+        """Take automatic backups every interval seconds (skipped when nothing changed)"""
+        if not self.interval or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="DatabaseBackupScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if self._source_mtime() != self._last_source_mtime:
+                    self.create_backup()
+            except Exception as e:
+                print(f"Automatic backup error: {e}")
+
+
+if __name__ == "__main__":
+    manager = BackupManager()
+    path = manager.create_backup()
+    ok, message = manager.verify_backup(path)
+    print(f"Backup written to {path} (integrity: {message})")
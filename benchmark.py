@@ -0,0 +1,461 @@
+"""
+Data-volume benchmark for the POS System
+Fills a temporary database with synthetic products, ingredients, global
+modifiers, users and transactions, then times the Database read methods,
+checkout and the DetailedReportGenerator reports at each data size.
+Results are written as JSON and markdown so queries that slow down as the
+sales history grows are easy to spot.
+
+    python benchmark.py --scales 10000,100000,1000000 --repeats 3 --out benchmark_results
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+from database import Database
+from views.admin.report_generator import DetailedReportGenerator
+
+DEFAULT_SCALES = (10000, 100000, 1000000)
+INSERT_BATCH = 10000
+
+CATEGORIES = ["Pizza", "Drinks", "Pasta", "Sides", "Desserts", "Combo"]
+PAYMENT_METHODS = ["Cash", "Cash", "Cash", "GCash", "Card"]
+ORDER_TYPES = ["Dine In", "Take Out", "Delivery"]
+
+# A method whose median time grows faster than this factor per 10x data is flagged
+GROWTH_WARNING = 5.0
+
+# Database getters not worth timing: they start background subsystems, return
+# an object that is already there, or hand out a cached in-memory index
+SKIPPED_METHODS = {
+    "get_email_outbox", "get_report_scheduler", "get_backup_manager",
+    "get_system_optimizer", "get_receipt_store", "get_register_sync", "get_query_profiler",
+    "get_product_index", "get_sellability_index",
+}
+
+
+class DataGenerator:
+    """
+    Writes synthetic POS data straight into the tables with executemany.
+    Transactions are added incrementally: generate_transactions(n) tops the
+    database up to n transactions, so the scales can be run one after another.
+    """
+    def __init__(self, db, seed=42, days=365):
+        self.db = db
+        self.random = random.Random(seed)
+        self.days = days
+        self.product_ids = []
+        self.products = {}
+        self.modifiers = []
+        self.cashier_ids = []
+
+    def generate_catalog(self, products=200, ingredients=60, modifiers=20, users=10):
+        cursor = self.db.cursor
+        rnd = self.random
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO categories (name) VALUES (?)", [(c,) for c in CATEGORIES + ["Ingredients"]]
+        )
+
+        ingredient_ids = []
+        for i in range(ingredients):
+            cursor.execute(
+                """INSERT INTO products (name, category, price, stock, barcode, unit, cost, use_stock_tracking)
+                   VALUES (?, 'Ingredients', 0, ?, ?, 'g', ?, 1)""",
+                (f"Ingredient {i + 1}", rnd.randint(0, 5000), f"ING{i + 1:06d}", round(rnd.uniform(0.5, 20), 2))
+            )
+            ingredient_ids.append(cursor.lastrowid)
+
+        for i in range(products):
+            price = round(rnd.uniform(30, 600), 2)
+            tracked = 1 if rnd.random() < 0.3 else 0
+            cursor.execute(
+                """INSERT INTO products (name, category, price, stock, barcode, unit, cost, markup, use_stock_tracking)
+                   VALUES (?, ?, ?, ?, ?, 'pcs', ?, 30, ?)""",
+                (f"Product {i + 1}", rnd.choice(CATEGORIES), price, rnd.randint(0, 300),
+                 f"PRD{i + 1:06d}", round(price * 0.6, 2), tracked)
+            )
+            product_id = cursor.lastrowid
+            self.product_ids.append(product_id)
+            self.products[product_id] = (f"Product {i + 1}", price)
+            if ingredient_ids:
+                cursor.executemany(
+                    "INSERT INTO product_ingredients (product_id, ingredient_id, quantity) VALUES (?, ?, ?)",
+                    [(product_id, ing, rnd.randint(1, 5)) for ing in
+                     rnd.sample(ingredient_ids, min(len(ingredient_ids), rnd.randint(1, 4)))]
+                )
+            if rnd.random() < 0.2:
+                cursor.execute(
+                    "INSERT INTO product_prices (product_id, name, cost, markup, price) VALUES (?, 'Large', ?, 30, ?)",
+                    (product_id, round(price * 0.7, 2), round(price * 1.3, 2))
+                )
+
+        for i in range(modifiers):
+            linked = rnd.choice(ingredient_ids) if ingredient_ids and rnd.random() < 0.7 else None
+            name = f"Extra {i + 1}"
+            price = round(rnd.uniform(5, 60), 2)
+            cursor.execute(
+                "INSERT INTO global_modifiers (name, price, linked_product_id, deduct_quantity) VALUES (?, ?, ?, ?)",
+                (name, price, linked, rnd.randint(1, 3))
+            )
+            self.modifiers.append((name, price, linked))
+
+        password = self.db.hash_password("benchmark")
+        for i in range(users):
+            cursor.execute(
+                "INSERT INTO users (username, password, role, full_name) VALUES (?, ?, 'cashier', ?)",
+                (f"bench_cashier{i + 1}", password, f"Bench Cashier {i + 1}")
+            )
+            self.cashier_ids.append(cursor.lastrowid)
+
+        self.db.conn.commit()
+
+    def transaction_count(self):
+        return self.db.cursor.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def generate_transactions(self, target):
+        """Add transactions (1-4 items each) until the database holds target of them"""
+        cursor = self.db.cursor
+        rnd = self.random
+        next_id = (cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]) + 1
+        remaining = target - self.transaction_count()
+        now = datetime.now()
+        span = self.days * 86400
+
+        while remaining > 0:
+            count = min(remaining, INSERT_BATCH)
+            transactions, items = [], []
+            for txn_id in range(next_id, next_id + count):
+                created = now - timedelta(seconds=rnd.randint(0, span))
+                total = 0.0
+                for _ in range(rnd.randint(1, 4)):
+                    product_id = rnd.choice(self.product_ids)
+                    name, price = self.products[product_id]
+                    qty = rnd.randint(1, 3)
+                    modifiers = ""
+                    if self.modifiers and rnd.random() < 0.25:
+                        mod_name, mod_price, _ = rnd.choice(self.modifiers)
+                        modifiers = mod_name
+                        price += mod_price
+                    subtotal = round(price * qty, 2)
+                    total += subtotal
+                    items.append((txn_id, product_id, name, qty, price, subtotal, modifiers, ""))
+                transactions.append((
+                    txn_id, f"BENCH{txn_id:010d}", rnd.choice(self.cashier_ids), round(total, 2),
+                    round(total * 0.12, 2), 0, rnd.choice(PAYMENT_METHODS), rnd.choice(ORDER_TYPES),
+                    created.strftime("%Y-%m-%d %H:%M:%S")
+                ))
+            cursor.executemany(
+                """INSERT INTO transactions (id, transaction_number, cashier_id, total_amount, tax_amount,
+                                             discount_amount, payment_method, order_type, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", transactions
+            )
+            cursor.executemany(
+                """INSERT INTO transaction_items (transaction_id, product_id, product_name, quantity,
+                                                  unit_price, subtotal, modifiers, variant_name)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", items
+            )
+            self.db.conn.commit()
+            next_id += count
+            remaining -= count
+
+
+class BenchmarkRunner:
+    def __init__(self, scales=DEFAULT_SCALES, repeats=3, work_dir=None, products=200, ingredients=60,
+                 modifiers=20, users=10, days=365, seed=42):
+        self.scales = sorted(scales)
+        self.repeats = repeats
+        self.work_dir = work_dir
+        self.catalog = dict(products=products, ingredients=ingredients, modifiers=modifiers, users=users)
+        self.days = days
+        self.seed = seed
+
+    def _time(self, func):
+        """Run func repeats times; returns (median ms, max ms, rows returned)"""
+        times = []
+        result = None
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            result = func()
+            times.append((time.perf_counter() - start) * 1000)
+        rows = len(result) if isinstance(result, (list, tuple)) else None
+        return round(statistics.median(times), 3), round(max(times), 3), rows
+
+    def read_calls(self, db, gen):
+        """name -> zero-argument call for every Database read method"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        month_start = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        product_id = gen.product_ids[len(gen.product_ids) // 2]
+        cashier_id = gen.cashier_ids[0]
+        txn_id = db.cursor.execute("SELECT MAX(id) FROM transactions").fetchone()[0] or 1
+        return {
+            "get_all_products": lambda: db.get_all_products(),
+            "search_products": lambda: db.search_products("Product 1"),
+            "get_product_by_id": lambda: db.get_product_by_id(product_id),
+            "get_products_by_supplier": lambda: db.get_products_by_supplier(1),
+            "get_transactions": lambda: db.get_transactions(100),
+            "get_transactions_by_cashier": lambda: db.get_transactions_by_cashier(cashier_id, 100),
+            "get_transaction_by_id": lambda: db.get_transaction_by_id(txn_id),
+            "get_transaction_items": lambda: db.get_transaction_items(txn_id),
+            "get_transaction_details": lambda: db.get_transaction_details(txn_id),
+            "get_transactions_by_date": lambda: db.get_transactions_by_date(month_start, today, 100),
+            "get_sales_summary (30 days)": lambda: db.get_sales_summary(month_start, today),
+            "get_sales_summary (all)": lambda: db.get_sales_summary(),
+            "get_product_type_sales_count": lambda: db.get_product_type_sales_count(month_start, today),
+            "get_all_users": lambda: db.get_all_users(),
+            "get_user_by_username": lambda: db.get_user_by_username("admin"),
+            "get_cashier_users": lambda: db.get_cashier_users(),
+            "get_user_by_id": lambda: db.get_user_by_id(cashier_id),
+            "get_all_categories": lambda: db.get_all_categories(),
+            "get_category_by_name": lambda: db.get_category_by_name("Pizza"),
+            "get_activity_logs": lambda: db.get_activity_logs(100),
+            "get_receipt_settings": lambda: db.get_receipt_settings(),
+            "get_variants": lambda: db.get_variants(product_id),
+            "get_modifiers": lambda: db.get_modifiers(product_id),
+            "get_product_ingredients": lambda: db.get_product_ingredients(product_id),
+            "get_product_overall_cost": lambda: db.get_product_overall_cost(product_id),
+            "get_product_prices": lambda: db.get_product_prices(product_id),
+            "get_all_global_modifiers": lambda: db.get_all_global_modifiers(),
+            "get_all_suppliers": lambda: db.get_all_suppliers(),
+            "get_stock_adjustments": lambda: db.get_stock_adjustments(),
+            "get_low_stock_products": lambda: db.get_low_stock_products(),
+            "get_out_of_stock_products": lambda: db.get_out_of_stock_products(),
+            "get_inventory_value": lambda: db.get_inventory_value(),
+            "get_inventory_snapshot": lambda: db.get_inventory_snapshot(),
+            "get_products_by_category_with_stock": lambda: db.get_products_by_category_with_stock(),
+            "get_top_selling_products": lambda: db.get_top_selling_products(month_start, today),
+            "get_payment_method_breakdown": lambda: db.get_payment_method_breakdown(month_start, today),
+            "get_order_type_breakdown": lambda: db.get_order_type_breakdown(month_start, today),
+            "get_hourly_sales": lambda: db.get_hourly_sales(month_start, today),
+            "get_category_performance": lambda: db.get_category_performance(month_start, today),
+            "get_email_settings": lambda: db.get_email_settings(),
+            "get_data_version": lambda: db.get_data_version(),
+            "get_change_counters": lambda: db.get_change_counters(("transactions", "products")),
+            "get_modifier_catalog (reload)": lambda: db.get_modifier_catalog(reload=True),
+        }
+
+    def untimed_methods(self, calls):
+        """Public get_*/search_* methods of Database that have no entry in read_calls"""
+        covered = {name.split(" ")[0] for name in calls}
+        return sorted(
+            name for name in dir(Database)
+            if name.startswith(("get_", "search_")) and callable(getattr(Database, name))
+            and name not in covered and name not in SKIPPED_METHODS
+        )
+
+    def _checkout(self, db, gen):
+        """One create_transaction with a typical cart (2 products, one with a linked modifier)"""
+        items = []
+        for product_id in gen.product_ids[:2]:
+            name, price = gen.products[product_id]
+            item = {"product_id": product_id, "name": name, "quantity": 2, "price": price, "subtotal": price * 2}
+            linked = [m for m in gen.modifiers if m[2]]
+            if linked and not items:
+                mod_name, mod_price, linked_id = linked[0]
+                item["selected_modifiers"] = [{"name": mod_name, "price": mod_price, "quantity": 1,
+                                               "linked_product_id": linked_id, "deduct_qty": 1}]
+            items.append(item)
+        total = sum(i["subtotal"] for i in items)
+        return db.create_transaction(gen.cashier_ids[0], items, total, round(total * 0.12, 2), 0, "Cash")
+
+    def _time_checkout(self, db, gen):
+        # Transaction numbers are per-second; rename each one so repeats don't collide
+        times = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            number = self._checkout(db, gen)
+            times.append((time.perf_counter() - start) * 1000)
+            db.cursor.execute(
+                "UPDATE transactions SET transaction_number = 'BENCHCHK' || id WHERE transaction_number = ?", (number,)
+            )
+            db.conn.commit()
+        return round(statistics.median(times), 3), round(max(times), 3), None
+
+    def _report_calls(self, db, report_dir):
+        def run(method, *args):
+            def call():
+                # Fresh generator each time so the timing includes the aggregation, not the cache
+                path = getattr(DetailedReportGenerator(db, output_dir=report_dir), method)(*args)
+                if path and os.path.exists(path):
+                    os.remove(path)
+                return None
+            return call
+        return {
+            "summary report (today, html)": run("generate_summary_report", "today", "html"),
+            "summary report (month, html)": run("generate_summary_report", "month", "html"),
+            "product report (month, csv)": run("generate_product_report", "month", "csv"),
+            "product report (all, html)": run("generate_product_report", "all", "html"),
+            "line item export (all, csv)": run("generate_line_item_export", "all", "csv"),
+        }
+
+    def run(self, progress=print):
+        """Benchmark every scale; returns the results dict"""
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix="pos_benchmark_")
+        os.makedirs(work_dir, exist_ok=True)
+        db_path = os.path.join(work_dir, "benchmark.db")
+        report_dir = os.path.join(work_dir, "reports")
+        os.makedirs(report_dir, exist_ok=True)
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+        results = {
+            "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "repeats": self.repeats,
+            "catalog": self.catalog,
+            "days": self.days,
+            "scales": [],
+        }
+        db = Database(db_path)
+        try:
+            gen = DataGenerator(db, seed=self.seed, days=self.days)
+            gen.generate_catalog(**self.catalog)
+            calls = self.read_calls(db, gen)
+            results["untimed_methods"] = self.untimed_methods(calls)
+
+            for scale in self.scales:
+                start = time.perf_counter()
+                gen.generate_transactions(scale)
+                db.cursor.execute("ANALYZE")
+                db.conn.commit()
+                items = db.cursor.execute("SELECT COUNT(*) FROM transaction_items").fetchone()[0]
+                progress(f"{scale:,} transactions ({items:,} items) generated in {time.perf_counter() - start:.1f}s")
+
+                timings = {}
+                calls = self.read_calls(db, gen)
+                groups = (("read", calls), ("report", self._report_calls(db, report_dir)))
+                for group, group_calls in groups:
+                    for name, call in group_calls.items():
+                        try:
+                            median, worst, rows = self._time(call)
+                            timings[name] = {"group": group, "median_ms": median, "max_ms": worst, "rows": rows}
+                        except Exception as e:
+                            timings[name] = {"group": group, "error": str(e)}
+                try:
+                    median, worst, _ = self._time_checkout(db, gen)
+                    timings["checkout (create_transaction)"] = {"group": "write", "median_ms": median, "max_ms": worst}
+                except Exception as e:
+                    timings["checkout (create_transaction)"] = {"group": "write", "error": str(e)}
+
+                results["scales"].append({
+                    "transactions": scale,
+                    "items": items,
+                    "db_size_mb": round(os.path.getsize(db_path) / (1024 * 1024), 1),
+                    "timings": timings,
+                })
+                slowest = max((t.get("median_ms", 0), n) for n, t in timings.items())
+                progress(f"  timed {len(timings)} operations, slowest: {slowest[1]} ({slowest[0]:.1f} ms)")
+        finally:
+            db.close()
+            if not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        results["growth"] = self.growth(results["scales"])
+        return results
+
+    def growth(self, scales):
+        """
+        Per operation: median time at the largest scale / at the smallest,
+        normalised to a 10x data increase. Flagged when above GROWTH_WARNING.
+        """
+        if len(scales) < 2:
+            return {}
+        first, last = scales[0], scales[-1]
+        decades = max(len(str(last["transactions"])) - len(str(first["transactions"])), 1)
+        growth = {}
+        for name, timing in last["timings"].items():
+            before = first["timings"].get(name, {}).get("median_ms")
+            after = timing.get("median_ms")
+            if before is None or after is None:
+                continue
+            # Sub-0.05 ms timings are noise; compare against that floor
+            factor = (after / max(before, 0.05)) ** (1.0 / decades)
+            growth[name] = {"per_10x": round(factor, 2), "flagged": factor > GROWTH_WARNING}
+        return growth
+
+
+def to_markdown(results):
+    lines = [f"# POS benchmark ({results['started']})", ""]
+    lines.append(f"Catalog: {results['catalog']}, sales spread over {results['days']} days, "
+                 f"{results['repeats']} repeats (median / max ms).")
+    lines.append("")
+    scales = results["scales"]
+    header = "| Operation | " + " | ".join(f"{s['transactions']:,} txns" for s in scales) + \
+        (" | Growth per 10x |" if results.get("growth") else " |")
+    lines.append(header)
+    lines.append("|" + "---|" * (header.count("|") - 1))
+    names = list(scales[0]["timings"]) if scales else []
+    for name in names:
+        cells = []
+        for scale in scales:
+            timing = scale["timings"].get(name, {})
+            if "error" in timing:
+                cells.append("error")
+            else:
+                cells.append(f"{timing.get('median_ms', 0):.2f} / {timing.get('max_ms', 0):.2f}")
+        row = f"| {name} | " + " | ".join(cells)
+        growth = results.get("growth", {}).get(name)
+        if results.get("growth"):
+            row += " | " + (f"{growth['per_10x']}x{' **slow**' if growth['flagged'] else ''}" if growth else "-")
+        lines.append(row + " |")
+    lines.append("")
+    for scale in scales:
+        lines.append(f"- {scale['transactions']:,} transactions / {scale['items']:,} items: "
+                     f"{scale['db_size_mb']} MB database")
+    errors = [(s["transactions"], n, t["error"]) for s in scales for n, t in s["timings"].items() if "error" in t]
+    if errors:
+        lines.append("")
+        lines.append("## Errors")
+        lines.extend(f"- {n} at {scale:,}: {e}" for scale, n, e in errors)
+    if results.get("untimed_methods"):
+        lines.append("")
+        lines.append("Read methods without a benchmark entry: " + ", ".join(results["untimed_methods"]))
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="POS data-volume benchmark")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="comma separated transaction counts")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--ingredients", type=int, default=60)
+    parser.add_argument("--modifiers", type=int, default=20)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365, help="days of sales history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", help="keep the generated database here instead of a temp dir")
+    parser.add_argument("--out", default="benchmark_results", help="output directory for JSON/markdown")
+    args = parser.parse_args(argv)
+
+    runner = BenchmarkRunner(
+        scales=[int(s) for s in args.scales.split(",") if s.strip()], repeats=args.repeats,
+        work_dir=args.work_dir, products=args.products, ingredients=args.ingredients,
+        modifiers=args.modifiers, users=args.users, days=args.days, seed=args.seed
+    )
+    results = runner.run()
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(args.out, f"benchmark_{stamp}.json")
+    md_path = os.path.join(args.out, f"benchmark_{stamp}.md")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write(to_markdown(results))
+    print(f"Results written to {json_path} and {md_path}")
+
+    flagged = [name for name, g in results.get("growth", {}).items() if g["flagged"]]
+    if flagged:
+        print("Operations that grow with data size: " + ", ".join(flagged))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
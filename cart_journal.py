@@ -0,0 +1,88 @@
+"""
+Crash-safe journal of cart changes for the POS System
+Every change to an open order is appended as one JSON line and flushed to
+the OS right away, so it survives an application crash; fsync (power loss)
+is batched on a background thread. The journal only holds the changes made
+since the last open-orders snapshot and is emptied whenever a snapshot is
+written (order parked, switched or checked out), so it stays small.
+"""
+import os
+import json
+import threading
+from config import CART_JOURNAL_SYNC_INTERVAL
+
+
+class CartJournal:
+    def __init__(self, path, sync_interval=CART_JOURNAL_SYNC_INTERVAL):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="CartJournal", daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        """Write one change (flushed, fsync comes with the next batch)"""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line)
+                self._file.flush()
+                self._dirty = True
+            except OSError as e:
+                print(f"Cart journal write error: {e}")
+
+    def read(self):
+        """Records in the journal; a torn last line (crash mid-write) is ignored"""
+        records = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Cart journal read error: {e}")
+        return records
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and self._file is not None:
+                try:
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    print(f"Cart journal sync error: {e}")
+                self._dirty = False
+
+    def reset(self):
+        """Empty the journal (everything in it is covered by a snapshot)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._dirty = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Cart journal reset error: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.sync_interval):
+            self.sync()
+
+    def close(self):
+        self._stop_event.set()
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -41,6 +41,81 @@ COLORS = {
 # Database Settings
 DATABASE_NAME = "pos_database.db"
 
+# Activity Log Settings
+ACTIVITY_LOG_FLUSH_INTERVAL = 2.0  # Seconds between batched activity log writes
+ACTIVITY_LOG_SPOOL = "activity_log.spool"  # Crash-recovery file for unflushed entries
+ACTIVITY_LOG_RETENTION_DAYS = 90  # Logs older than this are moved to archive files
+ACTIVITY_LOG_ARCHIVE_DIR = "archives"  # Monthly compressed activity log archives (folder next to the database)
+ACTIVITY_LOG_ARCHIVE_CHUNK = 500  # Rows archived/deleted per transaction
+
+# Email Outbox Settings
+EMAIL_OUTBOX_POLL_INTERVAL = 15  # Seconds between checks for queued/retry emails
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Give up (mark failed) after this many attempts
+EMAIL_OUTBOX_RETRY_DELAY = 30  # First retry delay in seconds, doubled on each attempt
+EMAIL_OUTBOX_SEND_LEASE = 300  # Seconds a worker may hold a claimed email before another may retry it
+
+# Report Settings
+REPORTS_DIR = "reports"  # Generated reports are filed here (end-of-day reports in dated subfolders)
+END_OF_DAY_REPORT_ENABLED = True
+END_OF_DAY_REPORT_TIME = "22:00"  # Local time (HH:MM) the day is closed and its summary generated
+END_OF_DAY_CHECK_INTERVAL = 60  # Seconds between close-time checks
+END_OF_DAY_JOB_TIMEOUT = 600  # Seconds before a stuck report worker is terminated
+ANALYTICS_EXPORT_DIR = "analytics"  # Monthly Parquet partitions for back-office analysis
+ANALYTICS_EXPORT_BATCH = 5000  # Rows read and written per export step
+
+# Backup Settings
+BACKUP_DIR = "backups"  # Folder next to the database file
+BACKUP_INTERVAL = 3600  # Seconds between automatic online backups (0 disables them)
+BACKUP_PAGES_PER_STEP = 256  # Database pages copied per backup step
+BACKUP_STEP_SLEEP = 0.005  # Pause between steps so checkout writes are not held up
+BACKUP_MAX_RESTARTS = 3  # Concurrent writes restart a stepped copy; after this many, copy in one step
+BACKUP_KEEP_HOURLY = 24  # Rotation: newest backup per hour for this many hours,
+BACKUP_KEEP_DAILY = 7  # per day for this many days,
+BACKUP_KEEP_WEEKLY = 8  # and per week for this many weeks
+
+# Receipt File Settings
+RECEIPTS_DIR = "receipts"  # Saved receipt images, in one folder per day
+RECEIPTS_KEEP_DAYS = 7  # Receipt images older than this are removed by cleanup
+RECEIPTS_MAX_MB = 500  # Oldest receipt images are evicted once the folder exceeds this
+
+# Database Maintenance Settings
+MAINTENANCE_SLICE_SECONDS = 2.0  # Time box for one background maintenance slice
+MAINTENANCE_IDLE_SECONDS = 120  # No database writes for this long counts as idle
+MAINTENANCE_INTERVAL = 900  # Minimum seconds between background slices
+MAINTENANCE_VACUUM_PAGES = 100  # Pages released per incremental_vacuum step
+MAINTENANCE_ANALYSIS_LIMIT = 400  # Rows sampled per index by ANALYZE / PRAGMA optimize
+
+# Open Orders Settings
+PARKED_ORDERS_FILE = "parked_orders.json"  # Snapshot of the open (parked) carts, restored on login
+CART_JOURNAL_FILE = "cart_journal.log"  # Cart changes since the last snapshot, replayed after a crash
+CART_JOURNAL_SYNC_INTERVAL = 0.5  # Seconds between batched fsyncs of the journal
+
+# Multi-Register Sync Settings (off unless a sync folder is set; POS_SYNC_DIR also sets it)
+SYNC_DIR = ""  # Shared folder (e.g. a network share) where registers exchange change batches
+SYNC_INTERVAL = 30  # Seconds between background exchanges
+SYNC_BATCH_SIZE = 500  # Changes per batch file
+REGISTER_NAME = ""  # Name shown to the other registers (defaults to the computer name)
+
+# Core Service Settings (python pos_service.py runs the headless core; the UI uses it when it is running)
+POS_SERVICE_ENABLED = True  # Look for a running core service after login
+POS_SERVICE_HOST = "127.0.0.1"  # Local connections only
+POS_SERVICE_PORT = 8765
+POS_SERVICE_TOKEN = ""  # Shared secret clients send in the X-POS-Token header (empty: use the token file)
+POS_SERVICE_TOKEN_FILE = "pos_service.token"  # Generated on first start next to the database, owner-only
+POS_SERVICE_TIMEOUT = 30  # Seconds a client waits for a call
+
+# Startup Settings
+STARTUP_PREWARM = True  # Import the pages of the logged-in role in the background after login
+STARTUP_REPORT_FILE = "startup_times.log"  # One line of startup phase timings per launch
+
+# Query Profiling Settings (opt-in; POS_QUERY_PROFILE=1 also enables it)
+QUERY_PROFILING_ENABLED = False
+SLOW_QUERY_THRESHOLD_MS = 50  # Statements slower than this are written to the slow-query log
+SLOW_QUERY_LOG = "slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024  # Log is rotated at this size
+SLOW_QUERY_LOG_BACKUPS = 3  # Rotated slow-query logs kept
+QUERY_PROFILE_REPORT = "query_profile.txt"  # Hot statements + query plans, written on close
+
 # Default Admin Credentials (Change after first login)
 DEFAULT_ADMIN = {
     "username": "admin",
@@ -1,20 +1,66 @@
 """
 Database management for the POS application
 """
+import os
 import sqlite3
 import hashlib
 from datetime import datetime
-from config import DATABASE_NAME, DEFAULT_ADMIN, DEFAULT_CASHIER
+from config import DATABASE_NAME, DEFAULT_ADMIN, DEFAULT_CASHIER, ACTIVITY_LOG_SPOOL, QUERY_PROFILING_ENABLED, SYNC_DIR
+from activity_logger import ActivityLogWriter
+from product_index import ProductNameIndex
+from sellability_index import SellabilityIndex
+from modifier_catalog import ModifierCatalog
+# Background subsystems (outbox, scheduler, backups, sync, ...) are imported by their get_* getters
+
+# Change counters kept by triggers (see create_change_counters): {counter: [(table, events)]}.
+# New sales are not counted (caches of a period check its transactions instead), so only
+# edits of earlier sales bump the transactions counter.
+CHANGE_COUNTERS = {
+    "transactions": [("transactions", ("UPDATE", "DELETE")), ("transaction_items", ("UPDATE", "DELETE"))],
+    "products": [("products", ("INSERT", "UPDATE", "DELETE"))],
+    "product_ingredients": [("product_ingredients", ("INSERT", "UPDATE", "DELETE"))],
+    "global_modifiers": [("global_modifiers", ("INSERT", "UPDATE", "DELETE"))],
+    "product_prices": [("product_prices", ("INSERT", "UPDATE", "DELETE"))],
+}
+# Change counters of the tables each in-memory index reads
+SELLABILITY_INPUTS = ("products", "product_ingredients")
+MODIFIER_CATALOG_INPUTS = ("global_modifiers", "product_prices")
 
 
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect(DATABASE_NAME, check_same_thread=False)
+    def __init__(self, db_path=DATABASE_NAME):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        self._profiler = None
+        if QUERY_PROFILING_ENABLED or os.environ.get("POS_QUERY_PROFILE") == "1":
+            self.enable_query_profiling()
+        # Lets maintenance reclaim space in small steps (applies to new database files;
+        # existing ones are converted once from Settings > Other)
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
         self.create_tables()
         self.create_email_tables()
+        self.create_change_counters()
         self.initialize_default_data()
-    
+        # Multi-register sync: changes are recorded in a change log only when a sync folder is set
+        self.sync_dir = SYNC_DIR or os.environ.get("POS_SYNC_DIR", "")
+        if self.sync_dir:
+            from register_sync import create_sync_tables
+            create_sync_tables(self.cursor, db_path)
+            self.conn.commit()
+        # Activity logs are buffered and written in batches by a background thread
+        # (spool file lives next to the database file)
+        self.activity_log = ActivityLogWriter(db_path, os.path.join(os.path.dirname(db_path), ACTIVITY_LOG_SPOOL))
+        self._product_index = None
+        self._sellability_index = None
+        self._modifier_catalog = None
+        self._email_outbox = None
+        self._report_scheduler = None
+        self._backup_manager = None
+        self._optimizer = None
+        self._receipt_store = None
+        self._register_sync = None
+
     def create_tables(self):
         """Create all necessary tables"""
         # Users table
@@ -321,6 +367,7 @@ class Database:
             VALUES (?, ?, ?, ?, ?)
         """, (product_id, name, cost, markup, price))
         self.conn.commit()
+        self._modifier_catalog = None
     
     def get_product_prices(self, product_id):
         """Get all alternative prices for a product"""
@@ -331,6 +378,7 @@ class Database:
         """Delete an alternative price"""
         self.cursor.execute("DELETE FROM product_prices WHERE id = ?", (price_id,))
         self.conn.commit()
+        self._modifier_catalog = None
 
     # --- Global Modifiers ---
     def add_global_modifier(self, name, price, linked_product_id=None, deduct_quantity=1):
@@ -340,6 +388,7 @@ class Database:
             VALUES (?, ?, ?, ?)
         """, (name, price, linked_product_id, deduct_quantity))
         self.conn.commit()
+        self._modifier_catalog = None
     
     def get_all_global_modifiers(self):
         """Get all global modifiers with linked product info"""
@@ -359,11 +408,27 @@ class Database:
             WHERE id=?
         """, (name, price, linked_product_id, deduct_quantity, mod_id))
         self.conn.commit()
+        self._modifier_catalog = None
 
     def delete_global_modifier(self, mod_id):
         """Delete a global modifier"""
         self.cursor.execute("DELETE FROM global_modifiers WHERE id=?", (mod_id,))
         self.conn.commit()
+        self._modifier_catalog = None
+
+    def get_modifier_catalog(self, reload=False):
+        """
+        Get the global modifier / alternative price catalog used by the cashier.
+        Rebuilt when modifiers or prices change (also edits made by another connection
+        or process) and dropped by the modifier and price edit methods.
+        """
+        version = self.get_change_counters(MODIFIER_CATALOG_INPUTS)
+        catalog = self._modifier_catalog
+        if reload or catalog is None or catalog.version != version:
+            global_modifiers = self.get_all_global_modifiers()
+            self.cursor.execute("SELECT * FROM product_prices ORDER BY id")
+            self._modifier_catalog = ModifierCatalog(global_modifiers, self.cursor.fetchall(), version)
+        return self._modifier_catalog
     
     def hash_password(self, password):
         """Hash password using SHA-256"""
@@ -386,11 +451,108 @@ class Database:
         self.cursor.execute("INSERT OR IGNORE INTO email_settings (id) VALUES (1)")
         self.conn.commit()
     
+    def create_change_counters(self):
+        """Per-table change counters, bumped by triggers whichever connection makes the change"""
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_counters (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for name, sources in CHANGE_COUNTERS.items():
+            self.cursor.execute("INSERT OR IGNORE INTO change_counters (name) VALUES (?)", (name,))
+            for table, events in sources:
+                for event in events:
+                    self.cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS count_{table}_{event.lower()} AFTER {event} ON {table}
+                        BEGIN
+                            UPDATE change_counters SET version = version + 1 WHERE name = '{name}';
+                        END
+                    ''')
+        self.conn.commit()
+
+    def get_change_counters(self, names):
+        """Current values of the given change counters, in order"""
+        placeholders = ", ".join("?" for _ in names)
+        self.cursor.execute(f"SELECT name, version FROM change_counters WHERE name IN ({placeholders})", tuple(names))
+        versions = dict(self.cursor.fetchall())
+        return tuple(versions.get(name, 0) for name in names)
+
     def get_email_settings(self):
         """Get email configuration"""
         self.cursor.execute("SELECT * FROM email_settings WHERE id = 1")
         return self.cursor.fetchone()
         
+    def get_email_outbox(self, start=True):
+        """
+        Get the email outbox. Its delivery worker is started unless start=False
+        (when a core service delivers the queued emails instead).
+        """
+        if self._email_outbox is None:
+            from email_outbox import EmailOutbox
+            self._email_outbox = EmailOutbox(self.db_path)
+        if start:
+            self._email_outbox.start()
+        return self._email_outbox
+
+    def get_report_scheduler(self):
+        """Get the end-of-day report scheduler (call start() to run it on a timer)"""
+        if self._report_scheduler is None:
+            from report_scheduler import EndOfDayScheduler
+            self._report_scheduler = EndOfDayScheduler(self.db_path, outbox=self.get_email_outbox(start=False))
+        return self._report_scheduler
+
+    def get_backup_manager(self):
+        """Get the online backup manager (call start() for automatic backups)"""
+        if self._backup_manager is None:
+            from backup_manager import BackupManager
+            self._backup_manager = BackupManager(self.db_path)
+        return self._backup_manager
+
+    def get_system_optimizer(self):
+        """Get the database maintenance optimizer (call start() for idle-time maintenance)"""
+        if self._optimizer is None:
+            from system_optimizer import SystemOptimizer
+            self._optimizer = SystemOptimizer(self.db_path)
+        return self._optimizer
+
+    def get_receipt_store(self):
+        """Get the receipt file store (date folders + index used by cleanup)"""
+        if self._receipt_store is None:
+            from receipt_store import ReceiptStore
+            self._receipt_store = ReceiptStore(self.db_path)
+        return self._receipt_store
+
+    def get_register_sync(self):
+        """Get the multi-register sync (call start() to exchange changes on a timer)"""
+        if self._register_sync is None:
+            from register_sync import RegisterSync
+            self._register_sync = RegisterSync(self.db_path, self.sync_dir)
+        return self._register_sync
+
+    def enable_query_profiling(self, threshold_ms=None):
+        """Time every statement run through self.cursor (see query_profiler.py)"""
+        if self._profiler is None:
+            from query_profiler import QueryProfiler, profiling_cursor
+            self._profiler = QueryProfiler(self.db_path)
+            self.cursor = profiling_cursor(self.conn, self._profiler)
+        if threshold_ms is not None:
+            self._profiler.threshold_ms = threshold_ms
+        return self._profiler
+
+    def disable_query_profiling(self):
+        """Back to a plain cursor; returns the profiler so its data can still be reported"""
+        profiler = self._profiler
+        if profiler is not None:
+            self.cursor = self.conn.cursor()
+            self._profiler = None
+            profiler.close()
+        return profiler
+
+    def get_query_profiler(self):
+        """The active QueryProfiler, or None when profiling is off"""
+        return self._profiler
+
     def save_email_settings(self, sender, password, receiver, server="smtp.gmail.com", port=587):
         """Save email configuration"""
         self.cursor.execute("""
@@ -508,11 +670,14 @@ class Database:
     
     def update_product_stock(self, product_id, quantity_change):
         """Update product stock"""
+        index = self._current_sellability_index()
         self.cursor.execute(
             "UPDATE products SET stock = stock + ? WHERE id = ?",
             (quantity_change, product_id)
         )
+        self._sync_stock([(product_id, quantity_change)])
         self.conn.commit()
+        self._apply_stock_changes(index, [(product_id, quantity_change, None, None)])
     
     def add_product(self, name, category, price, stock, barcode, description, unit="pcs", cost=0, markup=0, supplier_id=None, use_stock_tracking=1, is_available=1):
         """Add new product"""
@@ -521,26 +686,34 @@ class Database:
                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (name, category, price, stock, barcode, description, unit, cost, markup, supplier_id, use_stock_tracking, is_available)
         )
+        product_id = self.cursor.lastrowid
+        self._sync_product(product_id)
+        self._sync_stock([(product_id, stock)])
         self.conn.commit()
-        return self.cursor.lastrowid
+        return product_id
     
     def update_product(self, product_id, name, category, price, stock, barcode, description, unit="pcs", cost=0, markup=0, supplier_id=None, use_stock_tracking=1, is_available=1):
         """Update product"""
+        self._sync_stock_set([(product_id, stock)])
         self.cursor.execute(
             """UPDATE products SET name=?, category=?, price=?, stock=?, barcode=?, description=?, unit=?, cost=?, markup=?, supplier_id=?, use_stock_tracking=?, is_available=? 
                WHERE id=?""",
             (name, category, price, stock, barcode, description, unit, cost, markup, supplier_id, use_stock_tracking, is_available, product_id)
         )
+        self._sync_product(product_id)
         self.conn.commit()
     
     def delete_product(self, product_id):
         """Delete product"""
+        self._sync_product(product_id, deleted=True)
         self.cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
         self.conn.commit()
     
     def create_transaction(self, cashier_id, items, total_amount, tax_amount, discount_amount, payment_method):
         """Create a new transaction"""
         transaction_number = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        index = self._current_sellability_index()
+        stock_changes = []
         
         self.cursor.execute(
             """INSERT INTO transactions 
@@ -570,6 +743,7 @@ class Database:
                             deduct_factor = m.get('deduct_qty', 1)
                             total_deduct = m_qty * item['quantity'] * deduct_factor
                             self.update_product_stock(m['linked_product_id'], -total_deduct)
+                            stock_changes.append((m['linked_product_id'], -total_deduct, None, None))
                     else:
                         # Fallback for old simple list format implies plain name?
                         pass
@@ -585,8 +759,12 @@ class Database:
             )
             # Update main product stock
             self.update_product_stock(item['product_id'], -item['quantity'])
+            stock_changes.append((item['product_id'], -item['quantity'], None, None))
         
+        # (stock changes were recorded for sync by update_product_stock)
+        self._sync_sale(transaction_id)
         self.conn.commit()
+        self._apply_stock_changes(index, stock_changes)
         return transaction_number
     
     def get_transactions(self, limit=100):
@@ -809,15 +987,13 @@ class Database:
     
     # Activity Logs
     def log_activity(self, user_id, username, action, details=""):
-        """Log user activity"""
-        self.cursor.execute("""
-            INSERT INTO activity_logs (user_id, username, action, details)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, username, action, details))
-        self.conn.commit()
-    
+        """Log user activity (buffered, written in batches)"""
+        self.activity_log.log(user_id, username, action, details)
+
     def get_activity_logs(self, limit=100):
         """Get recent activity logs"""
+        # Write pending entries first so the reader sees them
+        self.activity_log.flush()
         self.cursor.execute("""
             SELECT * FROM activity_logs 
             ORDER BY created_at DESC 
@@ -848,11 +1024,25 @@ class Database:
     def add_transaction_with_payment(self, transaction_number, cashier_id, items, 
                                     payment_method, payment_amount, change_amount,
                                     tax_rate=0, discount_amount=0, order_type="Regular", customer_name=None):
-        """Add transaction with payment details"""
+        """
+        Add transaction with payment details. Safe to retry: if this sale (same number,
+        cashier and total) was already saved, its id is returned and nothing is added.
+        """
         # Calculate totals
         subtotal = sum(item['price'] * item['quantity'] for item in items)
         tax_amount = subtotal * (tax_rate / 100)
         total = subtotal + tax_amount - discount_amount
+
+        self.cursor.execute("""
+            SELECT id FROM transactions
+            WHERE transaction_number = ? AND cashier_id = ? AND ABS(total_amount - ?) < 0.005
+        """, (transaction_number, cashier_id, total))
+        saved = self.cursor.fetchone()
+        if saved:
+            return saved[0]
+
+        index = self._current_sellability_index()
+        stock_changes = []
         
         # Insert transaction
         self.cursor.execute("""
@@ -884,6 +1074,7 @@ class Database:
             self.cursor.execute("""
                 UPDATE products SET stock = MAX(0, stock - ?) WHERE id = ?
             """, (item['quantity'], item['id']))
+            stock_changes.append((item['id'], -item['quantity'], None, 0))
 
             # Update VARIANT stock (Critical Fix)
             if variant_id:
@@ -903,6 +1094,7 @@ class Database:
                 self.cursor.execute("""
                     UPDATE products SET stock = MAX(0, stock - ?) WHERE id = ?
                 """, (total_deduct, ingredient_id))
+                stock_changes.append((ingredient_id, -total_deduct, None, 0))
 
             # Deduct MODIFIER linked stock (Add-ons)
             if item.get('selected_modifiers'):
@@ -931,10 +1123,14 @@ class Database:
                                 self.cursor.execute("""
                                     UPDATE products SET stock = MAX(0, stock - ?) WHERE id = ?
                                 """, (total_mod_deduct, linked_pid))
+                                stock_changes.append((linked_pid, -total_mod_deduct, None, 0))
                             except Exception:
                                 pass # Prevent crash on bad data
         
+        self._sync_stock([(pid, delta) for pid, delta, value, floor in stock_changes])
+        self._sync_sale(transaction_id)
         self.conn.commit()
+        self._apply_stock_changes(index, stock_changes)
         return transaction_id
     
     def get_transaction_details(self, transaction_id):
@@ -1083,11 +1279,13 @@ class Database:
     # Stock Adjustments
     def add_stock_adjustment(self, product_id, adjustment_type, quantity, reason, user_id):
         """Add stock adjustment"""
+        index = self._current_sellability_index()
         self.cursor.execute("""
             INSERT INTO stock_adjustments 
             (product_id, adjustment_type, quantity, reason, user_id)
             VALUES (?, ?, ?, ?, ?)
         """, (product_id, adjustment_type, quantity, reason, user_id))
+        adjustment_id = self.cursor.lastrowid
         
         # Update product stock
         if adjustment_type == "add":
@@ -1099,13 +1297,77 @@ class Database:
                 UPDATE products SET stock = stock - ? WHERE id = ?
             """, (quantity, product_id))
         elif adjustment_type == "set":
+            self._sync_stock_set([(product_id, quantity)])
             self.cursor.execute("""
                 UPDATE products SET stock = ? WHERE id = ?
             """, (quantity, product_id))
+        if adjustment_type in ("add", "remove"):
+            self._sync_stock([(product_id, quantity if adjustment_type == "add" else -quantity)])
         
         self.conn.commit()
-        return self.cursor.lastrowid
-    
+        if adjustment_type in ("add", "remove", "set"):
+            change = {"add": (quantity, None), "remove": (-quantity, None), "set": (0, quantity)}[adjustment_type]
+            self._apply_stock_changes(index, [(product_id, change[0], change[1], None)])
+        return adjustment_id
+
+    def apply_stock_adjustments(self, adjustments, user_id, username=None, note=""):
+        """
+        Apply a batch of stock adjustments in a single transaction.
+        adjustments: list of dicts with product_id, adjustment_type ('add', 'remove' or 'set'),
+                     quantity and optional reason
+        Writes one stock_adjustments row per item and one activity log summary.
+        Returns the number of adjustments applied.
+        """
+        rows = []
+        deltas = []
+        sets = []
+        for adj in adjustments:
+            adj_type = adj['adjustment_type']
+            qty = adj['quantity']
+            if adj_type == "add":
+                deltas.append((qty, adj['product_id']))
+            elif adj_type == "remove":
+                deltas.append((-qty, adj['product_id']))
+            elif adj_type == "set":
+                sets.append((qty, adj['product_id']))
+            else:
+                raise ValueError(f"Unknown adjustment type: {adj_type}")
+            rows.append((adj['product_id'], adj_type, qty, adj.get('reason'), user_id))
+
+        if not rows:
+            return 0
+
+        index = self._current_sellability_index()
+        try:
+            self.cursor.executemany("""
+                INSERT INTO stock_adjustments
+                (product_id, adjustment_type, quantity, reason, user_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            self._sync_stock_set([(pid, value) for value, pid in sets], [(pid, delta) for delta, pid in deltas])
+            if deltas:
+                self.cursor.executemany("UPDATE products SET stock = stock + ? WHERE id = ?", deltas)
+            if sets:
+                self.cursor.executemany("UPDATE products SET stock = ? WHERE id = ?", sets)
+            self.conn.commit()
+        except:
+            self.conn.rollback()
+            raise
+        self._apply_stock_changes(
+            index,
+            [(pid, delta, None, None) for delta, pid in deltas] + [(pid, 0, value, None) for value, pid in sets]
+        )
+
+        if username is not None:
+            counts = {}
+            for row in rows:
+                counts[row[1]] = counts.get(row[1], 0) + 1
+            summary = ", ".join(f"{count} {adj_type}" for adj_type, count in counts.items())
+            details = f"Batch stock adjustment: {len(rows)} items ({summary}) {note}".strip()
+            self.log_activity(user_id, username, "Batch Stock Adjustment", details)
+
+        return len(rows)
+
     def get_stock_adjustments(self, product_id=None, limit=100):
         """Get stock adjustments"""
         if product_id:
@@ -1161,7 +1423,133 @@ class Database:
         """)
         result = self.cursor.fetchone()
         return result[0] if result[0] else 0
-    
+
+    def get_inventory_snapshot(self, threshold=10):
+        """
+        Get inventory overview data in a single scan of products (only tracked items;
+        untracked products and ones without a stock count are never low or out of stock).
+        Returns dict with tracked_count, low_stock, out_of_stock and inventory_value,
+        using the same ordering as get_low_stock_products/get_out_of_stock_products.
+        """
+        self.cursor.execute("""
+            SELECT id, name, category, price, stock, barcode, description, created_at,
+                   unit, cost, markup, supplier_id, use_stock_tracking, is_available
+            FROM products
+            WHERE use_stock_tracking = 1
+            ORDER BY name
+        """)
+        products = self.cursor.fetchall()
+
+        low_stock = []
+        out_of_stock = []
+        inventory_value = 0
+        for p in products:
+            stock = p[4]
+            if stock is None:
+                # No stock count: neither low nor out of stock (as in the SQL filters)
+                continue
+            inventory_value += (p[3] or 0) * stock
+            if stock <= threshold:
+                low_stock.append(p)
+            if stock <= 0:
+                out_of_stock.append(p)
+        low_stock.sort(key=lambda p: p[4])
+
+        return {
+            'tracked_count': len(products),
+            'low_stock': low_stock,
+            'out_of_stock': out_of_stock,
+            'inventory_value': inventory_value
+        }
+
+    def get_data_version(self):
+        """
+        Get a value that changes whenever the database is modified,
+        by this connection (total_changes) or another one (data_version).
+        Used to invalidate cached views of the data.
+        """
+        self.cursor.execute("PRAGMA data_version")
+        return (self.conn.total_changes, self.cursor.fetchone()[0])
+
+    def get_product_index(self):
+        """Get the shared in-memory product search index (rebuilt when data changes)"""
+        version = self.get_data_version()
+        if self._product_index is None or self._product_index.version != version:
+            self._product_index = ProductNameIndex(self.get_all_products(), version)
+        return self._product_index
+
+    def get_sellability_index(self):
+        """
+        Get the shared sellability index (max sellable units per product from its
+        stock and ingredient recipe). Rebuilt when data changes; stock changes made
+        through this Database are applied to it in place instead.
+        """
+        version = self.get_change_counters(SELLABILITY_INPUTS)
+        if self._sellability_index is None or self._sellability_index.version != version:
+            self.cursor.execute("SELECT id, name, stock, use_stock_tracking, is_available FROM products")
+            products = self.cursor.fetchall()
+            self.cursor.execute("SELECT product_id, ingredient_id, quantity FROM product_ingredients")
+            recipes = self.cursor.fetchall()
+            self._sellability_index = SellabilityIndex(products, recipes, version)
+        return self._sellability_index
+
+    def _current_sellability_index(self):
+        """The sellability index if it matches the data right now (taken before a stock change)"""
+        index = self._sellability_index
+        if index is not None and index.version == self.get_change_counters(SELLABILITY_INPUTS):
+            return index
+        return None
+
+    def _apply_stock_changes(self, index, changes):
+        """
+        Mirror committed stock changes [(product_id, delta, value, floor)] in an index
+        that was current before them, then mark it current again
+        """
+        if index is None or index is not self._sellability_index:
+            return
+        for product_id, delta, value, floor in changes:
+            index.apply_delta(product_id, delta, value, floor)
+        index.version = self.get_change_counters(SELLABILITY_INPUTS)
+
+    # Multi-register sync: changes are logged in the same transaction as the change itself
+    def _sync_stock(self, deltas):
+        """Record stock deltas [(product_id, delta)] for the other registers"""
+        if self.sync_dir:
+            from register_sync import log_stock
+            log_stock(self.cursor, deltas)
+
+    def _sync_stock_set(self, counts, deltas=()):
+        """
+        Record absolute stock counts [(product_id, new_stock)] and deltas [(product_id, delta)]
+        of one batch as a single delta per product, from the stock before the batch to the
+        final stock (call before the updates; counts are applied after the deltas, so a
+        product's last count wins)
+        """
+        if not self.sync_dir or not (counts or deltas):
+            return
+        final = dict(counts)
+        totals = {}
+        for pid, delta in deltas:
+            if pid not in final:
+                totals[pid] = totals.get(pid, 0) + delta
+        if final:
+            ids = list(final)
+            self.cursor.execute(f"SELECT id, stock FROM products WHERE id IN ({','.join('?' * len(ids))})", ids)
+            for pid, stock in self.cursor.fetchall():
+                totals[pid] = final[pid] - (stock or 0)
+        from register_sync import log_stock
+        log_stock(self.cursor, list(totals.items()))
+
+    def _sync_product(self, product_id, deleted=False):
+        if self.sync_dir:
+            from register_sync import log_product
+            log_product(self.cursor, product_id, deleted)
+
+    def _sync_sale(self, transaction_id):
+        if self.sync_dir:
+            from register_sync import log_sale
+            log_sale(self.cursor, transaction_id)
+
     def get_products_by_category_with_stock(self):
         """Get products grouped by category with stock info"""
         self.cursor.execute("""
@@ -1323,4 +1711,21 @@ class Database:
 
     def close(self):
         """Close database connection"""
+        self.activity_log.close()
+        if self._report_scheduler is not None:
+            self._report_scheduler.stop()
+        if self._backup_manager is not None:
+            self._backup_manager.stop()
+        if self._optimizer is not None:
+            self._optimizer.stop()
+        if self._email_outbox is not None:
+            self._email_outbox.stop()
+        if self._register_sync is not None:
+            self._register_sync.stop()
+        if self._profiler is not None:
+            try:
+                self._profiler.write_report()
+            except Exception as e:
+                print(f"Failed to write query profile: {e}")
+            self._profiler.close()
         self.conn.close()
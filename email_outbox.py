@@ -0,0 +1,255 @@
+"""
+Outbound email queue for the POS System
+Messages are stored in an SQLite-backed outbox and delivered by a background
+worker that reuses one SMTP session per batch and retries with backoff
+"""
+import sqlite3
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from config import (DATABASE_NAME, EMAIL_OUTBOX_POLL_INTERVAL, EMAIL_OUTBOX_MAX_ATTEMPTS, EMAIL_OUTBOX_RETRY_DELAY,
+                    EMAIL_OUTBOX_SEND_LEASE)
+from email_sender import build_message, open_smtp_session
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"  # Claimed by a worker (possibly in another process)
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class EmailOutbox:
+    def __init__(self, db_path=DATABASE_NAME, poll_interval=EMAIL_OUTBOX_POLL_INTERVAL,
+                 max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS, retry_delay=EMAIL_OUTBOX_RETRY_DELAY,
+                 send_lease=EMAIL_OUTBOX_SEND_LEASE):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.send_lease = send_lease
+
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subject TEXT NOT NULL,
+                body TEXT,
+                attachment_path TEXT,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at TEXT,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _now(self):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # --- Producer side (UI thread) ---
+    def enqueue(self, subject, body, attachment_path=None):
+        """Queue a message for delivery and return its outbox id"""
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute("""
+                    INSERT INTO email_outbox (subject, body, attachment_path, next_attempt_at)
+                    VALUES (?, ?, ?, ?)
+                """, (subject, body, attachment_path, self._now()))
+                message_id = cur.lastrowid
+        finally:
+            conn.close()
+        self._wake.set()
+        return message_id
+
+    def wake(self):
+        """Check for due messages now (e.g. after another process queued one)"""
+        self._wake.set()
+
+    def get_status(self, message_id):
+        """Get (status, attempts, last_error) for a queued message"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT status, attempts, last_error FROM email_outbox WHERE id = ?", (message_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def get_recent(self, limit=50):
+        """Get recent outbox entries for display"""
+        conn = self._connect()
+        try:
+            return conn.execute("""
+                SELECT id, subject, status, attempts, last_error, created_at, sent_at
+                FROM email_outbox ORDER BY id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        finally:
+            conn.close()
+
+    def retry_failed(self):
+        """Put failed messages back in the queue"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    UPDATE email_outbox SET status = 'pending', attempts = 0, next_attempt_at = ?
+                    WHERE status = 'failed'
+                """, (self._now(),))
+        finally:
+            conn.close()
+        self._wake.set()
+
+    # --- Worker ---
+    def start(self):
+        """Start the background delivery worker"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.release_stale_claims()
+        self._thread = threading.Thread(target=self._run, name="EmailOutbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the worker (pending messages stay queued for next start)"""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def release_stale_claims(self):
+        """Put messages back in the queue whose worker died while sending them (lease expired)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    UPDATE email_outbox SET status = 'pending'
+                    WHERE status = 'sending' AND next_attempt_at <= ?
+                """, (self._now(),))
+        finally:
+            conn.close()
+
+    def _claim(self, conn, rows):
+        """Mark due messages as being sent by this worker; returns the rows it got"""
+        lease = (datetime.now() + timedelta(seconds=self.send_lease)).strftime("%Y-%m-%d %H:%M:%S")
+        claimed = []
+        with conn:
+            for row in rows:
+                cur = conn.execute("""
+                    UPDATE email_outbox SET status = 'sending', next_attempt_at = ?
+                    WHERE id = ? AND status = 'pending'
+                """, (lease, row[0]))
+                if cur.rowcount == 1:
+                    claimed.append(row)
+        return claimed
+
+    def _release(self, conn, rows):
+        """Return claimed but unsent messages to the queue"""
+        with conn:
+            for row in rows:
+                conn.execute("""
+                    UPDATE email_outbox SET status = 'pending', next_attempt_at = ?
+                    WHERE id = ? AND status = 'sending'
+                """, (self._now(), row[0]))
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            # Clear before draining so a message queued meanwhile wakes us again
+            self._wake.clear()
+            try:
+                self.process_pending()
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+            self._wake.wait(self.poll_interval)
+
+    def process_pending(self):
+        """Deliver all due messages over one SMTP session. Returns number sent."""
+        conn = self._connect()
+        try:
+            due = conn.execute("""
+                SELECT id, subject, body, attachment_path, attempts FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id
+            """, (self._now(),)).fetchall()
+            # Another worker (e.g. the core service) may be draining the same outbox
+            due = self._claim(conn, due)
+            if not due:
+                return 0
+
+            settings = conn.execute("SELECT * FROM email_settings WHERE id = 1").fetchone()
+            if not settings or not settings[1] or not settings[3]:
+                for row in due:
+                    self._record_failure(conn, row, "Incomplete email configuration. Please check Settings > Email.")
+                return 0
+
+            try:
+                server = open_smtp_session(settings)
+            except smtplib.SMTPAuthenticationError:
+                for row in due:
+                    self._record_failure(conn, row, "Authentication failed. Check your email and App Password.")
+                return 0
+            except Exception as e:
+                for row in due:
+                    self._record_failure(conn, row, f"Connection failed: {e}")
+                return 0
+
+            sent = 0
+            remaining = list(due)
+            try:
+                while remaining:
+                    if self._stop_event.is_set():
+                        break
+                    row = remaining.pop(0)
+                    msg, error = build_message(settings, row[3], row[1], row[2] or "")
+                    if error:
+                        # Not retryable (bad attachment/config)
+                        self._record_failure(conn, row, error, permanent=True)
+                        continue
+                    try:
+                        server.send_message(msg)
+                    except smtplib.SMTPServerDisconnected as e:
+                        self._record_failure(conn, row, f"Sending failed: {e}")
+                        break
+                    except Exception as e:
+                        self._record_failure(conn, row, f"Sending failed: {e}")
+                        continue
+                    with conn:
+                        conn.execute("""
+                            UPDATE email_outbox
+                            SET status = 'sent', attempts = attempts + 1, last_error = NULL, sent_at = ?
+                            WHERE id = ?
+                        """, (self._now(), row[0]))
+                    sent += 1
+            finally:
+                self._release(conn, remaining)
+                try:
+                    server.quit()
+                except Exception:
+                    server.close()
+            return sent
+        finally:
+            conn.close()
+
+    def _record_failure(self, conn, row, error, permanent=False):
+        """Schedule a retry with exponential backoff, or mark failed"""
+        attempts = row[4] + 1
+        if permanent or attempts >= self.max_attempts:
+            status, next_at = STATUS_FAILED, None
+        else:
+            delay = self.retry_delay * (2 ** (attempts - 1))
+            status = STATUS_PENDING
+            next_at = (datetime.now() + timedelta(seconds=delay)).strftime("%Y-%m-%d %H:%M:%S")
+        with conn:
+            conn.execute("""
+                UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            """, (status, attempts, next_at, error, row[0]))
@@ -4,31 +4,30 @@ from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 import os
 
-def send_email_with_attachment(settings, file_path, subject, body):
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def build_message(settings, file_path, subject, body):
     """
-    Send email with attachment using SMTP
-    settings: tuple from database (id, sender, password, receiver, server, port, updated_at)
+    Build the email message for the configured sender/receiver
+    Returns (message, error) - message is None when error is set
     """
     if not settings:
-        return False, "No email settings configured."
-    
-    # Unpack settings
+        return None, "No email settings configured."
+
     sender_email = settings[1]
-    sender_password = settings[2]
     receiver_email = settings[3]
-    smtp_server = settings[4]
-    smtp_port = settings[5]
-    
-    if not sender_email or not sender_password or not receiver_email:
-        return False, "Incomplete email configuration. Please check Settings > Email."
-        
+
+    if not sender_email or not receiver_email:
+        return None, "Incomplete email configuration. Please check Settings > Email."
+
     msg = MIMEMultipart()
     msg['From'] = sender_email
     msg['To'] = receiver_email
     msg['Subject'] = subject
-    
+
     msg.attach(MIMEText(body, 'plain'))
-    
+
     # Attachment
     if file_path and os.path.exists(file_path):
         try:
@@ -37,13 +36,61 @@ def send_email_with_attachment(settings, file_path, subject, body):
             part['Content-Disposition'] = f'attachment; filename="{os.path.basename(file_path)}"'
             msg.attach(part)
         except Exception as e:
-            return False, f"Error attaching file: {str(e)}"
-    
+            return None, f"Error attaching file: {str(e)}"
+
+    return msg, None
+
+
+def open_smtp_session(settings, timeout=30):
+    """
+    Open an authenticated SMTP session that can send several messages
+    settings: tuple from database (id, sender, password, receiver, server, port, updated_at)
+    """
+    sender_email = settings[1]
+    sender_password = settings[2]
+    smtp_server = settings[4]
+    smtp_port = settings[5]
+
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=timeout)
+    try:
+        server.ehlo()
+        if server.has_extn("starttls"):
+            server.starttls()
+            # Capabilities (AUTH in particular) are only advertised again after the TLS handshake
+            server.ehlo()
+        elif smtp_server not in LOCAL_HOSTS:
+            raise smtplib.SMTPException("Server does not support STARTTLS.")
+        if sender_password:
+            if server.has_extn("auth"):
+                server.login(sender_email, sender_password)
+            elif smtp_server not in LOCAL_HOSTS:  # Local test servers may not offer AUTH
+                # Sending anyway would fail later with a relay error, or go out unauthenticated
+                raise smtplib.SMTPNotSupportedError(
+                    f"{smtp_server} does not offer login (AUTH). Check the server and port in Settings > Email.")
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def send_email_with_attachment(settings, file_path, subject, body):
+    """
+    Send email with attachment using SMTP
+    settings: tuple from database (id, sender, password, receiver, server, port, updated_at)
+    """
+    if not settings:
+        return False, "No email settings configured."
+
+    if not settings[1] or not settings[2] or not settings[3]:
+        return False, "Incomplete email configuration. Please check Settings > Email."
+
+    msg, error = build_message(settings, file_path, subject, body)
+    if error:
+        return False, error
+
     # Send
     try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
+        server = open_smtp_session(settings)
         server.send_message(msg)
         server.quit()
         return True, "Email sent successfully!"
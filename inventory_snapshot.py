@@ -0,0 +1,38 @@
+"""
+Inventory snapshot service for the POS System
+Keeps a cached inventory overview (counts, low/out-of-stock lists, valuation)
+that is recomputed only when the database has changed
+"""
+from datetime import datetime
+
+
+class InventorySnapshot:
+    """Inventory overview computed from one scan of the products table"""
+
+    def __init__(self, data, threshold, version):
+        self.tracked_count = data['tracked_count']
+        self.low_stock = data['low_stock']
+        self.out_of_stock = data['out_of_stock']
+        self.inventory_value = data['inventory_value']
+        self.threshold = threshold
+        self.version = version
+        self.created_at = datetime.now()
+
+
+class InventorySnapshotService:
+    def __init__(self, database, threshold=10):
+        self.database = database
+        self.threshold = threshold
+        self._snapshot = None
+
+    def get(self):
+        """Return the current snapshot, recomputing it if the data changed"""
+        version = self.database.get_data_version()
+        if self._snapshot is None or self._snapshot.version != version:
+            data = self.database.get_inventory_snapshot(self.threshold)
+            self._snapshot = InventorySnapshot(data, self.threshold, version)
+        return self._snapshot
+
+    def invalidate(self):
+        """Force the next get() to recompute"""
+        self._snapshot = None
@@ -0,0 +1,190 @@
+"""
+Activity log retention for the POS System
+Moves old activity logs out of the live database into compressed monthly
+archive files (JSON Lines, gzip) and keeps an index of the archives
+"""
+import os
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from config import DATABASE_NAME, ACTIVITY_LOG_RETENTION_DAYS, ACTIVITY_LOG_ARCHIVE_DIR, ACTIVITY_LOG_ARCHIVE_CHUNK
+
+LOG_COLUMNS = ("id", "user_id", "username", "action", "details", "ip_address", "created_at")
+
+
+class ActivityLogArchiver:
+    def __init__(self, db_path=DATABASE_NAME, archive_dir=None,
+                 retention_days=ACTIVITY_LOG_RETENTION_DAYS, chunk_size=ACTIVITY_LOG_ARCHIVE_CHUNK):
+        self.db_path = db_path
+        # Archives live next to the database (like the activity log spool), wherever the app was started from
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)),
+                                                       ACTIVITY_LOG_ARCHIVE_DIR)
+        self.retention_days = retention_days
+        self.chunk_size = chunk_size
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log_archives (
+                month TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                entry_count INTEGER DEFAULT 0,
+                first_at TEXT,
+                last_at TEXT,
+                max_log_id INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        return conn
+
+    def archive_path(self, month):
+        """Path of the archive file for a month (YYYY-MM)"""
+        return os.path.join(self.archive_dir, f"activity_logs_{month}.jsonl.gz")
+
+    def archive_old_logs(self, retention_days=None):
+        """
+        Archive and delete activity logs older than the retention window.
+
+        Rows are processed in id order, chunk by chunk: each chunk is appended
+        to its monthly archive file first, then recorded in the archive index
+        and deleted from the live table in one short transaction, so the
+        database is never locked for long. Rows written to a file by a run
+        that stopped before that transaction are written again by the next
+        run; read_archive skips such repeats.
+
+        Returns:
+            dict: {'archived': int, 'months': list of str, 'cutoff': str}
+        """
+        days = self.retention_days if retention_days is None else retention_days
+        # activity_logs.created_at is stored as UTC (CURRENT_TIMESTAMP)
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn = self._connect()
+        archived = 0
+        months = set()
+        try:
+            # Highest id already written per month; protects against duplicates
+            # if a previous run stopped between writing a file and deleting rows
+            archived_upto = {
+                row[0]: row[1] for row in
+                conn.execute("SELECT month, max_log_id FROM activity_log_archives")
+            }
+
+            while True:
+                rows = conn.execute(f"""
+                    SELECT {", ".join(LOG_COLUMNS)} FROM activity_logs
+                    WHERE created_at < ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (cutoff, self.chunk_size)).fetchall()
+                if not rows:
+                    break
+
+                by_month = {}
+                for row in rows:
+                    month = (row[6] or "")[:7] or "unknown"
+                    by_month.setdefault(month, []).append(row)
+
+                written = {}
+                for month, month_rows in by_month.items():
+                    new_rows = [r for r in month_rows if r[0] > archived_upto.get(month, 0)]
+                    if new_rows:
+                        self._append_to_archive(month, new_rows)
+                        written[month] = new_rows
+                    months.add(month)
+
+                # Index and delete together: the index never counts rows still in the live table
+                with conn:
+                    for month, new_rows in written.items():
+                        self._update_index(conn, month, new_rows)
+                    conn.executemany("DELETE FROM activity_logs WHERE id = ?", [(r[0],) for r in rows])
+                for month, new_rows in written.items():
+                    archived_upto[month] = new_rows[-1][0]
+                    archived += len(new_rows)
+        finally:
+            conn.close()
+
+        return {"archived": archived, "months": sorted(months), "cutoff": cutoff}
+
+    def _append_to_archive(self, month, rows):
+        """Append rows to the month's gzip file (each call adds a gzip member)"""
+        path = self.archive_path(month)
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(LOG_COLUMNS, row))) + "\n")
+        # Make sure the archive is on disk before the live rows are deleted
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+
+    def _update_index(self, conn, month, rows):
+        """Record the archived rows in the archive index (inside the caller's transaction)"""
+        conn.execute("""
+            INSERT INTO activity_log_archives (month, file_path, entry_count, first_at, last_at, max_log_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(month) DO UPDATE SET
+                entry_count = entry_count + excluded.entry_count,
+                first_at = MIN(first_at, excluded.first_at),
+                last_at = MAX(last_at, excluded.last_at),
+                max_log_id = excluded.max_log_id,
+                updated_at = CURRENT_TIMESTAMP
+        """, (month, self.archive_path(month), len(rows),
+              min(r[6] or "" for r in rows), max(r[6] or "" for r in rows), rows[-1][0]))
+
+    def list_archives(self):
+        """Get the archive index: (month, file_path, entry_count, first_at, last_at)"""
+        conn = self._connect()
+        try:
+            return conn.execute("""
+                SELECT month, file_path, entry_count, first_at, last_at
+                FROM activity_log_archives
+                ORDER BY month DESC
+            """).fetchall()
+        finally:
+            conn.close()
+
+    def read_archive(self, month):
+        """Yield archived log entries (dicts) for a month"""
+        path = self.archive_path(month)
+        if not os.path.exists(path):
+            return
+        last_id = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    # Entries are appended in id order; a lower id is a repeat from an interrupted run
+                    if (entry.get("id") or 0) <= last_id:
+                        continue
+                    last_id = entry["id"]
+                    yield entry
+
+    def search_archives(self, start_date=None, end_date=None, action=None, username=None):
+        """
+        Yield archived entries matching the filters.
+        Only archive files whose month overlaps the date range are opened.
+        Dates are 'YYYY-MM-DD' strings.
+        """
+        for month, _, _, _, _ in self.list_archives():
+            if start_date and month < start_date[:7]:
+                continue
+            if end_date and month > end_date[:7]:
+                continue
+            for entry in self.read_archive(month):
+                day = (entry.get("created_at") or "")[:10]
+                if start_date and day < start_date:
+                    continue
+                if end_date and day > end_date:
+                    continue
+                if action and entry.get("action") != action:
+                    continue
+                if username and entry.get("username") != username:
+                    continue
+                yield entry
+
+
+if __name__ == "__main__":
+    archiver = ActivityLogArchiver()
+    result = archiver.archive_old_logs()
+    print(f"Archived {result['archived']} activity logs older than {result['cutoff']}")
@@ -1,13 +1,22 @@
 """
 Main application entry point
 """
+import multiprocessing
+import importlib
+import threading
+from startup_timer import StartupTimer
+
+startup_timer = StartupTimer()
+
 import customtkinter as ctk
-from config import APP_NAME, WINDOW_SIZE, MIN_WINDOW_SIZE, LOGIN_WINDOW_SIZE, THEME_MODE, COLOR_THEME, COLORS
-from database import Database
+from config import (APP_NAME, WINDOW_SIZE, MIN_WINDOW_SIZE, LOGIN_WINDOW_SIZE, THEME_MODE, COLOR_THEME, COLORS,
+                    END_OF_DAY_REPORT_ENABLED, STARTUP_PREWARM, STARTUP_REPORT_FILE)
 from views.login_view import LoginView
-from views.cashier_view import CashierView
-from views.admin_view import AdminView
 from tkinter import messagebox
+# The database and the cashier/admin views are imported when first needed
+# (start_backend / show_*_view) so the login window appears sooner
+
+startup_timer.mark("imports")
 
 
 class POSApplication(ctk.CTk):
@@ -31,10 +40,10 @@ class POSApplication(ctk.CTk):
         # Set window background to gray (not black)
         self.configure(fg_color=COLORS["dark"])
         
-        # Initialize database
-        self.database = Database()
+        # Database is opened by start_backend once the login window is up
+        self.database = None
         
-        # Current user #initialize datbaese
+        # Current user
         self.current_user = None
         
         # Current view
@@ -45,6 +54,64 @@ class POSApplication(ctk.CTk):
         
         # Handle window close
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        startup_timer.mark("login window")
+        # Give Tk a moment to draw the login window before the database work
+        self.after(50, self.start_backend)
+    
+    def start_backend(self):
+        """Open the database and start the background services (runs once)"""
+        if self.database is not None:
+            return
+        startup_timer.mark("first paint")
+        from database import Database
+        self.database = Database()
+        startup_timer.mark("database")
+        # Looking for a core service is a network call, so it stays off the UI thread
+        threading.Thread(target=self.start_services, name="BackendStart", daemon=True).start()
+    
+    def start_services(self):
+        """Start the background services, unless a core service already runs them (worker thread)"""
+        # A running core service (pos_service.py) already runs the background services
+        from pos_service import get_core_client
+        if get_core_client() is not None:
+            print("Using the POS core service for checkout, reports, email, backups, maintenance, sync and printing")
+            startup_timer.mark("core service")
+            startup_timer.report(STARTUP_REPORT_FILE)
+            return
+        
+        # Queued emails (report emails, end-of-day reports) are delivered on a background thread
+        self.database.get_email_outbox()
+        
+        # End-of-day summary reports are generated in a worker process
+        if END_OF_DAY_REPORT_ENABLED:
+            self.database.get_report_scheduler().start()
+        
+        # Hourly online backups on a background thread
+        self.database.get_backup_manager().start()
+        
+        # Small maintenance slices while the register is idle
+        self.database.get_system_optimizer().start()
+        
+        # Exchange sales and stock changes with the other registers (if a sync folder is set)
+        if self.database.sync_dir:
+            self.database.get_register_sync().start()
+        startup_timer.mark("background services")
+        startup_timer.report(STARTUP_REPORT_FILE)
+    
+    def prewarm(self, modules):
+        """Import modules the user is likely to open next on a background thread"""
+        if not STARTUP_PREWARM:
+            return
+        
+        def work():
+            for name in modules:
+                try:
+                    importlib.import_module(name)
+                except Exception as e:
+                    print(f"Pre-warm of {name} failed: {e}")
+        
+        threading.Thread(target=work, name="ViewPrewarm", daemon=True).start()
     
     def center_window(self, size_string):
         """Center the window on screen"""
@@ -66,6 +133,8 @@ class POSApplication(ctk.CTk):
     
     def handle_login(self, username, password):
         """Handle user login"""
+        # In case the login came in before start_backend ran
+        self.start_backend()
         user = self.database.authenticate_user(username, password)
         
         if user:
@@ -97,13 +166,19 @@ class POSApplication(ctk.CTk):
         self.resizable(True, True)
         self.center_window(WINDOW_SIZE)
         
-        self.current_view = CashierView(
+        timer = StartupTimer("Cashier view")
+        cashier_view = importlib.import_module("views.cashier_view")
+        timer.mark("import")
+        self.current_view = cashier_view.CashierView(
             self,
             self.database,
             self.current_user,
             self.handle_logout
         )
         self.current_view.pack(fill="both", expand=True)
+        timer.mark("build")
+        timer.report(STARTUP_REPORT_FILE)
+        self.after(500, self.prewarm, cashier_view.PREWARM_MODULES)
     
     def show_admin_view(self):
         """Show admin dashboard view"""
@@ -116,13 +191,19 @@ class POSApplication(ctk.CTk):
         self.resizable(True, True)
         self.center_window(WINDOW_SIZE)
         
-        self.current_view = AdminView(
+        timer = StartupTimer("Admin view")
+        admin_view = importlib.import_module("views.admin_view")
+        timer.mark("import")
+        self.current_view = admin_view.AdminView(
             self,
             self.database,
             self.current_user,
             self.handle_logout
         )
         self.current_view.pack(fill="both", expand=True)
+        timer.mark("build")
+        timer.report(STARTUP_REPORT_FILE)
+        self.after(500, self.prewarm, admin_view.PREWARM_MODULES)
     
     def handle_logout(self):
         """Handle user logout"""
@@ -146,7 +227,8 @@ class POSApplication(ctk.CTk):
     def on_closing(self):
         """Handle application closing"""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
-            self.database.close()
+            if self.database is not None:
+                self.database.close()
             self.destroy()
 
 
@@ -162,4 +244,6 @@ def main():
             f.write(traceback.format_exc())
 
 if __name__ == "__main__":
+    # Needed for report worker processes in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
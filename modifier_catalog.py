@@ -0,0 +1,24 @@
+"""
+Modifier and alternative price catalog for the POS System
+Global modifiers (add-ons) and per-product alternative prices loaded in one
+go, so the cashier's customization dialog opens without querying the
+database. Database rebuilds the catalog when its data version changes.
+"""
+
+
+class ModifierCatalog:
+    def __init__(self, global_modifiers, prices, version=None):
+        """
+        global_modifiers: rows as returned by Database.get_all_global_modifiers
+        prices: product_prices rows (id, product_id, name, cost, markup, price, created_at)
+        version: Database.get_data_version() the rows were read at
+        """
+        self.global_modifiers = list(global_modifiers)
+        self.version = version
+        self._prices = {}
+        for row in prices:
+            self._prices.setdefault(row[1], []).append(row)
+
+    def prices_for(self, product_id):
+        """Alternative prices of a product (same rows as Database.get_product_prices)"""
+        return list(self._prices.get(product_id, ()))
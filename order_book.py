@@ -0,0 +1,229 @@
+"""
+Open orders (parked carts) for the POS System
+Several carts can be open at once, e.g. one per table or customer name.
+Orders live in memory; a compact JSON snapshot of all open orders is written
+whenever an order is parked, switched, renamed or closed, and loaded again
+on the next login so parked orders survive a restart.
+Item changes in between go to an optional CartJournal; the journal records
+newer than the snapshot are replayed on load, so a crash loses no items.
+"""
+import os
+import json
+from datetime import datetime
+
+DEFAULT_ORDER_TYPE = "Regular"
+
+
+class Order:
+    def __init__(self, name, items=None, order_type=DEFAULT_ORDER_TYPE, created_at=None):
+        self.name = name
+        self.items = items if items is not None else []
+        self.order_type = order_type
+        self.created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def total(self):
+        return sum(item['subtotal'] for item in self.items)
+
+    def to_dict(self):
+        return {"name": self.name, "type": self.order_type, "created": self.created_at, "items": self.items}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], list(data.get("items") or []), data.get("type") or DEFAULT_ORDER_TYPE,
+                   data.get("created"))
+
+
+class OrderBook:
+    def __init__(self, path=None, journal=None):
+        """
+        path: snapshot file (None keeps the orders in memory only)
+        journal: CartJournal for item changes between snapshots (optional)
+        """
+        self.path = path
+        self.journal = journal
+        self.orders = []
+        self.active = None
+        self.seq = 0  # Number of the last journaled change
+        self.load()
+        if self.active is None:
+            self.active = self.new_order()
+        if self.journal is not None and self.replay():
+            # Recovered changes become part of the snapshot; the journal starts empty
+            self.save()
+
+    def names(self):
+        return [order.name for order in self.orders]
+
+    def find(self, name):
+        for order in self.orders:
+            if order.name == name:
+                return order
+        return None
+
+    def next_name(self):
+        n = len(self.orders) + 1
+        while self.find(f"Order {n}") is not None:
+            n += 1
+        return f"Order {n}"
+
+    def unique_name(self, name, exclude=None):
+        """name, or name with a number appended if another order already uses it"""
+        base = name.strip() or self.next_name()
+        name, n = base, 2
+        while self.find(name) not in (None, exclude):
+            name = f"{base} ({n})"
+            n += 1
+        return name
+
+    def new_order(self, name=None):
+        """Open an empty order (not activated)"""
+        order = Order(self.unique_name(name or ""))
+        self.orders.append(order)
+        return order
+
+    def park(self, name=None):
+        """Keep the active order open and switch to a new empty one"""
+        order = self.new_order(name)
+        self.active = order
+        self.save()
+        return order
+
+    def switch(self, name):
+        order = self.find(name)
+        if order is None or order is self.active:
+            return self.active
+        self.active = order
+        self.save()
+        return order
+
+    def rename(self, order, name):
+        order.name = self.unique_name(name, exclude=order)
+        self.save()
+        return order.name
+
+    def close_active(self):
+        """Drop the active order (checked out) and switch to the next open one"""
+        index = self.orders.index(self.active)
+        self.orders.remove(self.active)
+        if not self.orders:
+            self.new_order()
+        self.active = self.orders[min(index, len(self.orders) - 1)]
+        self.save()
+        return self.active
+
+    # --- Item changes of the active order (journaled) ---
+
+    def _log(self, order, op, **fields):
+        self.seq += 1
+        if self.journal is not None:
+            record = {"n": self.seq, "o": order.name, "op": op}
+            record.update(fields)
+            self.journal.append(record)
+
+    def add_item(self, item):
+        self.active.items.append(item)
+        self._log(self.active, "add", item=item)
+
+    def set_quantity(self, index, quantity):
+        item = self.active.items[index]
+        item['quantity'] = quantity
+        item['subtotal'] = quantity * item['price']
+        self._log(self.active, "qty", i=index, q=quantity, s=item['subtotal'])
+
+    def replace_item(self, index, item):
+        self.active.items[index] = item
+        self._log(self.active, "put", i=index, item=item)
+
+    def remove_item(self, index):
+        del self.active.items[index]
+        self._log(self.active, "del", i=index)
+
+    def clear(self):
+        del self.active.items[:]
+        self._log(self.active, "clear")
+
+    def set_order_type(self, order_type):
+        if self.active.order_type != order_type:
+            self.active.order_type = order_type
+            self._log(self.active, "type", t=order_type)
+
+    def apply(self, record):
+        """Re-apply one journaled change"""
+        order = self.find(record["o"])
+        if order is None:
+            order = Order(record["o"])
+            self.orders.append(order)
+        op, items = record["op"], order.items
+        if op == "add":
+            items.append(record["item"])
+        elif op == "put":
+            items[record["i"]] = record["item"]
+        elif op == "qty":
+            items[record["i"]]['quantity'] = record["q"]
+            items[record["i"]]['subtotal'] = record["s"]
+        elif op == "del":
+            del items[record["i"]]
+        elif op == "clear":
+            del items[:]
+        elif op == "type":
+            order.order_type = record["t"]
+
+    def replay(self):
+        """Apply journal records newer than the snapshot; returns how many were applied"""
+        applied = 0
+        for record in self.journal.read():
+            if record.get("n", 0) <= self.seq:
+                continue  # Already in the snapshot (crash between snapshot and journal reset)
+            try:
+                self.apply(record)
+            except (KeyError, IndexError, TypeError) as e:
+                print(f"Skipped cart journal record {record.get('n')}: {e}")
+            self.seq = record["n"]
+            applied += 1
+        if applied:
+            print(f"Recovered {applied} cart change(s) from the journal")
+        return applied
+
+    # --- Snapshot ---
+
+    def snapshot(self):
+        """Compact representation of all open orders (empty ones other than the active order are left out)"""
+        orders = [order.to_dict() for order in self.orders if order.items or order is self.active]
+        return {"active": self.active.name if self.active else None, "seq": self.seq, "orders": orders}
+
+    def save(self):
+        """Write the snapshot (fsynced, atomic) and empty the journal it now covers"""
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save open orders: {e}")
+            return
+        if self.journal is not None:
+            self.journal.reset()
+
+    def close(self):
+        self.save()
+        if self.journal is not None:
+            self.journal.close()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Could not load open orders: {e}")
+            return
+        self.orders = [Order.from_dict(order) for order in data.get("orders", [])]
+        self.seq = data.get("seq", 0)
+        self.active = self.find(data.get("active")) or (self.orders[0] if self.orders else None)
@@ -0,0 +1,349 @@
+"""
+Headless POS core service
+Runs the database and the background services (end-of-day reports, backups,
+maintenance, register sync) in their own process, with no UI, and exposes
+checkout, stock, reports and printing to UI clients through a small JSON API
+on 127.0.0.1. When a core service is running, the Tk application leaves the
+background services and receipt printing to it, so that work runs on another
+core, and other UIs (e.g. a kitchen display) can share the same core.
+
+Run with: python pos_service.py [--db pos_database.db] [--port 8765]
+
+API: GET /health, POST /rpc/<method> with {"args": [...], "kwargs": {...}}
+-> {"result": ...} or {"error": "...", "type": "..."}
+Every request needs the X-POS-Token header. The token is generated on the
+first start into pos_service.token next to the database (readable by its
+owner only) and read from there by clients. Requests must be JSON and
+addressed to localhost, so a web page cannot call the API from a browser.
+"""
+import os
+import hmac
+import json
+import time
+import secrets
+import threading
+import urllib.request
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+from config import (DATABASE_NAME, END_OF_DAY_REPORT_ENABLED, POS_SERVICE_ENABLED, POS_SERVICE_HOST,
+                    POS_SERVICE_PORT, POS_SERVICE_TOKEN, POS_SERVICE_TOKEN_FILE, POS_SERVICE_TIMEOUT, RECEIPTS_DIR,
+                    REPORTS_DIR)
+
+TOKEN_HEADER = "X-POS-Token"
+# Host header values accepted (with or without the port)
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+# Database methods clients may call (run one at a time on the core's connection)
+DATABASE_METHODS = (
+    # Catalog and stock
+    "get_all_products", "search_products", "get_product_by_id", "get_all_categories",
+    "get_products_by_category_with_stock", "get_all_global_modifiers", "get_product_prices",
+    "get_low_stock_products", "get_out_of_stock_products", "get_inventory_snapshot", "get_stock_adjustments",
+    "update_product_stock", "apply_stock_adjustments",
+    # Checkout and transactions
+    "add_transaction_with_payment", "get_transactions", "get_transactions_by_date",
+    "get_transaction_details", "get_transaction_items", "get_receipt_settings", "log_activity",
+    # Reports
+    "get_sales_summary", "get_top_selling_products", "get_payment_method_breakdown",
+    "get_order_type_breakdown", "get_hourly_sales", "get_category_performance",
+)
+
+# Operations of the service itself (do not hold the database lock)
+SERVICE_METHODS = ("status", "print_image", "generate_report", "run_end_of_day", "wake_outbox", "create_backup",
+                   "sync_now")
+
+
+class PosServiceError(Exception):
+    """A core service call failed (or the service could not be reached)"""
+
+
+class PosServiceUnavailable(PosServiceError):
+    """The core service could not be reached (the call may not have run)"""
+
+
+def token_path(db_path=DATABASE_NAME):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), POS_SERVICE_TOKEN_FILE)
+
+
+def load_token(db_path=DATABASE_NAME, create=False):
+    """POS_SERVICE_TOKEN, or the token file next to the database (create=True generates it)"""
+    if POS_SERVICE_TOKEN:
+        return POS_SERVICE_TOKEN
+    path = token_path(db_path)
+    if create:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+class PosService:
+    def __init__(self, db_path=DATABASE_NAME, host=POS_SERVICE_HOST, port=POS_SERVICE_PORT, token=None):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.token = token
+        self.database = None
+        self.started = None
+        self._server = None
+        self._thread = None
+        self._reports = None
+        self._db_lock = threading.Lock()
+        self._print_lock = threading.Lock()
+        self._report_lock = threading.Lock()
+
+    def start(self):
+        """Open the database, start the background services and serve the API on a thread"""
+        if not self.token:
+            self.token = load_token(self.db_path, create=True)
+        if not self.token:
+            raise RuntimeError(f"No service token (could not create {token_path(self.db_path)})")
+        from database import Database
+        self.database = Database(self.db_path)
+        # The only email worker: UI clients queue emails and wake it (wake_outbox)
+        self.database.get_email_outbox()
+        if END_OF_DAY_REPORT_ENABLED:
+            self.database.get_report_scheduler().start()
+        self.database.get_backup_manager().start()
+        self.database.get_system_optimizer().start()
+        if self.database.sync_dir:
+            self.database.get_register_sync().start()
+
+        handler = type("PosRequestHandler", (_RequestHandler,), {"service": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.started = datetime.now()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="PosService", daemon=True)
+        self._thread.start()
+        print(f"POS core service on http://{self.host}:{self.port} (database {self.db_path})")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._reports is not None:
+            with self._report_lock:
+                self._reports.db.close()
+            self._reports = None
+        if self.database is not None:
+            with self._db_lock:
+                self.database.close()
+            self.database = None
+
+    def call(self, name, args, kwargs):
+        if name in SERVICE_METHODS:
+            return getattr(self, name)(*args, **kwargs)
+        if name in DATABASE_METHODS:
+            with self._db_lock:
+                return getattr(self.database, name)(*args, **kwargs)
+        raise KeyError(f"Unknown method: {name}")
+
+    # --- Service operations ---
+    def status(self):
+        return {"pid": os.getpid(), "database": os.path.abspath(self.db_path),
+                "started": self.started.strftime("%Y-%m-%d %H:%M:%S") if self.started else None}
+
+    def print_image(self, image_path):
+        """Print a saved receipt image (files in the receipts folder only); returns [success, message]"""
+        root = os.path.realpath(RECEIPTS_DIR)
+        path = os.path.realpath(image_path)
+        try:
+            inside = os.path.commonpath([root, path]) == root
+        except ValueError:  # Different drive
+            inside = False
+        if not inside:
+            raise PermissionError(f"Not a receipt file: {image_path}")
+        from printer_utils import print_image_to_default_printer
+        with self._print_lock:
+            return list(print_image_to_default_printer(image_path))
+
+    def generate_report(self, kind, report_type, output_format="html"):
+        """
+        Build a report file ('summary', 'product' or 'line_items' for 'today', 'week', 'month'
+        or 'all') under the reports folder; returns its absolute path
+        """
+        with self._report_lock:
+            if self._reports is None:
+                # Own read connection, so long reports do not hold up checkouts
+                from report_scheduler import ReportSource
+                from views.admin.report_generator import DetailedReportGenerator, ReportCache
+                self._reports = DetailedReportGenerator(ReportSource(self.db_path), output_dir=REPORTS_DIR,
+                                                        cache=ReportCache())
+            path = self._reports.generate(kind, report_type, output_format)
+        return os.path.abspath(path) if path else path
+
+    def wake_outbox(self):
+        """Deliver emails a client just queued without waiting for the next poll"""
+        self.database.get_email_outbox().wake()
+
+    def run_end_of_day(self, report_date=None):
+        """Close the day in the background (report_date YYYY-MM-DD, default today)"""
+        if report_date:
+            report_date = datetime.strptime(report_date, "%Y-%m-%d").date()
+        return self.database.get_report_scheduler().run_now(report_date)
+
+    def create_backup(self):
+        return self.database.get_backup_manager().create_backup()
+
+    def sync_now(self):
+        return list(self.database.get_register_sync().exchange())
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        """Local Host header and the service token (sends the error reply if not)"""
+        port = self.server.server_address[1]
+        host = (self.headers.get("Host") or "").lower()
+        if host not in LOCAL_HOSTS and host not in [f"{name}:{port}" for name in LOCAL_HOSTS]:
+            self._send(403, {"error": "Host not allowed", "type": "PermissionError"})
+            return False
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.service.token.encode("utf-8")):
+            self._send(403, {"error": "Invalid token", "type": "PermissionError"})
+            return False
+        return True
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send(404, {"error": "Not found", "type": "KeyError"})
+        elif self._authorized():
+            self._send(200, dict(self.service.status(), status="ok"))
+
+    def do_POST(self):
+        if not self.path.startswith("/rpc/"):
+            self._send(404, {"error": "Not found", "type": "KeyError"})
+            return
+        if not self._authorized():
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "Expected application/json", "type": "ValueError"})
+            return
+        name = self.path[len("/rpc/"):]
+        if name not in SERVICE_METHODS and name not in DATABASE_METHODS:
+            self._send(404, {"error": f"Unknown method: {name}", "type": "KeyError"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            result = self.service.call(name, request.get("args", []), request.get("kwargs", {}))
+        except Exception as e:
+            self._send(500, {"error": str(e), "type": type(e).__name__})
+        else:
+            self._send(200, {"result": result})
+
+
+class PosServiceClient:
+    """Calls a core service; methods are proxied, e.g. client.get_sales_summary(start, end)"""
+
+    def __init__(self, host=POS_SERVICE_HOST, port=POS_SERVICE_PORT, token=None, timeout=POS_SERVICE_TIMEOUT,
+                 db_path=DATABASE_NAME):
+        self.url = f"http://{host}:{port}"
+        # The token the service generated next to the database (no token: no access)
+        self.token = token if token is not None else load_token(db_path)
+        self.timeout = timeout
+
+    def _request(self, path, body=None, timeout=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                reply = json.loads(e.read())
+            except ValueError:
+                reply = {"error": str(e)}
+            raise PosServiceError(f"{reply.get('type', 'Error')}: {reply.get('error')}")
+        except (OSError, ValueError) as e:
+            if isinstance(getattr(e, "reason", e), ConnectionRefusedError):
+                # Nothing was sent: let the next lookup see that the service is gone
+                forget_core_client()
+            raise PosServiceUnavailable(f"Core service unavailable: {e}")
+
+    def is_available(self, timeout=0.5):
+        try:
+            return self._request("/health", timeout=timeout).get("status") == "ok"
+        except PosServiceError:
+            return False
+
+    def call(self, method, *args, **kwargs):
+        return self._request(f"/rpc/{method}", {"args": args, "kwargs": kwargs})["result"]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+# Result of the last lookup: (checked at, client or None)
+_core_lookup = (0, None)
+CORE_LOOKUP_TTL = 30
+
+
+def get_core_client(refresh=False):
+    """A client for the running core service, or None (lookup cached for a few seconds)"""
+    global _core_lookup
+    if not POS_SERVICE_ENABLED:
+        return None
+    checked, client = _core_lookup
+    if refresh or time.monotonic() - checked > CORE_LOOKUP_TTL:
+        client = PosServiceClient()
+        if not client.is_available():
+            client = None
+        _core_lookup = (time.monotonic(), client)
+    return client
+
+
+def forget_core_client():
+    """Drop the cached lookup (the service stopped)"""
+    global _core_lookup
+    _core_lookup = (0, None)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless POS core service")
+    parser.add_argument("--db", default=DATABASE_NAME, help="database file")
+    parser.add_argument("--host", default=POS_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=POS_SERVICE_PORT)
+    args = parser.parse_args()
+
+    service = PosService(args.db, args.host, args.port)
+    service.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+In-memory product search index for the POS System
+Lets product pickers filter by name, category or barcode on every keystroke
+without querying the database
+"""
+import re
+from bisect import bisect_left
+
+# Product row columns (see Database.get_all_products)
+NAME, CATEGORY, BARCODE = 1, 2, 5
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return _TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+class ProductNameIndex:
+    """
+    Sorted-array index over the suffixes of every word in the indexed columns.
+
+    A query is split into words; a product matches when every query word
+    occurs inside one of its words (same results as the old `term in name`
+    check for single words). Each word lookup is a bisect over the sorted
+    suffix array, so searching does not scan the product list.
+    """
+
+    def __init__(self, products, version=None, fields=(NAME, CATEGORY, BARCODE)):
+        self.products = list(products)
+        self.version = version
+        self.fields = fields
+
+        entries = []
+        for pos, p in enumerate(self.products):
+            for field in fields:
+                if len(p) <= field:
+                    continue
+                for token in set(tokenize(p[field])):
+                    for i in range(len(token)):
+                        entries.append((token[i:], pos, field))
+        entries.sort()
+        self._entries = entries
+        self._keys = [e[0] for e in entries]
+
+    def _lookup(self, token, fields):
+        """Positions of products with a word containing token"""
+        lo = bisect_left(self._keys, token)
+        hi = bisect_left(self._keys, token + "\uffff", lo)
+        return {pos for _, pos, field in self._entries[lo:hi] if field in fields}
+
+    def search(self, query, fields=None, predicate=None, limit=None):
+        """
+        Return products matching query, in the original (name) order.
+
+        Args:
+            query: Search text (empty matches every product)
+            fields: Columns to match against (defaults to all indexed columns)
+            predicate: Optional extra filter called with each product row
+            limit: Maximum number of results
+        """
+        fields = fields or self.fields
+        tokens = tokenize(query)
+
+        if tokens:
+            matches = None
+            for token in tokens:
+                found = self._lookup(token, fields)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+            candidates = (self.products[pos] for pos in sorted(matches))
+        else:
+            candidates = iter(self.products)
+
+        results = []
+        for p in candidates:
+            if predicate and not predicate(p):
+                continue
+            results.append(p)
+            if limit and len(results) >= limit:
+                break
+        return results
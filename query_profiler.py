@@ -0,0 +1,218 @@
+"""
+Query profiling for the POS System (opt-in)
+Database.cursor is swapped for a ProfilingCursor that times every execute,
+counts the rows fetched and remembers where the call came from. Statements
+slower than the threshold go to a rotating slow-query log, and write_report()
+lists the hot statements with their EXPLAIN QUERY PLAN.
+Enable with QUERY_PROFILING_ENABLED in config.py or POS_QUERY_PROFILE=1.
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from collections import Counter
+from datetime import datetime
+from config import (SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG, SLOW_QUERY_LOG_MAX_BYTES,
+                    SLOW_QUERY_LOG_BACKUPS, QUERY_PROFILE_REPORT)
+
+# Latency samples kept per statement for the p95 (most recent ones)
+MAX_SAMPLES = 1000
+_WHITESPACE = re.compile(r"\s+")
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+
+
+def normalize_sql(sql):
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _call_site():
+    """
+    "file:line function" of the first caller outside this module, followed by
+    the first frame outside that file (e.g. the view calling a Database method)
+    """
+    frame = sys._getframe(2)
+    sites = []
+    seen_file = _THIS_FILE
+    while frame is not None and len(sites) < 2:
+        filename = os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+        if filename != seen_file and filename != _THIS_FILE:
+            sites.append(f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}")
+            seen_file = filename
+        frame = frame.f_back
+    return " <- ".join(sites) or "?"
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = []
+        self.call_sites = Counter()
+        self.last_params = None
+
+    def add(self, elapsed_ms, call_site, params):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+        if len(self.samples) > MAX_SAMPLES:
+            del self.samples[0]
+        self.call_sites[call_site] += 1
+        self.last_params = params
+
+    def p95(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class QueryProfiler:
+    def __init__(self, db_path, threshold_ms=SLOW_QUERY_THRESHOLD_MS, slow_log=SLOW_QUERY_LOG,
+                 max_bytes=SLOW_QUERY_LOG_MAX_BYTES, backups=SLOW_QUERY_LOG_BACKUPS):
+        self.db_path = db_path
+        self.threshold_ms = threshold_ms
+        self.started = datetime.now()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        self._slow_log = logging.getLogger(f"pos.slow_queries.{id(self)}")
+        self._slow_log.propagate = False
+        self._slow_log.setLevel(logging.INFO)
+        self._handler = None
+        if slow_log:
+            self._handler = RotatingFileHandler(slow_log, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._slow_log.addHandler(self._handler)
+
+    def record(self, sql, params, elapsed_ms, call_site):
+        """Returns the stats entry so the cursor can add the rows it fetches later"""
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(elapsed_ms, call_site, params)
+        if elapsed_ms >= self.threshold_ms:
+            self._slow_log.info(f"{elapsed_ms:.1f} ms  {call_site}  {key[:500]}  params={params!r:.200}")
+        return stats
+
+    def add_rows(self, stats, rows, elapsed_ms):
+        """Rows fetched (and the time spent fetching them) belong to the statement"""
+        with self._lock:
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started = datetime.now()
+
+    def top(self, limit=20, key="total"):
+        """Statements sorted by total time (or "p95", "count", "rows")"""
+        sort_keys = {
+            "total": lambda s: s.total_ms,
+            "p95": lambda s: s.p95(),
+            "count": lambda s: s.count,
+            "rows": lambda s: s.rows,
+        }
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=sort_keys[key], reverse=True)[:limit]
+
+    def explain(self, sql, params=None):
+        """EXPLAIN QUERY PLAN lines for a statement (read-only connection)"""
+        if not normalize_sql(sql).upper().startswith(("SELECT", "WITH")):
+            return []
+        conn = sqlite3.connect(Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True, timeout=1)
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            return [f"(no plan: {e})"]
+        finally:
+            conn.close()
+
+    def write_report(self, path=QUERY_PROFILE_REPORT, limit=20):
+        """Write the hot statements (plus query plans for slow ones) to a text file"""
+        lines = [
+            f"Query profile {self.started:%Y-%m-%d %H:%M:%S} - {datetime.now():%Y-%m-%d %H:%M:%S}",
+            f"Slow threshold: {self.threshold_ms} ms",
+            "",
+        ]
+        for rank, stats in enumerate(self.top(limit), 1):
+            lines.append(f"#{rank}  calls={stats.count}  total={stats.total_ms:.1f} ms  "
+                         f"avg={stats.total_ms / stats.count:.2f} ms  p95={stats.p95():.2f} ms  "
+                         f"max={stats.max_ms:.1f} ms  rows={stats.rows}")
+            lines.append(f"    {stats.sql}")
+            for site, count in stats.call_sites.most_common(5):
+                lines.append(f"    from {site} ({count}x)")
+            if stats.p95() >= self.threshold_ms:
+                for step in self.explain(stats.sql, stats.last_params):
+                    lines.append(f"    plan: {step}")
+            lines.append("")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        return path
+
+    def close(self):
+        if self._handler is not None:
+            self._slow_log.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that reports every statement to a QueryProfiler"""
+    profiler = None
+
+    def execute(self, sql, parameters=()):
+        call_site = _call_site()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._stats = self.profiler.record(sql, parameters, (time.perf_counter() - start) * 1000, call_site)
+
+    def executemany(self, sql, seq_of_parameters):
+        call_site = _call_site()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._stats = self.profiler.record(sql, None, (time.perf_counter() - start) * 1000, call_site)
+
+    def _fetched(self, result, start, rows):
+        stats = getattr(self, "_stats", None)
+        if stats is not None:
+            self.profiler.add_rows(stats, rows, (time.perf_counter() - start) * 1000)
+        return result
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        return self._fetched(row, start, 1 if row is not None else 0)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        return self._fetched(rows, start, len(rows))
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        return self._fetched(rows, start, len(rows))
+
+
+def profiling_cursor(conn, profiler):
+    """A ProfilingCursor on conn bound to profiler"""
+    cursor_class = type("ProfilingCursor", (ProfilingCursor,), {"profiler": profiler})
+    return conn.cursor(factory=cursor_class)
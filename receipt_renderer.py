@@ -39,6 +39,43 @@ class ReceiptRenderer:
             self.font_bold = ImageFont.load_default()
             self.font_large = ImageFont.load_default()
             self.font_mono = ImageFont.load_default()
+        
+        # Processed (black & white, resized) logo, keyed by (path, mtime, max size)
+        self._logo_cache = None
+
+    def _load_logo(self, logo_path, max_logo_width, max_logo_height):
+        """Logo converted for the thermal printer; reused until the file changes"""
+        key = (logo_path, os.path.getmtime(logo_path), max_logo_width, max_logo_height)
+        if self._logo_cache and self._logo_cache[0] == key:
+            return self._logo_cache[1]
+        
+        # Load logo
+        logo_img = Image.open(logo_path)
+        
+        # Convert to black and white for thermal printer
+        logo_img = logo_img.convert('L')  # Convert to grayscale
+        
+        # Apply threshold to make it pure black and white
+        threshold = 128
+        logo_img = logo_img.point(lambda x: 0 if x < threshold else 255, '1')
+        
+        # Calculate new size maintaining aspect ratio (max height 100px)
+        aspect = logo_img.width / logo_img.height
+        if logo_img.height > max_logo_height:
+            new_height = max_logo_height
+            new_width = int(new_height * aspect)
+        else:
+            new_height = logo_img.height
+            new_width = logo_img.width
+        
+        # Ensure width doesn't exceed max
+        if new_width > max_logo_width:
+            new_width = max_logo_width
+            new_height = int(new_width / aspect)
+        
+        logo_img = logo_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        self._logo_cache = (key, logo_img)
+        return logo_img
 
     def generate_image(self, transaction, items, preview=False):
         """Generate receipt image"""
@@ -148,35 +185,8 @@ class ReceiptRenderer:
         logo_path = str(self.settings[7]) if len(self.settings) > 7 and self.settings[7] else ""
         if logo_path and os.path.exists(logo_path):
             try:
-                # Load logo
-                logo_img = Image.open(logo_path)
-                
-                # Convert to black and white for thermal printer
-                logo_img = logo_img.convert('L')  # Convert to grayscale
-                
-                # Apply threshold to make it pure black and white
-                threshold = 128
-                logo_img = logo_img.point(lambda x: 0 if x < threshold else 255, '1')
-                
-                # Resize to fit receipt width (max height 100px)
-                max_logo_height = 100
-                max_logo_width = width - (self.padding * 2)
-                
-                # Calculate new size maintaining aspect ratio
-                aspect = logo_img.width / logo_img.height
-                if logo_img.height > max_logo_height:
-                    new_height = max_logo_height
-                    new_width = int(new_height * aspect)
-                else:
-                    new_height = logo_img.height
-                    new_width = logo_img.width
-                
-                # Ensure width doesn't exceed max
-                if new_width > max_logo_width:
-                    new_width = max_logo_width
-                    new_height = int(new_width / aspect)
-                
-                logo_img = logo_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                logo_img = self._load_logo(logo_path, width - (self.padding * 2), 100)
+                new_width, new_height = logo_img.size
                 
                 # Center the logo
                 logo_x = (width - new_width) // 2
@@ -238,7 +248,9 @@ class ReceiptRenderer:
         
         # Customer Name
         customer_name = None
-        if len(transaction) > 13:
+        if not transaction:
+             pass  # Preview has no transaction
+        elif len(transaction) > 13:
              customer_name = transaction[13] # t_dummy from payment_dialog
         elif len(transaction) > 11 and len(transaction) < 13:
              # From get_transactions (DB has 12 columns, index 11 is customer_name)
@@ -363,9 +375,9 @@ class ReceiptRenderer:
         
         return img
 
-    def save_receipt(self, transaction, items, folder="receipts"):
-        """Save receipt as BMP"""
-        if not os.path.exists(folder):
+    def save_receipt(self, transaction, items, folder="receipts", store=None):
+        """Save receipt image (into the store's date folder and index when a ReceiptStore is given)"""
+        if store is None and not os.path.exists(folder):
             os.makedirs(folder)
             
         img = self.generate_image(transaction, items)
@@ -378,6 +390,11 @@ class ReceiptRenderer:
         except:
             # Fallback to transaction number string if ID is not int
             filename = f"receipt_{transaction[1]}.png"
+        if store is not None:
+            path = store.new_path(filename)
+            img.save(path, "PNG")
+            store.add(path)
+            return path
         path = os.path.join(folder, filename)
         img.save(path, "PNG")
         return path
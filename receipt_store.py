@@ -0,0 +1,153 @@
+"""
+Receipt file store for the POS System
+Receipt images are saved in date folders (receipts/YYYY-MM-DD/) and recorded
+in a small index (path, created, size) so cleanup only touches the files it
+deletes instead of scanning the whole receipts directory
+"""
+import os
+import time
+import sqlite3
+from datetime import datetime
+from config import DATABASE_NAME, RECEIPTS_DIR, RECEIPTS_KEEP_DAYS, RECEIPTS_MAX_MB
+
+RECEIPT_EXTENSIONS = ('.bmp', '.png', '.jpg', '.txt')
+
+
+class ReceiptStore:
+    def __init__(self, db_path=DATABASE_NAME, root=RECEIPTS_DIR, max_bytes=RECEIPTS_MAX_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.root = root
+        self.max_bytes = max_bytes
+
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS receipt_files (
+                path TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                size INTEGER DEFAULT 0
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_receipt_files_created ON receipt_files(created)")
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def new_path(self, filename, when=None):
+        """Absolute path for a new receipt file in today's date folder"""
+        day = (when or datetime.now()).strftime("%Y-%m-%d")
+        folder = os.path.abspath(os.path.join(self.root, day))
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, filename)
+
+    def add(self, path):
+        """Record a saved receipt file in the index"""
+        rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO receipt_files (path, created, size) VALUES (?, ?, ?)",
+                    (rel_path, time.time(), os.path.getsize(path))
+                )
+        finally:
+            conn.close()
+
+    def total_size(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM receipt_files").fetchone()[0]
+        finally:
+            conn.close()
+
+    def rebuild_index(self, recursive=True):
+        """
+        Index receipt files not saved through the store (e.g. older flat files in
+        receipts/). recursive=False only looks at the top level, which after the
+        move to date folders holds just one entry per day.
+        Uses os.scandir so each file is stat'ed once. Returns the number of files added.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        rows = []
+        pending = [self.root]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(RECEIPT_EXTENSIONS):
+                        st = entry.stat()
+                        rows.append((os.path.relpath(entry.path, self.root), st.st_mtime, st.st_size))
+        conn = self._connect()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO receipt_files (path, created, size) VALUES (?, ?, ?)", rows
+                )
+                return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def cleanup(self, days_to_keep=RECEIPTS_KEEP_DAYS, max_bytes=None):
+        """
+        Delete receipts older than days_to_keep, then the oldest ones until the
+        total is under max_bytes. Work is proportional to the files deleted.
+        Returns (files removed, bytes freed).
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        cutoff = time.time() - days_to_keep * 86400
+        conn = self._connect()
+        try:
+            expired = conn.execute(
+                "SELECT path, size FROM receipt_files WHERE created < ? ORDER BY created", (cutoff,)
+            ).fetchall()
+
+            over = 0
+            if max_bytes:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM receipt_files").fetchone()[0]
+                over = total - sum(size for _, size in expired) - max_bytes
+            if over > 0:
+                # Size cap: evict the oldest remaining receipts
+                for path, size in conn.execute(
+                    "SELECT path, size FROM receipt_files WHERE created >= ? ORDER BY created", (cutoff,)
+                ):
+                    if over <= 0:
+                        break
+                    expired.append((path, size))
+                    over -= size
+
+            removed, freed = 0, 0
+            folders = set()
+            gone = []
+            for path, size in expired:
+                full_path = os.path.join(self.root, path)
+                try:
+                    os.remove(full_path)
+                    removed += 1
+                    freed += size or 0
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    # Still in use (e.g. printing); keep it indexed and retry next time
+                    print(f"  - Failed to delete {path}: {e}")
+                    continue
+                gone.append((path,))
+                folders.add(os.path.dirname(full_path))
+
+            with conn:
+                conn.executemany("DELETE FROM receipt_files WHERE path = ?", gone)
+        finally:
+            conn.close()
+
+        # Drop date folders that are now empty
+        for folder in folders:
+            if os.path.abspath(folder) != os.path.abspath(self.root):
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    pass
+        return removed, freed
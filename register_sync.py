@@ -0,0 +1,466 @@
+"""
+Multi-register sync for the POS System (offline-first, no central server)
+Each register records its own changes in an append-only log (sync_log):
+sales, stock deltas and product edits, written in the same transaction as
+the change itself. Registers exchange the log as numbered batch files in a
+shared folder (a network share, or a folder a hub process copies around):
+every register writes its batches to <SYNC_DIR>/<register id>/ and applies
+the batches of the others it has not seen yet.
+
+Merging: stock changes are deltas and are simply added up, so the order in
+which registers receive them does not matter; product edits are last writer
+wins; sales are copied. Products are matched across registers by sync_key
+(registers should start from a copy of the same database).
+
+A register's id is kept in the database and in a file next to it
+(<database>.register, with the computer name). A database that does not
+match its file, i.e. one copied to a new file or another computer, becomes
+a new register; the change log it copied is left to the original.
+Enable with SYNC_DIR in config.py or POS_SYNC_DIR; try two local instances
+with: python register_sync.py --db register2.db --dir shared_sync --watch
+"""
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from config import DATABASE_NAME, SYNC_DIR, SYNC_INTERVAL, SYNC_BATCH_SIZE, REGISTER_NAME
+
+BATCH_SUFFIX = ".json"
+IDENTITY_SUFFIX = ".register"  # Register id file next to the database
+OWNER_FILE = "register.info"  # Name of the register writing to a batch folder
+PRODUCT_FIELDS = ("name", "category", "price", "barcode", "description", "unit", "cost", "markup",
+                  "use_stock_tracking", "is_available")
+SALE_FIELDS = ("transaction_number", "total_amount", "tax_amount", "discount_amount", "payment_method",
+               "order_type", "customer_name", "status", "payment_amount", "change_amount", "created_at")
+ITEM_FIELDS = ("product_name", "quantity", "unit_price", "subtotal", "variant_name", "modifiers")
+
+
+def create_sync_tables(cursor, db_path):
+    """Change log, register identity, peer watermarks and product keys"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            register_id TEXT PRIMARY KEY,
+            name TEXT,
+            last_seq INTEGER DEFAULT 0,
+            last_sync TIMESTAMP
+        )
+    ''')
+    # Last accepted edit per product (last writer wins)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_versions (
+            sync_key TEXT PRIMARY KEY,
+            edited_at TEXT NOT NULL,
+            register_id TEXT NOT NULL
+        )
+    ''')
+    try:
+        cursor.execute("ALTER TABLE products ADD COLUMN sync_key TEXT")
+    except:
+        pass
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_sync_key ON products(sync_key)")
+
+    # Existing products are keyed by name so copies of the same menu match up;
+    # products sharing a name are numbered in id order (the same in every copy)
+    cursor.execute("SELECT id, name FROM products WHERE sync_key IS NULL")
+    rows = cursor.fetchall()
+    if rows:
+        cursor.execute("SELECT id, name FROM products ORDER BY id")
+        same_name = {}
+        ordinal = {}
+        for pid, name in cursor.fetchall():
+            same_name[name] = same_name.get(name, 0) + 1
+            ordinal[pid] = same_name[name]
+        cursor.executemany("UPDATE products SET sync_key = ? WHERE id = ?", [
+            (f"name:{name}" if same_name[name] == 1 else f"name:{name}#{ordinal[pid]}", pid) for pid, name in rows
+        ])
+
+    check_identity(cursor, db_path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def check_identity(cursor, db_path):
+    """
+    Give the database a register id of its own. A database whose id does not
+    match the id file next to it (copied to a new file or another computer)
+    gets a new id, drops the copied change log (those changes belong to the
+    original register) and reads the original's batches only from after the
+    last change it already contains. Returns the register id.
+    """
+    path = os.path.abspath(db_path) + IDENTITY_SUFFIX
+    host = socket.gethostname()
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'register_id'")
+    row = cursor.fetchone()
+    current = row[0] if row else None
+    if current is not None and _read_json(path) == {"register_id": current, "host": host}:
+        return current
+
+    if current is not None:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sync_log'")
+        row = cursor.fetchone()
+        cursor.execute("DELETE FROM sync_log")
+        cursor.execute("""
+            INSERT INTO sync_peers (register_id, last_seq) VALUES (?, ?)
+            ON CONFLICT(register_id) DO UPDATE SET last_seq = excluded.last_seq
+        """, (current, row[0] if row else 0))
+        print(f"Register sync: {db_path} is a copy of register {current[:8]}, continuing as a new register")
+    new_id = uuid.uuid4().hex
+    cursor.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('register_id', ?)", (new_id,))
+    _write_json(path, {"register_id": new_id, "host": host})
+    return new_id
+
+
+def register_id(cursor):
+    cursor.execute("SELECT value FROM sync_meta WHERE key = 'register_id'")
+    return cursor.fetchone()[0]
+
+
+def product_keys(cursor, product_ids):
+    """{product id: sync_key}, giving new products a key"""
+    ids = sorted({pid for pid in product_ids if pid is not None})
+    if not ids:
+        return {}
+    cursor.execute(f"SELECT id, sync_key FROM products WHERE id IN ({','.join('?' * len(ids))})", ids)
+    keys = dict(cursor.fetchall())
+    for pid, key in keys.items():
+        if key is None:
+            keys[pid] = uuid.uuid4().hex
+            cursor.execute("UPDATE products SET sync_key = ? WHERE id = ?", (keys[pid], pid))
+    return keys
+
+
+def log_change(cursor, kind, payload):
+    cursor.execute("INSERT INTO sync_log (kind, payload) VALUES (?, ?)",
+                   (kind, json.dumps(payload, separators=(",", ":"))))
+
+
+def log_stock(cursor, deltas):
+    """deltas: [(product id, delta)] (absolute stock counts converted to deltas by the caller)"""
+    deltas = [(pid, delta) for pid, delta in deltas if delta]
+    if not deltas:
+        return
+    keys = product_keys(cursor, [pid for pid, _ in deltas])
+    log_change(cursor, "stock", {"deltas": [[keys[pid], delta] for pid, delta in deltas if pid in keys]})
+
+
+def log_product(cursor, product_id, deleted=False):
+    """Record a product's current fields (call after the write) or its deletion (call before)"""
+    key = product_keys(cursor, [product_id]).get(product_id)
+    if key is None:
+        return
+    edited_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    payload = {"key": key, "edited_at": edited_at}
+    if deleted:
+        payload["deleted"] = True
+    else:
+        cursor.execute(f"SELECT {', '.join(PRODUCT_FIELDS)} FROM products WHERE id = ?", (product_id,))
+        payload["fields"] = dict(zip(PRODUCT_FIELDS, cursor.fetchone()))
+    cursor.execute("INSERT OR REPLACE INTO sync_versions (sync_key, edited_at, register_id) VALUES (?, ?, ?)",
+                   (key, edited_at, register_id(cursor)))
+    log_change(cursor, "product", payload)
+
+
+def log_sale(cursor, transaction_id):
+    """Record a completed transaction and its items (call before commit)"""
+    cursor.execute(f"""
+        SELECT {', '.join('t.' + f for f in SALE_FIELDS)}, u.username
+        FROM transactions t LEFT JOIN users u ON u.id = t.cashier_id
+        WHERE t.id = ?
+    """, (transaction_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    sale = dict(zip(SALE_FIELDS + ("cashier",), row))
+    cursor.execute(f"SELECT product_id, {', '.join(ITEM_FIELDS)} FROM transaction_items WHERE transaction_id = ?",
+                   (transaction_id,))
+    items = cursor.fetchall()
+    keys = product_keys(cursor, [item[0] for item in items])
+    sale["items"] = [[keys.get(item[0])] + list(item[1:]) for item in items]
+    log_change(cursor, "sale", sale)
+
+
+class RegisterSync:
+    def __init__(self, db_path=DATABASE_NAME, sync_dir=SYNC_DIR, interval=SYNC_INTERVAL, batch_size=SYNC_BATCH_SIZE,
+                 name=REGISTER_NAME):
+        self.db_path = db_path
+        self.sync_dir = sync_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.name = name or socket.gethostname()
+
+        conn = self._connect()
+        create_sync_tables(conn.cursor(), db_path)
+        conn.commit()
+        self.register_id = register_id(conn.cursor())
+        conn.close()
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_result = None
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _batch_dir(self, register):
+        return os.path.join(self.sync_dir, register)
+
+    # --- Outgoing ---
+    def _claim_folder(self):
+        """Create this register's batch folder, refusing one another register already writes to"""
+        folder = self._batch_dir(self.register_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, OWNER_FILE)
+        owner = _read_json(path)
+        if owner is None:
+            _write_json(path, {"register": self.register_id, "name": self.name})
+        elif owner.get("name") != self.name:
+            raise RuntimeError(f"Sync folder {folder} is used by register '{owner.get('name')}' "
+                               f"(remove {OWNER_FILE} there if this register was renamed)")
+
+    def export(self):
+        """Write the local change log to batch files; returns the number of changes exported"""
+        self._claim_folder()
+        exported = 0
+        conn = self._connect()
+        try:
+            while True:
+                rows = conn.execute("SELECT seq, kind, payload, created_at FROM sync_log ORDER BY seq LIMIT ?",
+                                    (self.batch_size,)).fetchall()
+                if not rows:
+                    break
+                first, last = rows[0][0], rows[-1][0]
+                batch = {
+                    "register": self.register_id,
+                    "name": self.name,
+                    "changes": [[seq, kind, json.loads(payload), created_at] for seq, kind, payload, created_at in rows],
+                }
+                path = os.path.join(self._batch_dir(self.register_id), f"{first:012d}-{last:012d}{BATCH_SUFFIX}")
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(batch, f, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                # The batch file is the outbox from now on
+                conn.execute("DELETE FROM sync_log WHERE seq <= ?", (last,))
+                conn.commit()
+                exported += len(rows)
+        finally:
+            conn.close()
+        return exported
+
+    def pending_changes(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0]
+        finally:
+            conn.close()
+
+    # --- Incoming ---
+    def import_batches(self):
+        """Apply the batches of the other registers not seen yet; returns the number of changes applied"""
+        if not os.path.isdir(self.sync_dir):
+            return 0
+        applied = 0
+        conn = self._connect()
+        try:
+            watermarks = dict(conn.execute("SELECT register_id, last_seq FROM sync_peers").fetchall())
+            for register in sorted(os.listdir(self.sync_dir)):
+                folder = self._batch_dir(register)
+                if register == self.register_id or not os.path.isdir(folder):
+                    continue
+                last_seq = watermarks.get(register, 0)
+                for filename in sorted(os.listdir(folder)):
+                    if not filename.endswith(BATCH_SUFFIX):
+                        continue
+                    try:
+                        if int(filename[:-len(BATCH_SUFFIX)].split("-")[1]) <= last_seq:
+                            continue
+                    except (ValueError, IndexError):
+                        continue
+                    with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                        batch = json.load(f)
+                    applied += self._apply_batch(conn, register, batch, last_seq)
+                    last_seq = max(last_seq, batch["changes"][-1][0] if batch["changes"] else last_seq)
+        finally:
+            conn.close()
+        return applied
+
+    def _apply_batch(self, conn, register, batch, last_seq):
+        """Apply one batch and move the register's watermark in the same transaction"""
+        cursor = conn.cursor()
+        applied = 0
+        newest = last_seq
+        try:
+            for seq, kind, payload, created_at in batch["changes"]:
+                if seq <= last_seq:
+                    continue
+                if kind == "stock":
+                    self._apply_stock(cursor, payload)
+                elif kind == "product":
+                    self._apply_product(cursor, register, payload)
+                elif kind == "sale":
+                    self._apply_sale(cursor, register, payload)
+                newest = seq
+                applied += 1
+            cursor.execute("""
+                INSERT INTO sync_peers (register_id, name, last_seq, last_sync) VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(register_id) DO UPDATE SET name = excluded.name, last_seq = excluded.last_seq,
+                                                       last_sync = excluded.last_sync
+            """, (register, batch.get("name"), newest))
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+        return applied
+
+    def _apply_stock(self, cursor, payload):
+        # Deltas commute: every register ends up with the same sum whatever the arrival order
+        cursor.executemany("UPDATE products SET stock = stock + ? WHERE sync_key = ?",
+                           [(delta, key) for key, delta in payload["deltas"]])
+
+    def _apply_product(self, cursor, register, payload):
+        key = payload["key"]
+        version = (payload["edited_at"], register)
+        cursor.execute("SELECT edited_at, register_id FROM sync_versions WHERE sync_key = ?", (key,))
+        current = cursor.fetchone()
+        if current is not None and tuple(current) >= version:
+            return  # A newer edit already won
+        cursor.execute("INSERT OR REPLACE INTO sync_versions (sync_key, edited_at, register_id) VALUES (?, ?, ?)",
+                       (key, payload["edited_at"], register))
+
+        if payload.get("deleted"):
+            cursor.execute("DELETE FROM products WHERE sync_key = ?", (key,))
+            return
+        fields = payload["fields"]
+        cursor.execute("SELECT id FROM products WHERE sync_key = ?", (key,))
+        row = cursor.fetchone()
+        for attempt in range(2):
+            try:
+                if row:
+                    cursor.execute(f"UPDATE products SET {', '.join(f + ' = ?' for f in PRODUCT_FIELDS)} WHERE id = ?",
+                                   [fields[f] for f in PRODUCT_FIELDS] + [row[0]])
+                else:
+                    # Stock of a new product arrives as a delta
+                    cursor.execute(f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}, stock, sync_key) "
+                                   f"VALUES ({', '.join('?' * len(PRODUCT_FIELDS))}, 0, ?)",
+                                   [fields[f] for f in PRODUCT_FIELDS] + [key])
+                return
+            except sqlite3.IntegrityError as e:
+                if attempt or not fields.get("barcode"):
+                    raise
+                print(f"Sync: barcode of {fields['name']} already used here, kept without barcode ({e})")
+                fields = dict(fields, barcode=None)
+
+    def _apply_sale(self, cursor, register, sale):
+        cursor.execute("SELECT id FROM users WHERE username = ?", (sale.get("cashier"),))
+        row = cursor.fetchone()
+        cashier_id = row[0] if row else None
+        number = sale["transaction_number"]
+        cursor.execute("SELECT 1 FROM transactions WHERE transaction_number = ?", (number,))
+        if cursor.fetchone():
+            number = f"{number}-{register[:6]}"
+            cursor.execute("SELECT 1 FROM transactions WHERE transaction_number = ?", (number,))
+            if cursor.fetchone():
+                return  # Already copied
+        values = dict(sale, transaction_number=number)
+        cursor.execute(f"INSERT INTO transactions ({', '.join(SALE_FIELDS)}, cashier_id) "
+                       f"VALUES ({', '.join('?' * len(SALE_FIELDS))}, ?)",
+                       [values[f] for f in SALE_FIELDS] + [cashier_id])
+        transaction_id = cursor.lastrowid
+
+        keys = [item[0] for item in sale["items"] if item[0]]
+        product_ids = {}
+        if keys:
+            cursor.execute(f"SELECT sync_key, id FROM products WHERE sync_key IN ({','.join('?' * len(keys))})", keys)
+            product_ids = dict(cursor.fetchall())
+        cursor.executemany(f"INSERT INTO transaction_items (transaction_id, product_id, {', '.join(ITEM_FIELDS)}) "
+                           f"VALUES (?, ?, {', '.join('?' * len(ITEM_FIELDS))})",
+                           [[transaction_id, product_ids.get(item[0])] + list(item[1:]) for item in sale["items"]])
+
+    # --- Exchange ---
+    def exchange(self):
+        """Send local changes and apply the other registers' changes; returns (sent, received)"""
+        with self._lock:
+            sent = self.export()
+            received = self.import_batches()
+            self.last_result = (datetime.now(), sent, received)
+            return sent, received
+
+    def start(self):
+        """Exchange changes every interval seconds on a background thread"""
+        if not self.sync_dir or not self.interval or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="RegisterSync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.exchange()
+            except Exception as e:
+                print(f"Register sync error: {e}")
+            if self._stop_event.wait(self.interval):
+                return
+
+
+def main():
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Exchange changes with the other registers")
+    parser.add_argument("--db", default=DATABASE_NAME, help="register database")
+    parser.add_argument("--dir", default=SYNC_DIR or os.environ.get("POS_SYNC_DIR", ""), help="shared sync folder")
+    parser.add_argument("--name", default=REGISTER_NAME, help="register name")
+    parser.add_argument("--watch", action="store_true", help=f"keep exchanging every {SYNC_INTERVAL}s")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("no sync folder (set --dir, SYNC_DIR or POS_SYNC_DIR)")
+
+    sync = RegisterSync(args.db, args.dir, name=args.name)
+    while True:
+        sent, received = sync.exchange()
+        print(f"[{datetime.now():%H:%M:%S}] {sync.name}: sent {sent}, received {received}")
+        if not args.watch:
+            break
+        time.sleep(SYNC_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
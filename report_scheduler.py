@@ -0,0 +1,276 @@
+"""
+End-of-day report pipeline for the POS System
+At the configured close time the day's summary PDF is generated in a separate
+worker process, filed under a dated reports folder and queued for email
+"""
+import os
+import sqlite3
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from config import DATABASE_NAME, REPORTS_DIR, END_OF_DAY_REPORT_TIME, END_OF_DAY_CHECK_INTERVAL, END_OF_DAY_JOB_TIMEOUT
+from email_outbox import EmailOutbox
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class ReportSource:
+    """
+    Read-only stand-in for Database used by DetailedReportGenerator in the worker
+    process (and the core service, which uses it from one thread at a time)
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+    def get_transaction_items(self, transaction_id):
+        """Get items for a specific transaction"""
+        self.cursor.execute(
+            "SELECT * FROM transaction_items WHERE transaction_id = ?",
+            (transaction_id,)
+        )
+        return self.cursor.fetchall()
+
+    def get_change_counters(self, names):
+        """Same as Database.get_change_counters (keys the core service's report cache)"""
+        placeholders = ", ".join("?" for _ in names)
+        self.cursor.execute(f"SELECT name, version FROM change_counters WHERE name IN ({placeholders})", tuple(names))
+        versions = dict(self.cursor.fetchall())
+        return tuple(versions.get(name, 0) for name in names)
+
+    def close(self):
+        self.conn.close()
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def run_end_of_day_job(db_path, report_date, reports_dir):
+    """
+    Worker process entry point: build the summary PDF for report_date,
+    store it in reports_dir/<report_date>/ and queue it for email.
+    The outcome is written to the end_of_day_reports table.
+    """
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        from views.admin.report_generator import DetailedReportGenerator
+
+        day_dir = os.path.join(reports_dir, report_date)
+        os.makedirs(day_dir, exist_ok=True)
+
+        source = ReportSource(db_path)
+        try:
+            gen = DetailedReportGenerator(source, output_dir=day_dir)
+            path = gen.generate_summary_report(
+                "today", "pdf", report_date=datetime.strptime(report_date, "%Y-%m-%d").date()
+            )
+        finally:
+            source.close()
+        if not path:
+            raise RuntimeError("PDF export unavailable (fpdf is not installed)")
+
+        # Only queue when email is configured; the PDF stays on disk either way
+        email_id = None
+        settings = conn.execute("SELECT * FROM email_settings WHERE id = 1").fetchone()
+        if settings and settings[1] and settings[3]:
+            subject = f"POS End-of-Day Summary ({report_date})"
+            body = (f"Attached is the end-of-day summary report for {report_date}, including order types, "
+                    f"sold items, ingredients used, and add-ons sold.\n\nGenerated by POS System.")
+            email_id = EmailOutbox(db_path).enqueue(subject, body, path)
+
+        with conn:
+            conn.execute("""
+                UPDATE end_of_day_reports SET status = ?, file_path = ?, email_id = ?, error = NULL, finished_at = ?
+                WHERE report_date = ?
+            """, (STATUS_DONE, path, email_id, _now(), report_date))
+    except Exception as e:
+        with conn:
+            conn.execute("""
+                UPDATE end_of_day_reports SET status = ?, error = ?, finished_at = ?
+                WHERE report_date = ?
+            """, (STATUS_FAILED, str(e), _now(), report_date))
+        raise
+    finally:
+        conn.close()
+
+
+class EndOfDayScheduler:
+    def __init__(self, db_path=DATABASE_NAME, reports_dir=REPORTS_DIR, close_time=END_OF_DAY_REPORT_TIME,
+                 check_interval=END_OF_DAY_CHECK_INTERVAL, job_timeout=END_OF_DAY_JOB_TIMEOUT, outbox=None):
+        self.db_path = db_path
+        self.reports_dir = reports_dir
+        self.close_time = datetime.strptime(close_time, "%H:%M").time()
+        self.check_interval = check_interval
+        self.job_timeout = job_timeout
+        # Outbox of the running app, woken once a report has been queued
+        self.outbox = outbox
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS end_of_day_reports (
+                report_date TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                file_path TEXT,
+                email_id INTEGER,
+                error TEXT,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get_run(self, report_date):
+        """Get (status, file_path, email_id, error) for a report date (YYYY-MM-DD)"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT status, file_path, email_id, error FROM end_of_day_reports WHERE report_date = ?",
+                (report_date,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def due_date(self, now=None):
+        """
+        Date whose report should exist by now: today once the close time has
+        passed, otherwise yesterday (catch-up when the app was closed at close time)
+        """
+        now = now or datetime.now()
+        if now.time() >= self.close_time:
+            return now.date()
+        return now.date() - timedelta(days=1)
+
+    def check(self, now=None):
+        """Run the report for the due date if it has not been produced yet"""
+        report_date = self.due_date(now)
+        if report_date < (now or datetime.now()).date():
+            # Only catch up a missed day that actually had sales
+            conn = self._connect()
+            try:
+                has_sales = conn.execute(
+                    "SELECT 1 FROM transactions WHERE DATE(created_at) = ? LIMIT 1",
+                    (report_date.strftime("%Y-%m-%d"),)
+                ).fetchone()
+            finally:
+                conn.close()
+            if not has_sales:
+                return None
+        return self.run_report(report_date)
+
+    def _claim(self, report_date, force):
+        """Mark report_date as running unless it is done (or already in progress)"""
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT status, started_at, finished_at FROM end_of_day_reports WHERE report_date = ?",
+                    (report_date,)
+                ).fetchone()
+                if row:
+                    status, started_at, finished_at = row
+                    if status == STATUS_DONE and not force:
+                        return False
+                    if status == STATUS_FAILED and not force and finished_at:
+                        # Scheduled retries of a failed day at most once per hour
+                        finished = datetime.strptime(finished_at, "%Y-%m-%d %H:%M:%S")
+                        if datetime.now() - finished < timedelta(hours=1):
+                            return False
+                    if status == STATUS_RUNNING and started_at:
+                        started = datetime.strptime(started_at, "%Y-%m-%d %H:%M:%S")
+                        if datetime.now() - started < timedelta(seconds=self.job_timeout):
+                            return False
+                conn.execute("""
+                    INSERT OR REPLACE INTO end_of_day_reports (report_date, status, started_at)
+                    VALUES (?, ?, ?)
+                """, (report_date, STATUS_RUNNING, _now()))
+                return True
+        finally:
+            conn.close()
+
+    def run_report(self, report_date, force=False):
+        """
+        Generate the report for report_date in a worker process and wait for it
+        (call from a background thread). Returns the run row, or None if skipped.
+        """
+        report_date = report_date.strftime("%Y-%m-%d")
+        if not self._claim(report_date, force):
+            return None
+        return self._execute(report_date)
+
+    def _execute(self, report_date):
+        """Run the worker process for an already claimed report date"""
+        with self._lock:
+            # spawn: never fork a process that owns a Tk interpreter
+            ctx = multiprocessing.get_context("spawn")
+            process = ctx.Process(
+                target=run_end_of_day_job,
+                args=(self.db_path, report_date, self.reports_dir),
+                name=f"EndOfDayReport-{report_date}",
+                daemon=True
+            )
+            process.start()
+            process.join(self.job_timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+            run = self.get_run(report_date)
+            if run and run[0] == STATUS_RUNNING:
+                # Worker died or timed out before recording a result
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute("""
+                            UPDATE end_of_day_reports SET status = ?, error = ?, finished_at = ?
+                            WHERE report_date = ?
+                        """, (STATUS_FAILED, f"Report worker exited with code {process.exitcode}", _now(), report_date))
+                finally:
+                    conn.close()
+                run = self.get_run(report_date)
+
+        if run and run[2] and self.outbox is not None:
+            self.outbox.wake()
+        return run
+
+    def run_now(self, report_date=None):
+        """Close the day on demand (regenerates the report); returns immediately"""
+        report_date = (report_date or datetime.now().date()).strftime("%Y-%m-%d")
+        # Claim here so callers polling get_run() never see the previous result
+        if self._claim(report_date, True):
+            threading.Thread(
+                target=self._execute, args=(report_date,), name="EndOfDayReportNow", daemon=True
+            ).start()
+        return report_date
+
+    # --- Scheduler thread ---
+    def start(self):
+        """Start checking for the close time in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="EndOfDayScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler (a report already being generated is left to finish)"""
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print(f"End-of-day report error: {e}")
+            self._stop_event.wait(self.check_interval)
@@ -0,0 +1,102 @@
+"""
+In-memory sellability index for the POS System
+Keeps "how many units can still be sold" per product, from the product's own
+stock (or availability switch) and the stock of the ingredients in its recipe,
+so the cashier can check a product tap without querying the database.
+Stock deltas are applied in place and only recompute the products they affect.
+"""
+
+# Max units of a product that has no limit (availability mode, no recipe)
+UNLIMITED = float("inf")
+
+
+class SellabilityIndex:
+    def __init__(self, products, recipes, version=None):
+        """
+        products: rows of (id, name, stock, use_stock_tracking, is_available)
+        recipes: rows of (product_id, ingredient_id, quantity per product)
+        """
+        self.version = version
+        self._names = {}
+        self._stock = {}
+        self._tracked = {}
+        self._available = {}
+        for pid, name, stock, use_stock_tracking, is_available in products:
+            self._names[pid] = name
+            self._stock[pid] = stock or 0
+            self._tracked[pid] = use_stock_tracking if use_stock_tracking is not None else 1
+            self._available[pid] = is_available if is_available is not None else 1
+
+        # Recipe per product and, for incremental updates, the products using each ingredient
+        self._recipes = {}
+        self._used_by = {}
+        for pid, ingredient_id, qty in recipes:
+            if pid not in self._names:
+                continue
+            self._recipes.setdefault(pid, []).append((ingredient_id, qty or 0))
+            self._used_by.setdefault(ingredient_id, set()).add(pid)
+
+        self._units = {pid: self._compute(pid) for pid in self._names}
+
+    def _own_units(self, pid):
+        if self._tracked[pid] == 0:
+            return UNLIMITED if self._available[pid] == 1 else 0
+        stock = self._stock[pid]
+        return int(stock) if stock > 0 else 0
+
+    def _ingredient_units(self, ingredient_id, qty):
+        """Units of a product the ingredient can still supply (None: no limit)"""
+        if qty <= 0 or ingredient_id not in self._stock:
+            return None
+        stock = self._stock[ingredient_id]
+        return int(stock // qty) if stock > 0 else 0
+
+    def _compute(self, pid):
+        units = self._own_units(pid)
+        for ingredient_id, qty in self._recipes.get(pid, ()):
+            supply = self._ingredient_units(ingredient_id, qty)
+            if supply is not None and supply < units:
+                units = supply
+        return units
+
+    def max_units(self, pid):
+        """Units of the product that can be sold right now (UNLIMITED if no limit, 0 if unknown)"""
+        return self._units.get(pid, 0)
+
+    def can_sell(self, pid, quantity=1):
+        return self.max_units(pid) >= quantity
+
+    def stock(self, pid):
+        return self._stock.get(pid, 0)
+
+    def reason(self, pid):
+        """Why the product cannot be sold (message for the cashier), or None"""
+        if pid not in self._names:
+            return "This product no longer exists"
+        if self._own_units(pid) <= 0:
+            return "This product is currently unavailable" if self._tracked[pid] == 0 else "This product is out of stock"
+        for ingredient_id, qty in self._recipes.get(pid, ()):
+            supply = self._ingredient_units(ingredient_id, qty)
+            if supply is not None and supply <= 0:
+                ing_name = self._names[ingredient_id]
+                ing_stock = self._stock[ingredient_id]
+                if ing_stock <= 0:
+                    return f"Cannot sell {self._names[pid]}.\n\nReason: Ingredient '{ing_name}' is Out of Stock!"
+                return (f"Cannot sell {self._names[pid]}.\n\nReason: Not enough '{ing_name}'.\n"
+                        f"(Need {qty}, Have {ing_stock})")
+        return None
+
+    def apply_delta(self, pid, delta=0, value=None, floor=None):
+        """
+        Mirror a stock change: stock += delta (not below floor), or stock = value.
+        Recomputes the product and every product whose recipe uses it.
+        """
+        if pid not in self._stock:
+            return
+        stock = self._stock[pid] + delta if value is None else value
+        if floor is not None and stock < floor:
+            stock = floor
+        self._stock[pid] = stock
+        self._units[pid] = self._compute(pid)
+        for user in self._used_by.get(pid, ()):
+            self._units[user] = self._compute(user)
@@ -0,0 +1,41 @@
+"""
+Startup timing for the POS System
+Records how long each startup phase took (imports, window, database,
+first login view, ...) and appends a one-line summary per launch to the
+startup report file.
+"""
+import time
+from datetime import datetime
+
+
+class StartupTimer:
+    def __init__(self, name="Startup"):
+        self.name = name
+        self.start = time.perf_counter()
+        self.marks = []
+        self._last = self.start
+
+    def mark(self, label):
+        """Record the time since the previous mark under label"""
+        now = time.perf_counter()
+        self.marks.append((label, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.start) * 1000
+
+    def summary(self):
+        parts = [f"{label} {ms:.0f}ms" for label, ms in self.marks]
+        return f"total {self.total_ms():.0f}ms: " + ", ".join(parts)
+
+    def report(self, path=None):
+        """Print the summary and append it to path (if given)"""
+        line = f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {self.name} {self.summary()}"
+        print(line)
+        if path:
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Could not write startup report: {e}")
+        return line
@@ -1,69 +1,196 @@
 import sqlite3
 import os
 import time
+import threading
 from datetime import datetime
+from receipt_store import ReceiptStore
+from config import (DATABASE_NAME, RECEIPTS_DIR, RECEIPTS_KEEP_DAYS, MAINTENANCE_SLICE_SECONDS, MAINTENANCE_IDLE_SECONDS, MAINTENANCE_INTERVAL,
+                    MAINTENANCE_VACUUM_PAGES, MAINTENANCE_ANALYSIS_LIMIT)
 
 class SystemOptimizer:
-    def __init__(self, db_path="pos.db", receipts_dir="receipts"):
+    def __init__(self, db_path=DATABASE_NAME, receipts_dir=RECEIPTS_DIR, slice_seconds=MAINTENANCE_SLICE_SECONDS,
+                 idle_seconds=MAINTENANCE_IDLE_SECONDS, interval=MAINTENANCE_INTERVAL):
         self.db_path = db_path
         self.receipts_dir = receipts_dir
+        self.slice_seconds = slice_seconds
+        self.idle_seconds = idle_seconds
+        self.interval = interval
 
-    def optimize_database(self):
-        """Runs SQLite maintenance commands to optimize performance."""
-        print(f"[{datetime.now()}] Starting Database Optimization...")
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Tables still to ANALYZE in the current round (one or more per slice)
+        self._analyze_queue = []
+        # Report of the most recent maintenance run (list of lines)
+        self.last_report = []
+
+    def _connect(self):
+        # Short busy timeout: maintenance gives way to sales instead of waiting on them
+        conn = sqlite3.connect(self.db_path, timeout=0.1)
+        conn.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+        return conn
+
+    def optimize_database(self, time_budget=None):
+        """
+        Runs one time-boxed slice of SQLite maintenance and returns a report (list of lines).
+        Each step is small (PRAGMA optimize, a few pages of incremental_vacuum,
+        a passive WAL checkpoint, ANALYZE of one table at a time) so it never holds
+        the database long; steps that find the database busy are skipped until next time.
+        """
+        budget = self.slice_seconds if time_budget is None else time_budget
+        deadline = time.monotonic() + budget
+        report = []
+        print(f"[{datetime.now()}] Starting Database Maintenance (budget {budget:.1f}s)...")
         if not os.path.exists(self.db_path):
             print("Database not found.")
-            return
+            return ["Database not found."]
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                steps = (self._step_optimize, self._step_incremental_vacuum,
+                         self._step_checkpoint, self._step_analyze)
+                for step in steps:
+                    if time.monotonic() >= deadline:
+                        report.append("Time budget used up, remaining steps deferred")
+                        break
+                    try:
+                        line = step(conn, deadline)
+                    except sqlite3.OperationalError as e:
+                        # "database is locked": a sale is writing, try again next slice
+                        line = f"{step.__name__[6:]}: skipped ({e})"
+                    if line:
+                        report.append(line)
+                        print(f"  - {line}")
+            finally:
+                conn.close()
+
+        self.last_report = report
+        print("Database maintenance slice completed.")
+        return report
 
+    def _step_optimize(self, conn, deadline):
+        conn.execute("PRAGMA optimize")
+        return "PRAGMA optimize done"
+
+    def _step_incremental_vacuum(self, conn, deadline):
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:
+            return "incremental vacuum: not enabled yet (one-time conversion from Settings)"
+        freed = 0
+        while time.monotonic() < deadline:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_pages:
+                break
+            pages = min(free_pages, MAINTENANCE_VACUUM_PAGES)
+            conn.execute(f"PRAGMA incremental_vacuum({pages})").fetchall()
+            conn.commit()
+            freed += pages
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return f"incremental vacuum: {freed} pages released, {remaining} free pages left"
+
+    def _step_checkpoint(self, conn, deadline):
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            return None
+        busy, log_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        return f"WAL checkpoint: {checkpointed}/{log_frames} frames copied" + (" (busy)" if busy else "")
+
+    def _step_analyze(self, conn, deadline):
+        if not self._analyze_queue:
+            self._analyze_queue = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+        done = []
+        while self._analyze_queue and time.monotonic() < deadline:
+            table = self._analyze_queue[0]
+            conn.execute(f'ANALYZE "{table}"')
+            conn.commit()
+            done.append(self._analyze_queue.pop(0))
+        if not done:
+            return None
+        return f"ANALYZE (limit {MAINTENANCE_ANALYSIS_LIMIT}): {', '.join(done)}" + \
+            (f" ({len(self._analyze_queue)} tables left this round)" if self._analyze_queue else "")
+
+    def uses_incremental_vacuum(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # VACUUM: Rebuilds the database file, repacking it into a minimal amount of disk space.
-            print("  - Running VACUUM...")
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        finally:
+            conn.close()
+
+    def convert_to_incremental_vacuum(self):
+        """
+        One-time switch of an existing database to auto_vacuum=INCREMENTAL.
+        This needs a full VACUUM, so it is only run on request (not during sales).
+        """
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             conn.execute("VACUUM")
-            
-            # ANALYZE: Gathers statistics about tables and indices to help the Query Optimizer.
-            print("  - Running ANALYZE...")
-            conn.execute("ANALYZE")
-            
+            return True
+        finally:
             conn.close()
-            print("Database optimization completed successfully.")
-        except Exception as e:
-            print(f"Error optimizing database: {e}")
 
-    def cleanup_old_receipts(self, days_to_keep=7):
-        """Removes receipt images and temporary files older than specified days."""
+    def cleanup_old_receipts(self, days_to_keep=RECEIPTS_KEEP_DAYS):
+        """Removes receipt images older than specified days (and oldest ones over the size cap)."""
         print(f"[{datetime.now()}] Cleaning up old receipts (older than {days_to_keep} days)...")
         if not os.path.exists(self.receipts_dir):
             print("Receipts directory not found.")
             return
-            
-        count = 0
-        deleted_size = 0
-        cutoff_time = time.time() - (days_to_keep * 86400)
-        
-        for filename in os.listdir(self.receipts_dir):
-            file_path = os.path.join(self.receipts_dir, filename)
-            if os.path.isfile(file_path):
-                # Filter for image files and logs
-                if filename.lower().endswith(('.bmp', '.png', '.jpg', '.txt')):
-                    file_mtime = os.path.getmtime(file_path)
-                    if file_mtime < cutoff_time:
-                        try:
-                            size = os.path.getsize(file_path)
-                            os.remove(file_path)
-                            count += 1
-                            deleted_size += size
-                        except Exception as e:
-                            print(f"  - Failed to delete {filename}: {e}")
-                            
+
+        store = ReceiptStore(self.db_path, self.receipts_dir)
+        # Pick up files saved outside the store (top level only, e.g. pre date-folder receipts)
+        store.rebuild_index(recursive=False)
+        count, deleted_size = store.cleanup(days_to_keep)
+
         print(f"Cleanup completed. Removed {count} files ({deleted_size / 1024:.2f} KB freed).")
 
     def run_all(self):
+        """Manual maintenance run with a larger time budget, then receipt cleanup"""
         print("\n=== SYSTEM OPTIMIZER STARTED ===")
-        self.optimize_database()
-        self.cleanup_old_receipts(days_to_keep=7)
+        report = self.optimize_database(time_budget=max(self.slice_seconds, 30))
+        self.cleanup_old_receipts()
         print("=== SYSTEM OPTIMIZER FINISHED ===\n")
+        return report
+
+    # --- Idle-time scheduler ---
+    def start(self):
+        """Run maintenance slices in the background whenever the database has been idle"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="SystemOptimizer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        # data_version changes whenever another connection commits, i.e. when the POS is busy
+        watcher = sqlite3.connect(self.db_path, timeout=1)
+        try:
+            last_version = None
+            last_change = time.monotonic()
+            last_run = 0
+            while not self._stop_event.wait(min(self.idle_seconds, 30)):
+                try:
+                    version = watcher.execute("PRAGMA data_version").fetchone()[0]
+                    now = time.monotonic()
+                    if version != last_version:
+                        last_version, last_change = version, now
+                        continue
+                    if now - last_change >= self.idle_seconds and now - last_run >= self.interval:
+                        self.optimize_database()
+                        last_run = time.monotonic()
+                        # Our own commits bump data_version; don't count them as activity
+                        last_version = watcher.execute("PRAGMA data_version").fetchone()[0]
+                except Exception as e:
+                    print(f"Maintenance error: {e}")
+        finally:
+            watcher.close()
 
 if __name__ == "__main__":
     optimizer = SystemOptimizer()
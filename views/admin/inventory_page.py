@@ -5,6 +5,9 @@ import customtkinter as ctk
 from tkinter import messagebox
 from datetime import datetime
 from config import COLORS, CURRENCY_SYMBOL
+from inventory_snapshot import InventorySnapshotService
+from product_index import NAME, BARCODE
+from views.debounce import Debouncer
 
 
 class InventoryPage:
@@ -16,7 +19,8 @@ class InventoryPage:
         self.tab_buttons = {}
         self.inventory_content = None
         self.selected_adj_product_id = None
-    
+        self.inventory_snapshot = InventorySnapshotService(database, threshold=10)
+
     def show(self):
         """Show inventory management page"""
         # Header
@@ -69,6 +73,10 @@ class InventoryPage:
         # Show default tab
         self.show_inventory_overview()
     
+    def refresh(self):
+        """Re-load the open tab after a data change"""
+        self.switch_inventory_tab(self.inventory_tab)
+    
     def switch_inventory_tab(self, tab):
         """Switch inventory tabs"""
         self.inventory_tab = tab
@@ -104,40 +112,14 @@ class InventoryPage:
         stats_frame = ctk.CTkFrame(self.inventory_content, fg_color="transparent")
         stats_frame.pack(fill="x", padx=20, pady=20)
         
-        # Get inventory data with caching
-        if not hasattr(self, '_inventory_cache') or not hasattr(self, '_inventory_cache_time'):
-            self._inventory_cache = {
-                'products': self.database.get_all_products(),
-                'low_stock': self.database.get_low_stock_products(10),
-                'out_of_stock': self.database.get_out_of_stock_products(),
-                'inventory_value': self.database.get_inventory_value()
-            }
-            self._inventory_cache_time = datetime.now()
-        else:
-            # Refresh cache if older than 30 seconds
-            if (datetime.now() - self._inventory_cache_time).seconds > 30:
-                self._inventory_cache = {
-                    'products': self.database.get_all_products(),
-                    'low_stock': self.database.get_low_stock_products(10),
-                    'out_of_stock': self.database.get_out_of_stock_products(),
-                    'inventory_value': self.database.get_inventory_value()
-                }
-                self._inventory_cache_time = datetime.now()
-        
-        all_products = self._inventory_cache['products']
-        low_stock = self._inventory_cache['low_stock']
-        out_of_stock = self._inventory_cache['out_of_stock']
-        inventory_value = self._inventory_cache['inventory_value']
-        
-        # Filter for stock tracked only for the count
-        # Indices: use_stock_tracking=12
-        stock_tracked_products = [p for p in all_products if (len(p) > 12 and p[12] == 1)]
-        
+        # Single-scan snapshot, recomputed only when the data has changed
+        snapshot = self.inventory_snapshot.get()
+
         stats = [
-            ("Stock Items", len(stock_tracked_products), COLORS["info"]),
-            ("Low Stock Items", len(low_stock), COLORS["warning"]),
-            ("Out of Stock", len(out_of_stock), COLORS["danger"]),
-            ("Inventory Value", f"{CURRENCY_SYMBOL}{inventory_value:.2f}", COLORS["success"])
+            ("Stock Items", snapshot.tracked_count, COLORS["info"]),
+            ("Low Stock Items", len(snapshot.low_stock), COLORS["warning"]),
+            ("Out of Stock", len(snapshot.out_of_stock), COLORS["danger"]),
+            ("Inventory Value", f"{CURRENCY_SYMBOL}{snapshot.inventory_value:.2f}", COLORS["success"])
         ]
         
         for label, value, color in stats:
@@ -219,18 +201,8 @@ class InventoryPage:
     
     def show_low_stock(self):
         """Show low stock products with lazy loading optimization"""
-        from datetime import datetime
-        
-        # Get low stock products with caching
-        if not hasattr(self, '_low_stock_cache') or not hasattr(self, '_low_stock_cache_time'):
-            self._low_stock_cache = self.database.get_low_stock_products(10)
-            self._low_stock_cache_time = datetime.now()
-        else:
-            if (datetime.now() - self._low_stock_cache_time).seconds > 30:
-                self._low_stock_cache = self.database.get_low_stock_products(10)
-                self._low_stock_cache_time = datetime.now()
-        
-        low_stock_raw = self._low_stock_cache
+        # Low stock list comes from the shared inventory snapshot
+        low_stock_raw = self.inventory_snapshot.get().low_stock
         
         # Filter for only stock-tracked items
         # Indices: use_stock_tracking=12
@@ -420,6 +392,16 @@ class InventoryPage:
             font=ctk.CTkFont(size=10, weight="bold"),
             fg_color=COLORS["info"]
         ).pack(side="right")
+
+        ctk.CTkButton(
+            search_header,
+            text="📦 Batch Stock In",
+            command=lambda: self.show_batch_stock_modal("add", on_success=lambda: refresh_product_list()),
+            height=24,
+            width=100,
+            font=ctk.CTkFont(size=10, weight="bold"),
+            fg_color=COLORS["success"]
+        ).pack(side="right", padx=(0, 5))
         
         search_var = ctk.StringVar()
         search_entry = ctk.CTkEntry(
@@ -441,32 +423,29 @@ class InventoryPage:
         )
         products_frame.pack(fill="both", expand=True, padx=15, pady=(0, 15))
         
+        # Shared in-memory index; refreshed after a stock change, not per keystroke
+        picker_index = [self.database.get_product_index()]
+        
+        def refresh_product_list():
+            picker_index[0] = self.database.get_product_index()
+            update_product_list()
+        
         def update_product_list(*args):
             for widget in products_frame.winfo_children():
                 widget.destroy()
             
-            search_term = search_var.get().lower()
-            all_products = self.database.get_all_products()
-            
-            # Filter matches
-            filtered = []
-            for p in all_products:
-                use_stock = p[12] if len(p) > 12 and p[12] is not None else 1
-                if use_stock == 0: continue
-                
-                if search_term in p[1].lower() or (p[5] and search_term in p[5].lower()):
-                    filtered.append(p)
+            filtered = self._search_stock_products(picker_index[0], search_var.get())
             
             if not filtered:
                 ctk.CTkLabel(products_frame, text="No products found", text_color=COLORS["text_secondary"]).pack(pady=10)
                 return
             
-            for product in filtered[:20]: # Show top 20 matches
+            for product in filtered: # Top 20 matches
                 stock_color = COLORS["danger"] if product[4] < 10 else COLORS["text_primary"]
                 btn = ctk.CTkButton(
                     products_frame,
                     text=f"{product[1]} - Stock: {product[4]}",
-                    command=lambda p=product: self.open_stock_modal(p, "add", lambda: update_product_list()),
+                    command=lambda p=product: self.open_stock_modal(p, "add", refresh_product_list),
                     height=40,
                     font=ctk.CTkFont(size=15, weight="bold"),
                     fg_color="transparent",
@@ -476,7 +455,8 @@ class InventoryPage:
                 )
                 btn.pack(fill="x", pady=1, padx=3)
         
-        search_var.trace("w", update_product_list)
+        search_debouncer = Debouncer(products_frame, 150, update_product_list)
+        search_var.trace("w", search_debouncer.trigger)
         update_product_list()
 
     
@@ -535,32 +515,29 @@ class InventoryPage:
         )
         products_frame.pack(fill="both", expand=True, padx=15, pady=(0, 15))
         
+        # Shared in-memory index; refreshed after a stock change, not per keystroke
+        picker_index = [self.database.get_product_index()]
+        
+        def refresh_product_list():
+            picker_index[0] = self.database.get_product_index()
+            update_product_list()
+        
         def update_product_list(*args):
             for widget in products_frame.winfo_children():
                 widget.destroy()
             
-            search_term = search_var.get().lower()
-            all_products = self.database.get_all_products()
-            
-            # Filter matches
-            filtered = []
-            for p in all_products:
-                use_stock = p[12] if len(p) > 12 and p[12] is not None else 1
-                if use_stock == 0: continue
-                
-                if search_term in p[1].lower() or (p[5] and search_term in p[5].lower()):
-                    filtered.append(p)
+            filtered = self._search_stock_products(picker_index[0], search_var.get())
             
             if not filtered:
                 ctk.CTkLabel(products_frame, text="No products found", text_color=COLORS["text_secondary"]).pack(pady=10)
                 return
             
-            for product in filtered[:20]:
+            for product in filtered:
                 stock_color = COLORS["danger"] if product[4] < 10 else COLORS["text_primary"]
                 btn = ctk.CTkButton(
                     products_frame,
                     text=f"{product[1]} - Stock: {product[4]}",
-                    command=lambda p=product: self.open_stock_modal(p, "remove", lambda: update_product_list()),
+                    command=lambda p=product: self.open_stock_modal(p, "remove", refresh_product_list),
                     height=40,
                     font=ctk.CTkFont(size=15, weight="bold"),
                     fg_color="transparent",
@@ -570,9 +547,20 @@ class InventoryPage:
                 )
                 btn.pack(fill="x", pady=1, padx=3)
         
-        search_var.trace("w", update_product_list)
+        search_debouncer = Debouncer(products_frame, 150, update_product_list)
+        search_var.trace("w", search_debouncer.trigger)
         update_product_list()
 
+    def _search_stock_products(self, index, search_term, limit=20):
+        """Stock-tracked products matching a name/barcode search"""
+        # Indices: use_stock_tracking=12
+        return index.search(
+            search_term,
+            fields=(NAME, BARCODE),
+            predicate=lambda p: (p[12] if len(p) > 12 and p[12] is not None else 1) != 0,
+            limit=limit
+        )
+
     def open_stock_modal(self, product, mode, on_success=None):
         """Open modal for adding/removing stock"""
         is_add = (mode == "add")
@@ -648,7 +636,13 @@ class InventoryPage:
                 return
             
             change = qty if is_add else -qty
-            self.database.update_product_stock(product[0], change)
+            
+            # Stock update + adjustment record in one transaction
+            adj_type = "add" if is_add else "remove"
+            self.database.apply_stock_adjustments(
+                [{'product_id': product[0], 'adjustment_type': adj_type, 'quantity': qty, 'reason': reason_var.get()}],
+                self.user_data['id']
+            )
             
             # Log
             act_type = "Stock In" if is_add else "Stock Out"
@@ -656,14 +650,6 @@ class InventoryPage:
             details = f"{act_type}: {product[1]} {change:+} ({reason_var.get()}) {notes}"
             self.database.log_activity(self.user_data['id'], self.user_data['username'], act_type, details)
             
-            # Stock Adjustment Log
-            adj_type = "add" if is_add else "remove"
-            self.database.cursor.execute("""
-                INSERT INTO stock_adjustments (product_id, adjustment_type, quantity, reason, user_id)
-                VALUES (?, ?, ?, ?, ?)
-            """, (product[0], adj_type, qty, reason_var.get(), self.user_data['id']))
-            self.database.conn.commit()
-            
             messagebox.showinfo("Success", "Stock Updated")
             modal.destroy()
             if on_success: on_success()
@@ -829,6 +815,156 @@ class InventoryPage:
                 
                 ctk.CTkLabel(row, text=f"{CURRENCY_SYMBOL}{p[3]:.2f}", width=80, anchor="e", text_color=COLORS["success"]).pack(side="right", padx=10)
 
+    def show_batch_stock_modal(self, mode="add", on_success=None):
+        """Open modal for entering many stock adjustments and saving them in one transaction"""
+        is_add = (mode == "add")
+        color = COLORS["success"] if is_add else COLORS["danger"]
+        
+        modal = ctk.CTkToplevel(self.parent)
+        modal.title("Batch Stock In" if is_add else "Batch Stock Out")
+        modal.geometry("700x650")
+        
+        # Center modal
+        x = (modal.winfo_screenwidth() - 700) // 2
+        y = (modal.winfo_screenheight() - 650) // 2
+        modal.geometry(f"+{x}+{y}")
+        
+        modal.configure(fg_color=COLORS["dark"])
+        modal.transient(self.parent)
+        modal.grab_set()
+        
+        ctk.CTkLabel(
+            modal,
+            text="📦 Batch Stock In" if is_add else "📦 Batch Stock Out",
+            font=ctk.CTkFont(size=20, weight="bold"),
+            text_color=COLORS["text_primary"]
+        ).pack(pady=(20, 5), padx=20, anchor="w")
+        
+        ctk.CTkLabel(
+            modal,
+            text="Search and click products to add them to the batch, enter quantities, then save everything at once.",
+            font=ctk.CTkFont(size=11),
+            text_color=COLORS["text_secondary"]
+        ).pack(padx=20, anchor="w")
+        
+        # Product search (in-memory index)
+        product_index = self.database.get_product_index()
+        search_var = ctk.StringVar()
+        ctk.CTkEntry(
+            modal,
+            placeholder_text="🔍 Search product or scan barcode...",
+            textvariable=search_var,
+            height=32
+        ).pack(fill="x", padx=20, pady=(10, 5))
+        
+        results_frame = ctk.CTkScrollableFrame(modal, fg_color=COLORS["card_bg"], height=150)
+        results_frame.pack(fill="x", padx=20)
+        
+        # Batch lines: product_id -> (product, qty_entry, row)
+        batch = {}
+        
+        ctk.CTkLabel(modal, text="BATCH ITEMS", font=ctk.CTkFont(size=12, weight="bold")).pack(anchor="w", padx=20, pady=(10, 0))
+        batch_frame = ctk.CTkScrollableFrame(modal, fg_color=COLORS["card_bg"])
+        batch_frame.pack(fill="both", expand=True, padx=20, pady=(5, 10))
+        
+        # Footer is packed below the batch list; created here so the count label exists
+        footer = ctk.CTkFrame(modal, fg_color="transparent")
+        count_label = ctk.CTkLabel(footer, text="0 products", text_color=COLORS["text_secondary"])
+        
+        def add_to_batch(product):
+            if product[0] in batch:
+                batch[product[0]][1].focus()
+                return
+            row = ctk.CTkFrame(batch_frame, fg_color="transparent")
+            row.pack(fill="x", pady=2)
+            ctk.CTkLabel(row, text=f"{product[1]} (Stock: {product[4]})", anchor="w").pack(side="left", padx=10)
+            ctk.CTkButton(
+                row, text="✕", width=30, height=28, fg_color="transparent", hover_color=COLORS["danger"],
+                command=lambda pid=product[0]: remove_from_batch(pid)
+            ).pack(side="right", padx=(5, 10))
+            qty_entry = ctk.CTkEntry(row, width=80, height=28, placeholder_text="Qty")
+            qty_entry.pack(side="right")
+            qty_entry.focus()
+            batch[product[0]] = (product, qty_entry, row)
+            count_label.configure(text=f"{len(batch)} products")
+        
+        def remove_from_batch(product_id):
+            entry = batch.pop(product_id, None)
+            if entry:
+                entry[2].destroy()
+            count_label.configure(text=f"{len(batch)} products")
+        
+        def update_results():
+            for widget in results_frame.winfo_children():
+                widget.destroy()
+            for product in self._search_stock_products(product_index, search_var.get()):
+                ctk.CTkButton(
+                    results_frame,
+                    text=f"{product[1]} - Stock: {product[4]}",
+                    command=lambda p=product: add_to_batch(p),
+                    height=30,
+                    fg_color="transparent",
+                    hover_color=COLORS["primary"],
+                    anchor="w"
+                ).pack(fill="x", pady=1)
+        
+        search_debouncer = Debouncer(results_frame, 150, update_results)
+        search_var.trace("w", search_debouncer.trigger)
+        update_results()
+        
+        # Reason + notes apply to the whole batch
+        footer.pack(fill="x", padx=20, pady=(0, 10))
+        
+        reasons = ["Purchase", "Return", "Adjustment", "Other"] if is_add else ["Damage", "Expired", "Theft", "Use", "Other"]
+        reason_var = ctk.StringVar(value=reasons[0])
+        ctk.CTkOptionMenu(footer, values=reasons, variable=reason_var, width=140, fg_color=COLORS["card_bg"], button_color=COLORS["primary"]).pack(side="left")
+        notes_entry = ctk.CTkEntry(footer, placeholder_text="Notes (e.g. delivery #)...", height=30)
+        notes_entry.pack(side="left", fill="x", expand=True, padx=10)
+        count_label.pack(side="right")
+        
+        def save():
+            adjustments = []
+            for product, qty_entry, _ in batch.values():
+                try:
+                    qty = int(qty_entry.get())
+                    if qty <= 0: raise ValueError
+                except:
+                    messagebox.showerror("Error", f"Invalid quantity for {product[1]}", parent=modal)
+                    qty_entry.focus()
+                    return
+                if not is_add and qty > product[4]:
+                    messagebox.showerror("Error", f"Insufficient stock for {product[1]}", parent=modal)
+                    qty_entry.focus()
+                    return
+                adjustments.append({
+                    'product_id': product[0],
+                    'adjustment_type': mode,
+                    'quantity': qty,
+                    'reason': reason_var.get()
+                })
+            
+            if not adjustments:
+                messagebox.showerror("Error", "Add at least one product to the batch", parent=modal)
+                return
+            
+            try:
+                count = self.database.apply_stock_adjustments(
+                    adjustments, self.user_data['id'], self.user_data['username'],
+                    note=f"({reason_var.get()}) {notes_entry.get()}"
+                )
+            except Exception as e:
+                messagebox.showerror("Error", f"Batch not saved: {e}", parent=modal)
+                return
+            
+            messagebox.showinfo("Success", f"Stock updated for {count} products")
+            modal.destroy()
+            if on_success: on_success()
+        
+        ctk.CTkButton(
+            modal, text="SAVE BATCH", height=40, font=ctk.CTkFont(weight="bold"),
+            fg_color=color, hover_color=color, command=save
+        ).pack(fill="x", padx=20, pady=(0, 20))
+    
     def show_all_items_modal(self):
         """Show modal with all items and stock levels"""
         modal = ctk.CTkToplevel(self.parent)
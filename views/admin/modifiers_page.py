@@ -4,6 +4,8 @@ Modifiers management page for admin view
 import customtkinter as ctk
 from tkinter import messagebox
 from config import COLORS, CURRENCY_SYMBOL
+from product_index import NAME, BARCODE
+from views.debounce import Debouncer
 
 class ModifiersPage:
     def __init__(self, parent, database):
@@ -50,6 +52,10 @@ class ModifiersPage:
         
         self.load_modifiers()
 
+    def refresh(self):
+        """Re-load the modifier list after a data change"""
+        self.load_modifiers()
+
     def load_modifiers(self):
         """Load and display all global modifiers"""
         for widget in self.content_frame.winfo_children():
@@ -183,14 +189,17 @@ class ModifiersPage:
         # 1. Select Product (Required) - Moved to TOP
         ctk.CTkLabel(form_frame, text="Select Inventory Product (Required)", font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=20, pady=(20, 5))
         
-        all_products = self.database.get_all_products()
+        product_index = self.database.get_product_index()
+        all_products = product_index.products
         
         # Filter: Only stock-tracked products can be ingredients
         # Indices: use_stock_tracking=12
-        stock_tracked = [p for p in all_products if (len(p) > 12 and p[12] == 1)]
+        is_stock_tracked = lambda p: len(p) > 12 and p[12] == 1
+        stock_tracked = [p for p in all_products if is_stock_tracked(p)]
         
         # Map Display -> ID
-        prod_map = {f"{p[1]} (Stock: {p[4]})": p[0] for p in stock_tracked}
+        prod_label = lambda p: f"{p[1]} (Stock: {p[4]})"
+        prod_map = {prod_label(p): p[0] for p in stock_tracked}
         prod_options = ["Select a product..."] + sorted(list(prod_map.keys()))
         
         prod_var = ctk.StringVar(value="Select a product...")
@@ -208,9 +217,24 @@ class ModifiersPage:
         elif is_edit:
              prod_var.set("Legacy Custom Modifier") # If editing a legacy item with no link
 
+        # Search box narrows the dropdown using the in-memory product index
+        prod_search_var = ctk.StringVar()
+        ctk.CTkEntry(form_frame, placeholder_text="🔍 Filter products...", textvariable=prod_search_var, height=28).pack(fill="x", padx=20, pady=(0, 5))
+        
         prod_dropdown = ctk.CTkComboBox(form_frame, values=prod_options, variable=prod_var, height=32, width=300)
         prod_dropdown.pack(fill="x", padx=20)
         
+        def filter_prod_options():
+            term = prod_search_var.get().strip()
+            if not term:
+                prod_dropdown.configure(values=prod_options)
+                return
+            matches = product_index.search(term, fields=(NAME, BARCODE), predicate=is_stock_tracked)
+            prod_dropdown.configure(values=["Select a product..."] + sorted(prod_label(p) for p in matches))
+        
+        prod_search_debouncer = Debouncer(dialog, 150, filter_prod_options)
+        prod_search_var.trace("w", prod_search_debouncer.trigger)
+        
         # 2. Name & Price (Auto-filled)
         ctk.CTkLabel(form_frame, text="Modifier Name", font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=20, pady=(15, 5))
         name_entry = ctk.CTkEntry(form_frame, height=32)
@@ -197,6 +197,12 @@ class ProductsPage:
         self.load_categories()
         self.load_products_for_category(None)
     
+    def refresh(self):
+        """Re-load categories and products after a data change (keeps the selected category)"""
+        self._invalidate_cache()
+        self.load_categories()
+        self.load_products_for_category(self.selected_category)
+    
     def load_categories(self):
         """Load all categories as folder buttons"""
         # Clear existing
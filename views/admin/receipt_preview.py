@@ -0,0 +1,87 @@
+"""
+Receipt preview rendering for the Settings page
+Renders on a worker thread with one reusable ReceiptRenderer; only the
+newest request is rendered and results of older requests are dropped.
+"""
+import threading
+from receipt_renderer import ReceiptRenderer
+
+
+class ReceiptPreviewWorker:
+    def __init__(self, widget, on_ready, poll_ms=40):
+        """
+        widget: any Tk widget (used for after() polling on the UI thread)
+        on_ready(pil_image): called on the UI thread with the newest preview
+        """
+        self.widget = widget
+        self.on_ready = on_ready
+        self.poll_ms = poll_ms
+        self.renderer = ReceiptRenderer()
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._generation = 0
+        self._pending = None      # (generation, settings) waiting to be rendered
+        self._result = None       # (generation, image or None, error)
+        self._polling = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="ReceiptPreview", daemon=True)
+        self._thread.start()
+
+    def request(self, settings):
+        """Queue a render of settings, replacing any render not started yet"""
+        with self._lock:
+            self._generation += 1
+            self._pending = (self._generation, list(settings))
+        self._wake.set()
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            with self._lock:
+                job, self._pending = self._pending, None
+            if job is None:
+                continue
+            generation, settings = job
+            try:
+                self.renderer.settings = settings
+                image = self.renderer.generate_image(None, None, preview=True)
+                result = (generation, image, None)
+            except Exception as e:
+                result = (generation, None, e)
+            with self._lock:
+                self._result = result
+
+    def _poll(self):
+        try:
+            alive = self.widget.winfo_exists()
+        except Exception:
+            alive = False
+        if not alive:
+            self._polling = False
+            self.stop()
+            return
+
+        with self._lock:
+            result, self._result = self._result, None
+            current = self._generation
+        if result is not None and result[0] == current:
+            self._polling = False
+            _, image, error = result
+            if error is not None:
+                print(f"Preview Error: {error}")
+            else:
+                self.on_ready(image)
+            return
+        # Stale result (a newer request is queued or rendering): keep waiting
+        self.widget.after(self.poll_ms, self._poll)
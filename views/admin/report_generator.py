@@ -3,27 +3,102 @@ import csv
 import json
 from datetime import datetime, timedelta
 import os
+from html import escape
+from collections import OrderedDict
+
+
+class ReportCache:
+    """
+    Computed report datasets keyed by (report kind, period, input version).
+    Every output format renders from the same dataset, so exporting a period
+    as CSV, HTML and email only aggregates it once.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        """Return the dataset for key, computing and storing it on a miss"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        value = compute()
+        # Older versions of the same report can never be hit again
+        for old_key in [k for k in self._entries if k[:-1] == key[:-1]]:
+            del self._entries[old_key]
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Change counters (Database.get_change_counters) of the tables each cached report reads
+REPORT_INPUTS = {
+    "summary": ("transactions", "products", "product_ingredients", "global_modifiers"),
+    "product": ("transactions", "products", "product_ingredients", "global_modifiers"),
+}
+
 
 class DetailedReportGenerator:
-    def __init__(self, database):
+    def __init__(self, database, output_dir=None, cache=None):
         self.db = database
+        # Folder for generated files (current directory when not set)
+        self.output_dir = output_dir
+        # Optional ReportCache shared between report actions
+        self.cache = cache
+
+    def _cached(self, kind, report_type, start_date, end_date, compute):
+        """Get a report dataset through the cache when the database keeps change counters"""
+        if self.cache is None or not hasattr(self.db, "get_change_counters"):
+            return compute()
+        key = (kind, report_type, str(start_date), str(end_date),
+               self._input_version(kind, report_type, start_date, end_date))
+        return self.cache.get(key, compute)
+
+    def _input_version(self, kind, report_type, start_date, end_date):
+        """
+        Changes whenever the report's own inputs change: a sale in the period
+        (count and last id) or an edit of one of the tables it reads, but not
+        on activity log writes, queued emails or sales outside the period
+        """
+        where, params = self._period_filter(report_type, start_date, end_date)
+        self.db.cursor.execute(f"SELECT COUNT(*), MAX(id) FROM transactions{where}", params)
+        return tuple(self.db.cursor.fetchone()) + self.db.get_change_counters(REPORT_INPUTS[kind])
+
+    def generate(self, kind, report_type, output_format):
+        """Build a report file by kind ('summary', 'product' or 'line_items'); returns its path"""
+        if kind == "summary":
+            return self.generate_summary_report(report_type, output_format)
+        if kind == "product":
+            return self.generate_product_report(report_type, output_format)
+        if kind == "line_items":
+            return self.generate_line_item_export(report_type, output_format)
+        raise KeyError(f"Unknown report: {kind}")
+
+    def _output_name(self, prefix):
+        """Timestamped output path (without extension) inside output_dir"""
+        name = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            return os.path.join(self.output_dir, name)
+        return name
 
-    def generate_summary_report(self, report_type, output_format="html"):
+    def generate_summary_report(self, report_type, output_format="html", report_date=None):
         """
         Generates a 3-section summary: Products, Add-ons, Ingredients.
+        report_date: day the period ends on (defaults to today)
         """
-        start_date, end_date = self._get_date_range(report_type)
-        
-        # Fetch Transactions
-        if report_type == 'all':
-             query = "SELECT id, created_at, order_type, total_amount FROM transactions"
-             params = ()
-        else:
-             query = "SELECT id, created_at, order_type, total_amount FROM transactions WHERE DATE(created_at) BETWEEN ? AND ?"
-             params = (start_date, end_date)
-             
-        self.db.cursor.execute(query, params)
-        transactions = self.db.cursor.fetchall()
+        start_date, end_date = self._get_date_range(report_type, report_date)
+        data = self._cached("summary", report_type, start_date, end_date,
+                            lambda: self._compute_summary(report_type, start_date, end_date))
+        return self._render_summary(data, output_format, start_date, end_date)
+
+    def _compute_summary(self, report_type, start_date, end_date):
+        """Aggregate the summary dataset for the period"""
+        where, params = self._period_filter(report_type, start_date, end_date)
         
         # Data Containers
         products_sold = {} # Name -> Qty
@@ -56,75 +131,61 @@ class DetailedReportGenerator:
             name, link, qty = row
             if link: mod_map[name] = (link, qty)
             
-        # Process
-        for txn in transactions:
+        # Process Transactions (streamed, one row at a time)
+        for txn in self._iter_query(f"SELECT id, created_at, order_type, total_amount FROM transactions{where}", params):
             # Aggregate Order Type
             o_type = txn[2] if len(txn) > 2 else "Regular"
             if not o_type: o_type = "Regular"
-            if not o_type: o_type = "Regular"
             order_types[o_type] = order_types.get(o_type, 0) + 1
             
             # Aggregate Revenue
             t_amt = txn[3] if len(txn) > 3 and txn[3] is not None else 0.0
             total_revenue += float(t_amt)
             
-            items = self.db.get_transaction_items(txn[0])
-            for item in items:
-                # transaction_items columns: id, transaction_id, product_id, product_name, quantity, unit_price, subtotal, variant_id, variant_name, modifiers
-                # Correct indices:
-                item_id = item[0]
-                txn_id = item[1]
-                pid = item[2]           # product_id
-                p_name = item[3]        # product_name (was incorrectly item[4])
-                qty = item[4]           # quantity (was incorrectly item[6])
-                unit_price = item[5]
-                subtotal = item[6]
-                variant_id = item[7] if len(item) > 7 else None
-                variant_name = item[8] if len(item) > 8 else None
-                mods_str = item[9] if len(item) > 9 else None  # modifiers (was incorrectly item[8])
-                
-                # 1. Product Count
-                products_sold[p_name] = products_sold.get(p_name, 0) + qty
-                
-                # 2. Product Ingredients
-                if pid in ing_map:
-                    for ing_name, ing_qty in ing_map[pid]:
-                        usage = ing_qty * qty
-                        ingredients_used[ing_name] = ingredients_used.get(ing_name, 0) + usage
-                
-                # 3. Add-ons & Linked Ingredients
-                if mods_str:
-                    try:
-                        # JSON Format
-                        mods_list = json.loads(mods_str)
-                        for mod in mods_list:
-                            m_name = mod.get('name', 'Unknown')
-                            m_qty = mod.get('quantity', 1)
-                            
-                            # Add-on Count
-                            addons_sold[m_name] = addons_sold.get(m_name, 0) + m_qty
+        # Process Items of those transactions in one pass
+        for item in self._iter_items(report_type, start_date, end_date):
+            # transaction_items columns: id, transaction_id, product_id, product_name, quantity, unit_price, subtotal, variant_id, variant_name, modifiers
+            pid = item[2]           # product_id
+            p_name = item[3]        # product_name
+            qty = item[4]           # quantity
+            mods_str = item[9] if len(item) > 9 else None  # modifiers
+            
+            # 1. Product Count
+            products_sold[p_name] = products_sold.get(p_name, 0) + qty
+            
+            # 2. Product Ingredients
+            if pid in ing_map:
+                for ing_name, ing_qty in ing_map[pid]:
+                    usage = ing_qty * qty
+                    ingredients_used[ing_name] = ingredients_used.get(ing_name, 0) + usage
+            
+            # 3. Add-ons & Linked Ingredients
+            if mods_str:
+                try:
+                    # JSON Format
+                    mods_list = json.loads(mods_str)
+                    for mod in mods_list:
+                        m_name = mod.get('name', 'Unknown')
+                        m_qty = mod.get('quantity', 1)
+                        
+                        # Add-on Count
+                        addons_sold[m_name] = addons_sold.get(m_name, 0) + m_qty
+                        
+                        # Linked Ingredient (resolved by name via mod_map)
+                        if m_name in mod_map:
+                            link_name, link_qty = mod_map[m_name]
+                            total_link = link_qty * m_qty
+                            ingredients_used[link_name] = ingredients_used.get(link_name, 0) + total_link
                             
-                            # Linked Ingredient from JSON (Historical accuracy)
-                            # If JSON has linked_product_id/name, use it? 
-                            # The JSON dump from payment_dialog might not include resolved name of linked product easily unless we stuck it there.
-                            # Checking PaymentDialog: it dumps 'selected_modifiers'.
-                            # Modifier object usually has 'linked_product_id'.
-                            # But we need Name. We can rely on mod_map fallback or lookup.
-                            # For simplicity, use mod_map based on m_name
-                            if m_name in mod_map:
-                                link_name, link_qty = mod_map[m_name]
-                                total_link = link_qty * m_qty
-                                ingredients_used[link_name] = ingredients_used.get(link_name, 0) + total_link
-                                
-                    except (json.JSONDecodeError, TypeError):
-                        # Legacy String Format (comma-separated)
-                        for m_str in mods_str.split(", "):
-                             m_clean = m_str.strip()
-                             if m_clean:
-                                 addons_sold[m_clean] = addons_sold.get(m_clean, 0) + 1
-                                 if m_clean in mod_map:
-                                     link_name, link_qty = mod_map[m_clean]
-                                     ingredients_used[link_name] = ingredients_used.get(link_name, 0) + link_qty
+                except (json.JSONDecodeError, TypeError):
+                    # Legacy String Format (comma-separated)
+                    for m_str in mods_str.split(", "):
+                         m_clean = m_str.strip()
+                         if m_clean:
+                             addons_sold[m_clean] = addons_sold.get(m_clean, 0) + 1
+                             if m_clean in mod_map:
+                                 link_name, link_qty = mod_map[m_clean]
+                                 ingredients_used[link_name] = ingredients_used.get(link_name, 0) + link_qty
 
         # Fetch Inventory with Tracking Mode & Availability
         try:
@@ -150,10 +211,7 @@ class DetailedReportGenerator:
              else:
                  inv_avail.append(item)
 
-        # Generate Output
-        filename = f"summary_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        data = {
+        return {
             'products': products_sold, 
             'addons': addons_sold, 
             'ingredients': ingredients_used, 
@@ -162,6 +220,18 @@ class DetailedReportGenerator:
             'inv_stock': inv_stock,
             'inv_avail': inv_avail
         }
+
+    def _render_summary(self, data, output_format, start_date, end_date):
+        """Write the summary dataset as PDF or HTML"""
+        products_sold = data['products']
+        addons_sold = data['addons']
+        ingredients_used = data['ingredients']
+        order_types = data['types']
+        inv_stock = data['inv_stock']
+        inv_avail = data['inv_avail']
+        
+        # Generate Output
+        filename = self._output_name("summary_report")
         
         if output_format == 'pdf':
             return self._export_pdf(filename, data, start_date, end_date)
@@ -502,19 +572,23 @@ class DetailedReportGenerator:
         output_format: 'csv' or 'html'
         """
         start_date, end_date = self._get_date_range(report_type)
-        
-        # 1. Fetch Transactions
-        if report_type == 'all':
-             query = "SELECT id, created_at FROM transactions"
-             params = ()
+        product_stats, ing_map, mod_map = self._cached(
+            "product", report_type, start_date, end_date,
+            lambda: self._compute_product_stats(report_type, start_date, end_date)
+        )
+
+        # Report rows are generated lazily and written as they come
+        report_rows = self._iter_product_rows(product_stats, ing_map, mod_map)
+
+        filename = self._output_name("product_report")
+        if output_format == 'csv':
+            return self._export_csv(filename, report_rows)
         else:
-             query = "SELECT id, created_at FROM transactions WHERE DATE(created_at) BETWEEN ? AND ?"
-             params = (start_date, end_date)
-             
-        self.db.cursor.execute(query, params)
-        transactions = self.db.cursor.fetchall()
-        
-        # 2. Aggregate Data
+            return self._export_html(filename, report_rows, start_date, end_date)
+
+    def _compute_product_stats(self, report_type, start_date, end_date):
+        """Aggregate per-product sales; returns (product_stats, ing_map, mod_map)"""
+        # Aggregate Data
         # Map: ProductID -> {name, qty_sold, revenue, ingredients: {name: usage}, modifiers: {name: count}}
         product_stats = {}
         # Global Mod Stats: ModName -> {count, linked_usage: {name: qty}}
@@ -546,94 +620,142 @@ class DetailedReportGenerator:
             if p_name: # Only map if linked
                 mod_map[m_name] = (p_name, d_qty)
 
-        # Process Transactions
-        for txn in transactions:
-            txn_id = txn[0]
-            items = self.db.get_transaction_items(txn_id)
-            for item in items:
-                # transaction_items columns: id, transaction_id, product_id, product_name, quantity, unit_price, subtotal, variant_id, variant_name, modifiers
-                pid = item[2]           # product_id
-                name = item[3]          # product_name (was incorrectly item[4])
-                qty = item[4]           # quantity (was incorrectly item[6])
-                unit_price = item[5]
-                subtotal = item[6]      # (was incorrectly item[7])
-                variant_id = item[7] if len(item) > 7 else None
-                variant_name = item[8] if len(item) > 8 else None
-                mods_str = item[9] if len(item) > 9 else None  # modifiers (was incorrectly item[8])
-                
-                if pid not in product_stats:
-                    product_stats[pid] = {
-                        'name': name, 'qty': 0, 'revenue': 0.0, 
-                        'modifiers_sold': {} # Name -> Count
-                    }
-                
-                p_data = product_stats[pid]
-                p_data['qty'] += qty
-                p_data['revenue'] += subtotal
-                
-                # Count Modifiers
-                if mods_str:
-                    # Split by comma
-                    # Note: PaymentDialog joins with ", "
-                    for mod in mods_str.split(", "):
-                        mod_clean = mod.strip()
-                        if mod_clean:
-                            p_data['modifiers_sold'][mod_clean] = p_data['modifiers_sold'].get(mod_clean, 0) + 1
-
-        # 3. Build Report Data Structure
-        report_rows = [] # flattened for CSV / structured for HTML
-        
+        # Process Items (one streamed pass over the period's line items)
+        for item in self._iter_items(report_type, start_date, end_date):
+            # transaction_items columns: id, transaction_id, product_id, product_name, quantity, unit_price, subtotal, variant_id, variant_name, modifiers
+            pid = item[2]           # product_id
+            name = item[3]          # product_name
+            qty = item[4]           # quantity
+            subtotal = item[6]
+            mods_str = item[9] if len(item) > 9 else None  # modifiers
+            
+            if pid not in product_stats:
+                product_stats[pid] = {
+                    'name': name, 'qty': 0, 'revenue': 0.0, 
+                    'modifiers_sold': {} # Name -> Count
+                }
+            
+            p_data = product_stats[pid]
+            p_data['qty'] += qty
+            p_data['revenue'] += subtotal
+            
+            # Count Modifiers
+            if mods_str:
+                # Split by comma
+                # Note: PaymentDialog joins with ", "
+                for mod in mods_str.split(", "):
+                    mod_clean = mod.strip()
+                    if mod_clean:
+                        p_data['modifiers_sold'][mod_clean] = p_data['modifiers_sold'].get(mod_clean, 0) + 1
+
+        return product_stats, ing_map, mod_map
+
+    def _iter_product_rows(self, product_stats, ing_map, mod_map):
+        """Yield the flattened product report rows (product, ingredients, add-ons)"""
         for pid, data in product_stats.items():
             # Main Product Row
-            report_rows.append({
+            yield {
                 'type': 'product',
                 'name': data['name'],
                 'sold': data['qty'],
                 'revenue': data['revenue']
-            })
+            }
             
             # Derived Ingredients
             if pid in ing_map:
                 for ing_name, ing_qty in ing_map[pid]:
                     total_used = ing_qty * data['qty']
-                    report_rows.append({
+                    yield {
                         'type': 'ingredient',
                         'name': f"Used: {ing_name}",
                         'qty': total_used,
                         'info': f"({ing_qty} per item)"
-                    })
+                    }
             
             # Modifiers
             for mod_name, mod_count in data['modifiers_sold'].items():
-                report_rows.append({
+                yield {
                     'type': 'modifier',
                     'name': f"Add-on: {mod_name}",
                     'sold': mod_count,
-                    'revenue': 0 # Included in product revenue usually? or separate?
-                                 # In current DB, subtotal includes modifier price.
-                                 # So we don't separate revenue easily here without more lookups.
-                })
+                    'revenue': 0 # In current DB, subtotal includes modifier price.
+                }
                 
                 # Modifier Ingredients
                 if mod_name in mod_map:
                     link_name, d_qty = mod_map[mod_name]
                     total_mod_used = d_qty * mod_count
-                    report_rows.append({
+                    yield {
                         'type': 'mod_ingredient',
                         'name': f"  -> Used: {link_name}",
                         'qty': total_mod_used,
                         'info': f"(via Add-on)"
-                    })
+                    }
 
-        # 4. output
-        filename = f"product_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    def generate_line_item_export(self, report_type, output_format="csv"):
+        """
+        Raw export of every sold line item (transaction_items) in the period.
+        Rows are streamed from the database straight into the file, so
+        multi-year 'all' exports keep memory flat.
+        output_format: 'csv' or 'html'
+        """
+        start_date, end_date = self._get_date_range(report_type)
+        where, params = self._period_filter(report_type, start_date, end_date, "t.created_at")
+        
+        rows = self._iter_query(f"""
+            SELECT t.transaction_number, t.created_at, t.order_type, t.payment_method,
+                   ti.product_id, ti.product_name, ti.variant_name, ti.modifiers,
+                   ti.quantity, ti.unit_price, ti.subtotal
+            FROM transaction_items ti
+            JOIN transactions t ON ti.transaction_id = t.id{where}
+            ORDER BY ti.id
+        """, params)
+        headers = ["Transaction #", "Date", "Order Type", "Payment", "Product ID", "Product",
+                   "Variant", "Modifiers", "Quantity", "Unit Price", "Subtotal"]
+        
+        filename = self._output_name("line_items")
         if output_format == 'csv':
-            return self._export_csv(filename, report_rows)
+            return self._write_csv(f"{filename}.csv", headers, rows)
+        return self._write_html_table(
+            f"{filename}.html", "Line Item Export", f"Period: {start_date} to {end_date}", headers, rows
+        )
+
+    def _period_filter(self, report_type, start_date, end_date, column="created_at"):
+        """WHERE clause and params restricting a query to the report period"""
+        if report_type == 'all':
+            return "", ()
+        return f" WHERE DATE({column}) BETWEEN ? AND ?", (start_date, end_date)
+
+    def _iter_query(self, query, params=(), chunk_size=500):
+        """Yield rows in chunks from a dedicated cursor instead of fetchall()"""
+        # Profiled like every other statement when query profiling is on
+        profiler = self.db.get_query_profiler() if hasattr(self.db, "get_query_profiler") else None
+        if profiler is not None:
+            from query_profiler import profiling_cursor
+            cursor = profiling_cursor(self.db.conn, profiler)
         else:
-            return self._export_html(filename, report_rows, start_date, end_date)
+            cursor = self.db.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def _iter_items(self, report_type, start_date, end_date):
+        """Yield transaction_items rows of the transactions in the report period"""
+        where, params = self._period_filter(report_type, start_date, end_date, "t.created_at")
+        return self._iter_query(f"""
+            SELECT ti.* FROM transaction_items ti
+            JOIN transactions t ON ti.transaction_id = t.id{where}
+        """, params)
 
-    def _get_date_range(self, report_type):
-        today = datetime.now().date()
+    def _get_date_range(self, report_type, report_date=None):
+        today = report_date or datetime.now().date()
         if report_type == 'today':
             return today, today
         elif report_type == 'week':
@@ -644,22 +766,63 @@ class DetailedReportGenerator:
             return datetime(2000, 1, 1).date(), today
 
     def _export_csv(self, filename, rows):
-        path = f"{filename}.csv"
+        """rows: any iterable of report row dicts (consumed once)"""
+        values = (
+            [
+                r['type'].upper(), 
+                r['name'], 
+                r.get('sold', r.get('qty', '')), 
+                r.get('revenue', r.get('info', ''))
+            ]
+            for r in rows
+        )
+        return self._write_csv(f"{filename}.csv", ["Type", "Name/Details", "Quantity/Count", "Revenue/Info"], values)
+
+    def _write_csv(self, path, headers, rows):
+        """Write rows to CSV as they are produced"""
         with open(path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow(["Type", "Name/Details", "Quantity/Count", "Revenue/Info"])
-            for r in rows:
-                writer.writerow([
-                    r['type'].upper(), 
-                    r['name'], 
-                    r.get('sold', r.get('qty', '')), 
-                    r.get('revenue', r.get('info', ''))
-                ])
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+        return path
+
+    def _write_html_table(self, path, title, subtitle, headers, rows):
+        """Write a plain HTML table one row at a time"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; padding: 20px; }}
+                table {{ border-collapse: collapse; width: 100%; }}
+                th, td {{ padding: 6px 10px; border-bottom: 1px solid #ddd; text-align: left; }}
+                th {{ background-color: #f2f2f2; }}
+                h2 {{ color: #333; }}
+            </style>
+        </head>
+        <body>
+            <h2>{escape(title)}</h2>
+            <p>{escape(subtitle)}</p>
+            <table>
+                <tr>{''.join(f"<th>{escape(h)}</th>" for h in headers)}</tr>
+""")
+            for row in rows:
+                cells = ''.join(f"<td>{escape('' if v is None else str(v))}</td>" for v in row)
+                f.write(f"                <tr>{cells}</tr>\n")
+            f.write("""
+            </table>
+            <br><p>Generated by POS System</p>
+        </body>
+        </html>
+        """)
         return path
 
     def _export_html(self, filename, rows, start, end):
+        """rows: any iterable of report row dicts, written as they are produced"""
         path = f"{filename}.html"
-        html = f"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"""
         <html>
         <head>
             <style>
@@ -683,32 +846,29 @@ class DetailedReportGenerator:
                     <th>Qty Sold / Used</th>
                     <th>Revenue / Notes</th>
                 </tr>
-        """
+        """)
         
-        for r in rows:
-            css_class = r['type'].replace('_', '-')
-            name = r['name']
-            qty = r.get('sold', r.get('qty', '-'))
-            rev_or_info = r.get('revenue', r.get('info', ''))
+            for r in rows:
+                css_class = r['type'].replace('_', '-')
+                name = r['name']
+                qty = r.get('sold', r.get('qty', '-'))
+                rev_or_info = r.get('revenue', r.get('info', ''))
             
-            if isinstance(rev_or_info, float):
-                rev_or_info = f"{rev_or_info:,.2f}"
+                if isinstance(rev_or_info, float):
+                    rev_or_info = f"{rev_or_info:,.2f}"
             
-            html += f"""
+                f.write(f"""
                 <tr class="{css_class}">
                     <td>{name}</td>
                     <td>{qty}</td>
                     <td>{rev_or_info}</td>
                 </tr>
-            """
+            """)
             
-        html += """
+            f.write("""
             </table>
             <br><p>Generated by POS System</p>
         </body>
         </html>
-        """
-        
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        """)
         return path
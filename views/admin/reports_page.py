@@ -4,7 +4,9 @@ Reports and export page for admin view
 import customtkinter as ctk
 from datetime import datetime, timedelta
 from tkinter import messagebox
-from config import COLORS, CURRENCY_SYMBOL
+from config import COLORS, CURRENCY_SYMBOL, REPORTS_DIR
+from .report_generator import DetailedReportGenerator, ReportCache
+from pos_service import get_core_client, forget_core_client, PosServiceError
 
 
 class ReportsPage:
@@ -14,6 +16,18 @@ class ReportsPage:
         self.selected_report_type = "today"
         self.date_buttons = {}
         self.selected_period_label = None
+        # One generator for all export/email actions; results are cached per period and data version
+        self.report_generator = DetailedReportGenerator(database, output_dir=REPORTS_DIR, cache=ReportCache())
+    
+    def generate_report(self, kind, output_format):
+        """Build a report for the selected period, on the core service when one is running"""
+        core = get_core_client()
+        if core is not None:
+            try:
+                return core.generate_report(kind, self.selected_report_type, output_format)
+            except PosServiceError as e:
+                print(f"Core service could not build the report, building it here: {e}")
+        return self.report_generator.generate(kind, self.selected_report_type, output_format)
     
     def show(self):
         """Show reports page with export functionality"""
@@ -29,6 +43,16 @@ class ReportsPage:
         )
         title.pack(side="left")
         
+        ctk.CTkButton(
+            header,
+            text="🌙 Close Day & Send Report",
+            command=self.close_day,
+            font=ctk.CTkFont(size=13, weight="bold"),
+            fg_color=COLORS["secondary"],
+            hover_color=COLORS["primary"],
+            height=35
+        ).pack(side="right")
+        
         # Single panel with simple layout
         main_panel = ctk.CTkFrame(self.parent, fg_color=COLORS["card_bg"], corner_radius=15)
         main_panel.pack(fill="both", expand=True, padx=30, pady=(0, 30))
@@ -117,6 +141,7 @@ class ReportsPage:
             ("📦 Product Report", "product_sales", COLORS["warning"]),
             ("👤 Cashier Report", "cashier_performance", COLORS["primary"]),
             ("📊 Category Report", "category_analysis", COLORS["secondary"]),
+            ("🧾 Line Item Export", "line_items", COLORS["danger"]),
         ]
         
         for idx, (text, report_id, color) in enumerate(report_types):
@@ -222,14 +247,12 @@ class ReportsPage:
         """Quick export"""
         try:
             if report_id == "product_sales":
-                from .report_generator import DetailedReportGenerator
                 import os
                 
                 # output format: force html for word (nicer layout), csv for csv
                 fmt = "csv" if export_type == "csv" else "html"
                 
-                gen = DetailedReportGenerator(self.database)
-                path = gen.generate_product_report(self.selected_report_type, fmt)
+                path = self.generate_report("product", fmt)
                 
                 # Open the file automatically
                 try:
@@ -237,6 +260,18 @@ class ReportsPage:
                 except:
                     pass # Linux/Mac might fail here
                     
+                messagebox.showinfo("Export Success", f"Report generated:\n{path}")
+            elif report_id == "line_items":
+                import os
+                
+                fmt = "csv" if export_type == "csv" else "html"
+                path = self.generate_report("line_items", fmt)
+                
+                try:
+                    os.startfile(path)
+                except:
+                    pass
+                    
                 messagebox.showinfo("Export Success", f"Report generated:\n{path}")
             else:
                 messagebox.showinfo("Info", f"Export logic for {report_id} is coming soon!")
@@ -255,33 +290,24 @@ class ReportsPage:
              
         try:
              # 2. Generate Report
-             from .report_generator import DetailedReportGenerator
-             gen = DetailedReportGenerator(self.database)
              path = None
              report_name = ""
              
              if report_id == "product_sales":
-                 path = gen.generate_product_report(self.selected_report_type, "html")
+                 path = self.generate_report("product", "html")
                  report_name = "Product Sales"
+             elif report_id == "line_items":
+                 path = self.generate_report("line_items", "csv")
+                 report_name = "Line Items"
              # Add other types here when implemented in report_generator
              
              if path:
-                 # 3. Send
-                 import sys
-                 sys.path.append(r"c:\Users\USER\Documents\POINTOFSALE")
-                 from email_sender import send_email_with_attachment
-                 
+                 # 3. Queue for the background sender
                  period = self.get_date_range_text()
                  subject = f"POS Report: {report_name} ({period})"
                  body = f"Attached is the {report_name} report for {period}.\n\nGenerated by Admin POS System."
                  
-                 # Show loading... (optional, but UI will freeze briefly)
-                 success, msg = send_email_with_attachment(settings, path, subject, body)
-                 
-                 if success:
-                     messagebox.showinfo("Email Sent", f"Report emailed to {settings[3]} successfully!")
-                 else:
-                     messagebox.showerror("Sending Failed", msg)
+                 self.queue_email(path, subject, body, settings[3])
              else:
                  messagebox.showinfo("Info", f"Email reporting for '{report_id}' is coming soon!")
                  
@@ -297,32 +323,87 @@ class ReportsPage:
              return
              
         try:
-             from .report_generator import DetailedReportGenerator
-             gen = DetailedReportGenerator(self.database)
-             path = gen.generate_summary_report(self.selected_report_type, "pdf")
-             
-             # Send
-             import sys
-             import os
-             # Ensure root path is in sys.path mainly for email_sender import
-             # Assumes this file is in views/admin/
-             current_dir = os.path.dirname(os.path.abspath(__file__))
-             root_dir = os.path.dirname(os.path.dirname(current_dir))
-             if root_dir not in sys.path:
-                 sys.path.append(root_dir)
-                 
-             from email_sender import send_email_with_attachment
+             path = self.generate_report("summary", "pdf")
              
              period = self.get_date_range_text()
              subject = f"POS Summary: Order Types, Sales, Igridients & Add-ons ({period})"
              body = f"Attached is the comprehensive summary report for {period}, including order types, sold items, ingredients used, and add-ons sold.\n\nGenerated by POS System."
              
-             success, msg = send_email_with_attachment(settings, path, subject, body)
-             
-             if success:
-                 messagebox.showinfo("Success", f"Summary Report emailed to {settings[3]}!")
-             else:
-                 messagebox.showerror("Failed", msg)
+             self.queue_email(path, subject, body, settings[3])
                  
         except Exception as e:
             messagebox.showerror("Error", f"Failed: {str(e)}")
+
+    def close_day(self):
+        """Generate today's end-of-day report in the background worker"""
+        if not messagebox.askyesno("Close Day", "Generate today's end-of-day summary now?\nIt will be saved under the reports folder and emailed if email is configured."):
+            return
+        scheduler = self.database.get_report_scheduler()
+        report_date = None
+        core = get_core_client()
+        if core is not None:
+            # The core service runs the job (and delivers its email); progress is read from the database
+            try:
+                report_date = core.run_end_of_day()
+            except PosServiceError as e:
+                print(f"Core service could not close the day, closing it here: {e}")
+        if report_date is None:
+            self.database.get_email_outbox()  # This window delivers the report email then
+            report_date = scheduler.run_now()
+        self.watch_end_of_day(scheduler, report_date)
+
+    def watch_end_of_day(self, scheduler, report_date, interval=2000):
+        """Poll the end-of-day run and report the result on the UI thread"""
+        def check():
+            if not self.parent.winfo_exists():
+                return
+            run = scheduler.get_run(report_date)
+            if not run or run[0] == "running":
+                self.parent.after(interval, check)
+                return
+            status, path, email_id, error = run
+            if status == "done":
+                note = "\nQueued for email." if email_id else "\nEmail is not configured, report was not sent."
+                messagebox.showinfo("Day Closed", f"End-of-day report saved:\n{path}{note}")
+                if email_id:
+                    settings = self.database.get_email_settings()
+                    self.watch_delivery(email_id, settings[3] if settings else "receiver")
+            else:
+                messagebox.showerror("Report Failed", error or "Unknown error")
+        
+        self.parent.after(interval, check)
+
+    def queue_email(self, path, subject, body, receiver):
+        """Queue an email in the outbox; delivery happens on the background worker (the core service's, if running)"""
+        core = get_core_client()
+        outbox = self.database.get_email_outbox(start=core is None)
+        message_id = outbox.enqueue(subject, body, path)
+        if core is not None:
+            try:
+                core.wake_outbox()
+            except PosServiceError as e:
+                # Deliver it from this window then, and look the service up again next time
+                print(f"Core service not reached, sending the email from here: {e}")
+                forget_core_client()
+                self.database.get_email_outbox()
+        messagebox.showinfo("Email Queued", f"Report queued for {receiver}.\nYou will be notified when it is sent.")
+        self.watch_delivery(message_id, receiver)
+
+    def watch_delivery(self, message_id, receiver, interval=2000):
+        """Poll the outbox and report the delivery result on the UI thread"""
+        def check():
+            if not self.parent.winfo_exists():
+                return
+            status = self.database.get_email_outbox(start=False).get_status(message_id)
+            if not status:
+                return
+            state, attempts, error = status
+            if state == "sent":
+                messagebox.showinfo("Email Sent", f"Report emailed to {receiver} successfully!")
+            elif state == "failed":
+                messagebox.showerror("Sending Failed", error or "Unknown error")
+            else:
+                # Still pending (possibly waiting to retry)
+                self.parent.after(interval, check)
+        
+        self.parent.after(interval, check)
@@ -1,11 +1,13 @@
 """
 Settings page for admin view
 """
+import os
 import customtkinter as ctk
 from tkinter import messagebox
-from config import COLORS
+from config import COLORS, ACTIVITY_LOG_RETENTION_DAYS
 from PIL import Image
-from receipt_renderer import ReceiptRenderer
+from views.debounce import Debouncer
+from .receipt_preview import ReceiptPreviewWorker
 
 
 class SettingsPage:
@@ -574,6 +576,22 @@ class SettingsPage:
         preview_label = ctk.CTkLabel(preview_container, text="")
         preview_label.pack(expand=True)
         
+        def show_preview(pil_img):
+            # The renderer draws at the 280px display width, so no resize is needed
+            display_w = 280
+            if pil_img.width != display_w:
+                display_h = int(display_w * pil_img.height / pil_img.width)
+                pil_img = pil_img.resize((display_w, display_h), Image.Resampling.LANCZOS)
+            
+            ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
+            
+            preview_label.configure(image=ctk_img)
+            preview_label.image = ctk_img  # Keep ref
+        
+        # Renders off the UI thread with one reusable renderer (fonts loaded once)
+        preview_worker = ReceiptPreviewWorker(preview_label, show_preview)
+        preview_label.bind("<Destroy>", lambda e: preview_worker.stop(), add="+")
+        
         def update_preview(*args):
             # Create a mock settings list (tuple-like) matching DB constraints
             temp_settings = [None] * 10
@@ -583,32 +601,16 @@ class SettingsPage:
             temp_settings[4] = sv_email.get()
             temp_settings[6] = sv_footer.get()
             temp_settings[7] = sv_logo.get()  # Include logo path
-            
-            renderer = ReceiptRenderer(temp_settings)
-            
-            # Generate preview image
-            try:
-                pil_img = renderer.generate_image(None, None, preview=True)
-                
-                # Resize for display if needed (max width 300)
-                aspect = pil_img.height / pil_img.width
-                display_w = 280
-                display_h = int(display_w * aspect)
-                pil_img = pil_img.resize((display_w, display_h), Image.Resampling.LANCZOS)
-                
-                ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=(display_w, display_h))
-                
-                preview_label.configure(image=ctk_img)
-                preview_label.image = ctk_img  # Keep ref
-            except Exception as e:
-                print(f"Preview Error: {e}")
+            preview_debouncer.cancel()
+            preview_worker.request(temp_settings)
         
-        # Bind changes
-        sv_name.trace_add("write", update_preview)
-        sv_addr.trace_add("write", update_preview)
-        sv_phone.trace_add("write", update_preview)
-        sv_footer.trace_add("write", update_preview)
-        sv_logo.trace_add("write", update_preview)  # Bind logo changes
+        # Bind changes (typing only re-renders after a short pause)
+        preview_debouncer = Debouncer(preview_label, 250, update_preview)
+        sv_name.trace_add("write", preview_debouncer.trigger)
+        sv_addr.trace_add("write", preview_debouncer.trigger)
+        sv_phone.trace_add("write", preview_debouncer.trigger)
+        sv_footer.trace_add("write", preview_debouncer.trigger)
+        sv_logo.trace_add("write", preview_debouncer.trigger)  # Bind logo changes
         
         # Initial call
         update_preview()
@@ -645,29 +647,127 @@ class SettingsPage:
         
         ctk.CTkLabel(
              opt_frame, 
-             text="Performs database cleanup (VACUUM/ANALYZE) and deletes old temporary receipt images.", 
-             text_color=COLORS["text_secondary"]
+             text="Runs database maintenance (optimize, incremental vacuum, ANALYZE) and deletes old temporary receipt images.\nSmall maintenance slices also run automatically while the register is idle.", 
+             text_color=COLORS["text_secondary"],
+             justify="left"
         ).pack(anchor="w", padx=20, pady=(0, 15))
 
+        optimizer = self.database.get_system_optimizer()
+        opt_result = {}
+
+        def watch_opt():
+             if not opt_frame.winfo_exists():
+                 return
+             if not opt_result:
+                 opt_frame.after(300, watch_opt)
+                 return
+             opt_btn.configure(state="normal", text="🚀 Run Optimization Now")
+             if "error" in opt_result:
+                 messagebox.showerror("Error", f"Optimization failed: {opt_result['error']}")
+             else:
+                 lines = "\n".join(f"- {line}" for line in opt_result["report"])
+                 messagebox.showinfo("Optimization Complete", f"System optimization finished.\n\n{lines}\n- Old receipts cleaned")
+
         def run_opt():
-             try:
-                 # Import here to avoid circular dependencies if any
-                 from system_optimizer import SystemOptimizer
-                 opt = SystemOptimizer()
-                 opt.run_all()
-                 messagebox.showinfo("Optimization Complete", "System optimization finished successfully.\n\n- Database compacted\n- Old receipts cleaned")
-             except Exception as e:
-                 messagebox.showerror("Error", f"Optimization failed: {e}")
+             convert = False
+             if not optimizer.uses_incremental_vacuum():
+                 convert = messagebox.askyesno(
+                     "Enable Incremental Vacuum",
+                     "This database still needs a one-time full compaction to enable incremental vacuum.\n"
+                     "It locks the database briefly, so only do it when no sale is in progress.\n\nRun it now?"
+                 )
+             opt_result.clear()
+             opt_btn.configure(state="disabled", text="⏳ Optimizing...")
+
+             def work():
+                 try:
+                     if convert:
+                         optimizer.convert_to_incremental_vacuum()
+                     opt_result["report"] = optimizer.run_all()
+                 except Exception as e:
+                     opt_result["error"] = str(e)
+
+             import threading
+             threading.Thread(target=work, daemon=True).start()
+             opt_frame.after(300, watch_opt)
         
-        ctk.CTkButton(
+        opt_btn = ctk.CTkButton(
             opt_frame, 
             text="🚀 Run Optimization Now", 
             command=run_opt,
             height=40,
             fg_color=COLORS["primary"],
             font=ctk.CTkFont(weight="bold")
-        ).pack(padx=20, pady=(0, 20), anchor="w")
-        
+        )
+        opt_btn.pack(padx=20, pady=(0, 20), anchor="w")
+
+        # --- Activity Log Archive Box ---
+        archive_frame = ctk.CTkFrame(content, fg_color=COLORS.get("dark", "#2C3E50"), corner_radius=10)
+        archive_frame.pack(fill="x", pady=10)
+
+        ctk.CTkLabel(
+             archive_frame,
+             text="Activity Log Archive",
+             font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(anchor="w", padx=20, pady=(15, 5))
+
+        ctk.CTkLabel(
+             archive_frame,
+             text=f"Moves activity logs older than {ACTIVITY_LOG_RETENTION_DAYS} days into compressed monthly archive files.",
+             text_color=COLORS["text_secondary"]
+        ).pack(anchor="w", padx=20, pady=(0, 5))
+
+        archive_status = ctk.CTkLabel(archive_frame, text="", text_color=COLORS["text_secondary"])
+        archive_status.pack(anchor="w", padx=20, pady=(0, 15))
+
+        from log_retention import ActivityLogArchiver
+        archiver = ActivityLogArchiver(self.database.db_path)
+        archive_result = {}
+
+        def refresh_archive_status():
+            archives = archiver.list_archives()
+            total = sum(a[2] or 0 for a in archives)
+            archive_status.configure(text=f"{len(archives)} monthly archive(s), {total} archived entries")
+
+        def watch_archive():
+             if not archive_frame.winfo_exists():
+                 return
+             if not archive_result:
+                 archive_frame.after(300, watch_archive)
+                 return
+             archive_btn.configure(state="normal", text="🗄️ Archive Old Logs Now")
+             if "error" in archive_result:
+                 messagebox.showerror("Error", f"Archiving failed: {archive_result['error']}")
+             else:
+                 refresh_archive_status()
+                 messagebox.showinfo("Archive Complete", f"Archived {archive_result['archived']} activity log entries.")
+
+        def run_archive():
+             archive_result.clear()
+             archive_btn.configure(state="disabled", text="⏳ Archiving...")
+
+             def work():
+                 try:
+                     archive_result.update(archiver.archive_old_logs())
+                 except Exception as e:
+                     archive_result["error"] = str(e)
+
+             import threading
+             threading.Thread(target=work, daemon=True).start()
+             archive_frame.after(300, watch_archive)
+
+        refresh_archive_status()
+
+        archive_btn = ctk.CTkButton(
+            archive_frame,
+            text="🗄️ Archive Old Logs Now",
+            command=run_archive,
+            height=40,
+            fg_color=COLORS["primary"],
+            font=ctk.CTkFont(weight="bold")
+        )
+        archive_btn.pack(padx=20, pady=(0, 20), anchor="w")
+
         # --- Backup Box ---
         backup_frame = ctk.CTkFrame(content, fg_color=COLORS.get("dark", "#2C3E50"), corner_radius=10)
         backup_frame.pack(fill="x", pady=10)
@@ -680,58 +780,50 @@ class SettingsPage:
         
         ctk.CTkLabel(
              backup_frame, 
-             text="Create a secure copy of your database to prevent data loss.", 
-             text_color=COLORS["text_secondary"]
-        ).pack(anchor="w", padx=20, pady=(0, 15))
+             text="Create a verified, compressed copy of your database while the register keeps running.\nAutomatic backups are kept hourly for a day, daily for a week and weekly for two months.", 
+             text_color=COLORS["text_secondary"],
+             justify="left"
+        ).pack(anchor="w", padx=20, pady=(0, 5))
 
-        def run_backup():
-             try:
-                 import shutil
-                 import os
-                 from datetime import datetime
-                 
-                 # Robust DB Path Finding
-                 source = "pos.db"
-                 
-                 # 1. Check CWD
-                 if not os.path.exists(source):
-                     # 2. Check directory of the running script (sys.argv[0])
-                     import sys
-                     main_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-                     source = os.path.join(main_dir, "pos.db")
-                     
-                 # 3. Check relative to this file (views/admin/settings_page.py -> Root)
-                 if not os.path.exists(source):
-                      current_file = os.path.abspath(__file__)
-                      # go up 3 levels: views/admin/ -> views/ -> POINTOFSALE/
-                      project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-                      source = os.path.join(project_root, "pos.db")
+        backup_manager = self.database.get_backup_manager()
+        backup_status = ctk.CTkLabel(backup_frame, text="", text_color=COLORS["text_secondary"])
+        backup_status.pack(anchor="w", padx=20, pady=(0, 15))
 
-                 if not os.path.exists(source):
-                     messagebox.showerror("Error", f"Database file 'pos.db' not found in:\n{os.getcwd()}\nor {main_dir}\nor {project_root}")
-                     return
+        def refresh_backup_status():
+            backups = backup_manager.list_backups()
+            if backups:
+                backup_status.configure(text=f"{len(backups)} backup(s), latest {backups[0][0].strftime('%Y-%m-%d %H:%M')}")
+            else:
+                backup_status.configure(text="No backups yet")
 
-                 # Create backups folder in the same dir as the DB
-                 db_dir = os.path.dirname(os.path.abspath(source))
-                 backup_dir = os.path.join(db_dir, "backups")
-                 if not os.path.exists(backup_dir):
-                     os.makedirs(backup_dir)
-                     
-                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                 destination = os.path.join(backup_dir, f"pos_backup_{timestamp}.db")
-                 
-                 shutil.copy2(source, destination)
-                 
-                 messagebox.showinfo("Backup Complete", f"Database successfully backed up to:\n{destination}")
-             except Exception as e:
-                 messagebox.showerror("Error", f"Backup failed: {e}")
+        def watch_backup():
+            if not backup_frame.winfo_exists():
+                return
+            state, detail = backup_manager.last_result
+            if state == "running":
+                backup_frame.after(500, watch_backup)
+                return
+            backup_btn.configure(state="normal", text="💾 Backup Database Now")
+            refresh_backup_status()
+            if state == "done":
+                messagebox.showinfo("Backup Complete", f"Database successfully backed up to:\n{os.path.abspath(detail)}")
+            else:
+                messagebox.showerror("Error", f"Backup failed: {detail}")
+
+        def run_backup():
+             backup_btn.configure(state="disabled", text="⏳ Backing up...")
+             backup_manager.backup_in_background()
+             backup_frame.after(500, watch_backup)
+
+        refresh_backup_status()
         
-        ctk.CTkButton(
+        backup_btn = ctk.CTkButton(
             backup_frame, 
             text="💾 Backup Database Now", 
             command=run_backup,
             height=40,
             fg_color=COLORS["success"],
             font=ctk.CTkFont(weight="bold")
-        ).pack(padx=20, pady=(0, 20), anchor="w")
+        )
+        backup_btn.pack(padx=20, pady=(0, 20), anchor="w")
 
@@ -539,6 +539,10 @@ class TransactionsPage:
         self.filter_btn.configure(text="🔽", fg_color=COLORS["primary"])
         self.refresh_transactions()
     
+    def refresh(self):
+        """Re-load the list after a data change (filters are kept)"""
+        self.refresh_transactions()
+    
     def refresh_transactions(self):
         """Refresh the transactions list with current filters"""
         # Clear and reload
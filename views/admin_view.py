@@ -2,19 +2,32 @@
 Admin view - Dashboard and Management (Refactored)
 This is the main admin view that coordinates all admin pages
 """
+import importlib
 import customtkinter as ctk
 from config import COLORS
 
-# Import all page modules
-from views.admin.dashboard_page import DashboardPage
-from views.admin.products_page import ProductsPage
-from views.admin.modifiers_page import ModifiersPage
-from views.admin.inventory_page import InventoryPage
-from views.admin.users_page import UsersPage
-from views.admin.reports_page import ReportsPage
-from views.admin.transactions_page import TransactionsPage
-from views.admin.history_page import HistoryPage
-from views.admin.settings_page import SettingsPage
+# Page modules are imported the first time a page is opened
+# (products_page, settings_page/PIL and the report generator are slow to load)
+PAGE_CLASSES = {
+    "dashboard": ("views.admin.dashboard_page", "DashboardPage"),
+    "products": ("views.admin.products_page", "ProductsPage"),
+    "modifiers": ("views.admin.modifiers_page", "ModifiersPage"),
+    "inventory": ("views.admin.inventory_page", "InventoryPage"),
+    "users": ("views.admin.users_page", "UsersPage"),
+    "reports": ("views.admin.reports_page", "ReportsPage"),
+    "transactions": ("views.admin.transactions_page", "TransactionsPage"),
+    "history": ("views.admin.history_page", "HistoryPage"),
+    "settings": ("views.admin.settings_page", "SettingsPage"),
+}
+
+# main.py imports these in the background after an admin logs in
+PREWARM_MODULES = tuple(module for module, _ in PAGE_CLASSES.values())
+
+
+def load_page_class(page):
+    """Import a page module on demand and return its page class"""
+    module_name, class_name = PAGE_CLASSES[page]
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 class AdminView(ctk.CTkFrame):
@@ -25,8 +38,11 @@ class AdminView(ctk.CTkFrame):
         self.on_logout = on_logout
         self.current_page = "dashboard"
         
-        # Initialize page instances
+        # Page instances, their container frames and the data version each
+        # page was last left at. Pages stay built while hidden.
         self.pages = {}
+        self.page_frames = {}
+        self.page_versions = {}
         
         self.setup_ui()
     
@@ -118,12 +134,14 @@ class AdminView(ctk.CTkFrame):
     
     def switch_page(self, page):
         """Switch between different pages"""
+        # Pages reload themselves after a save by switching to themselves: always refresh then
+        if page == self.current_page:
+            self.page_versions.pop(page, None)
+        # Hide the current page (its widgets are kept for the next visit)
+        if self.current_page in self.page_frames:
+            self.page_frames[self.current_page].pack_forget()
         self.current_page = page
         
-        # Clear content
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
         if page == "dashboard":
             self.show_dashboard()
         elif page == "products":
@@ -143,57 +161,65 @@ class AdminView(ctk.CTkFrame):
         elif page == "settings":
             self.show_settings()
     
+    def _show_page(self, name, create):
+        """
+        Show a page, building it on the first visit only. On a revisit the page
+        is refreshed only if the data changed since it was last shown: pages with
+        a refresh() method re-load their data into the existing widgets, others
+        are rebuilt inside their own container.
+        """
+        frame = self.page_frames.get(name)
+        if frame is None:
+            frame = self.page_frames[name] = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+            frame.pack(fill="both", expand=True)
+            self.pages[name] = create(frame)
+            self.pages[name].show()
+        else:
+            frame.pack(fill="both", expand=True)
+            if self.page_versions.get(name) != self.database.get_data_version():
+                page = self.pages[name]
+                if hasattr(page, "refresh"):
+                    page.refresh()
+                else:
+                    for widget in frame.winfo_children():
+                        widget.destroy()
+                    page.show()
+        # The data the page now shows
+        self.page_versions[name] = self.database.get_data_version()
+    
     def show_dashboard(self):
         """Show dashboard page"""
-        if "dashboard" not in self.pages:
-            self.pages["dashboard"] = DashboardPage(self.content_frame, self.database)
-        self.pages["dashboard"].show()
+        self._show_page("dashboard", lambda frame: load_page_class("dashboard")(frame, self.database))
     
     def show_products(self):
         """Show products management page"""
-        if "products" not in self.pages:
-            self.pages["products"] = ProductsPage(self.content_frame, self.database, self.switch_page)
-        self.pages["products"].show()
+        self._show_page("products", lambda frame: load_page_class("products")(frame, self.database, self.switch_page))
 
     def show_modifiers(self):
         """Show modifiers management page"""
-        if "modifiers" not in self.pages:
-            self.pages["modifiers"] = ModifiersPage(self.content_frame, self.database)
-        self.pages["modifiers"].show()
+        self._show_page("modifiers", lambda frame: load_page_class("modifiers")(frame, self.database))
     
     def show_inventory(self):
         """Show inventory management page"""
-        if "inventory" not in self.pages:
-            self.pages["inventory"] = InventoryPage(self.content_frame, self.database, self.user_data)
-        self.pages["inventory"].show()
+        self._show_page("inventory", lambda frame: load_page_class("inventory")(frame, self.database, self.user_data))
     
     def show_users(self):
         """Show user management page"""
-        if "users" not in self.pages:
-            self.pages["users"] = UsersPage(self.content_frame, self.database, self.switch_page)
-        self.pages["users"].show()
+        self._show_page("users", lambda frame: load_page_class("users")(frame, self.database, self.switch_page))
     
     def show_reports(self):
         """Show reports page"""
-        if "reports" not in self.pages:
-            self.pages["reports"] = ReportsPage(self.content_frame, self.database)
-        self.pages["reports"].show()
+        self._show_page("reports", lambda frame: load_page_class("reports")(frame, self.database))
     
     
     def show_transactions(self):
         """Show transactions page"""
-        if "transactions" not in self.pages:
-            self.pages["transactions"] = TransactionsPage(self.content_frame, self.database)
-        self.pages["transactions"].show()
+        self._show_page("transactions", lambda frame: load_page_class("transactions")(frame, self.database))
     
     def show_history(self):
         """Show activity history page"""
-        if "history" not in self.pages:
-            self.pages["history"] = HistoryPage(self.content_frame, self.database)
-        self.pages["history"].show()
+        self._show_page("history", lambda frame: load_page_class("history")(frame, self.database))
     
     def show_settings(self):
         """Show settings page"""
-        if "settings" not in self.pages:
-            self.pages["settings"] = SettingsPage(self.content_frame, self.database)
-        self.pages["settings"].show()
+        self._show_page("settings", lambda frame: load_page_class("settings")(frame, self.database))
@@ -5,7 +5,6 @@ Handles payment processing and transaction completion
 import customtkinter as ctk
 from tkinter import messagebox
 from datetime import datetime
-import os
 from config import COLORS, CURRENCY_SYMBOL, TAX_RATE
 from receipt_renderer import ReceiptRenderer
 
@@ -21,8 +20,12 @@ class PaymentDialog:
         self.tax = tax
         self.order_type = order_type  # Store order type
     
-    def show(self, on_success_callback):
-        """Show payment dialog"""
+    def show(self, on_success_callback, on_paid_callback=None):
+        """
+        Show payment dialog
+        on_paid_callback: called as soon as the sale is saved, before the receipt is printed
+        on_success_callback: called once the receipt is done and the cashier has seen the result
+        """
         dialog = ctk.CTkToplevel(self.parent)
         dialog.title("Payment")
         dialog.geometry("500x650")
@@ -236,7 +239,7 @@ class PaymentDialog:
                 # Save transaction
                 customer_name = customer_entry.get().strip() or None
 
-                transaction_id = self.database.add_transaction_with_payment(
+                sale = dict(
                     transaction_number=transaction_number,
                     cashier_id=self.user_data['id'],
                     items=items_for_db,
@@ -247,6 +250,24 @@ class PaymentDialog:
                     order_type=self.order_type,  # Pass order type
                     customer_name=customer_name
                 )
+                # Saved by the core service when one is running (one writer for all registers' UIs).
+                # If it cannot be reached the sale is saved here; saving is safe to repeat
+                # (same transaction number), so a call that did reach it is not saved twice.
+                from pos_service import get_core_client, PosServiceUnavailable
+                core = get_core_client()
+                try:
+                    if core is None:
+                        raise PosServiceUnavailable("no core service")
+                    transaction_id = core.add_transaction_with_payment(**sale)
+                except PosServiceUnavailable as e:
+                    if core is not None:
+                        print(f"Core service not reached, saving the sale locally: {e}")
+                    transaction_id = self.database.add_transaction_with_payment(**sale)
+                
+                # The sale is saved: close the order now, so a crash while printing
+                # cannot bring the paid order back
+                if on_paid_callback:
+                    on_paid_callback()
                 
                 # Generate receipt
                 settings = self.database.get_receipt_settings()
@@ -327,12 +348,12 @@ class PaymentDialog:
                     img = renderer.generate_image(t_dummy, self.cart_items)
                     
                     # Save as BMP (better compatibility with thermal printers)
-                    # Use absolute path to ensure Windows can find the file
-                    receipts_dir = os.path.abspath("receipts")
-                    os.makedirs(receipts_dir, exist_ok=True)
+                    # Absolute path in today's receipts folder, recorded in the receipt index
+                    receipt_store = self.database.get_receipt_store()
                     txn_number = transaction_number
-                    receipt_file = os.path.join(receipts_dir, f"RCP_{txn_number}.bmp")
+                    receipt_file = receipt_store.new_path(f"RCP_{txn_number}.bmp")
                     img.save(receipt_file, 'BMP')
+                    receipt_store.add(receipt_file)
                     
                     status_label.configure(text="Receipt generated, sending to printer...")
                     loading_dialog.update()
@@ -342,10 +363,17 @@ class PaymentDialog:
                         status_label.configure(text="Printing receipt...")
                         loading_dialog.update()
                         
-                        # Try to use the old printer_utils method which works
+                        # Print through the core service when one is running, else locally
                         try:
-                            from printer_utils import print_image_to_default_printer
-                            success, message = print_image_to_default_printer(receipt_file)
+                            from pos_service import get_core_client, PosServiceError
+                            core = get_core_client()
+                            try:
+                                if core is None:
+                                    raise PosServiceError("no core service")
+                                success, message = core.print_image(receipt_file)
+                            except PosServiceError:
+                                from printer_utils import print_image_to_default_printer
+                                success, message = print_image_to_default_printer(receipt_file)
                             
                             if success:
                                 print_success = True
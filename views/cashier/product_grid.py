@@ -13,6 +13,7 @@ class ProductGrid:
         self.add_to_cart_callback = add_to_cart_callback
         self.products_frame = None
         self.search_entry = None
+        self.sellability = None
     
     def create(self):
         """Create the product grid UI"""
@@ -76,24 +77,14 @@ class ProductGrid:
         
         # Filter out only stock-tracked products with 0 stock
         # Availability-mode products should always show (even if not available)
+        # Products whose ingredients have run out stay visible but grayed out
+        self.sellability = self.database.get_sellability_index()
         filtered_products = []
         for p in products:
-            # Check if product has the new columns (backwards compatibility)
-            # Indices: use_stock_tracking=12, is_available=13
-            if len(p) > 12:
-                use_stock_tracking = p[12] if p[12] is not None else 1
-                
-                if use_stock_tracking == 1:
-                    # Stock tracking mode - only hide if stock is 0
-                    if p[4] > 0:
-                        filtered_products.append(p)
-                else:
-                    # Availability mode - always show (will be grayed out if not available)
-                    filtered_products.append(p)
-            else:
-                # Old products without new columns - show if stock > 0
-                if p[4] > 0:
-                    filtered_products.append(p)
+            # Indices: use_stock_tracking=12
+            use_stock_tracking = p[12] if len(p) > 12 and p[12] is not None else 1
+            if use_stock_tracking == 0 or self.sellability.stock(p[0]) > 0:
+                filtered_products.append(p)
         
         products = filtered_products
         
@@ -108,15 +99,8 @@ class ProductGrid:
     
     def create_product_card(self, parent, product):
         """Create a product card"""
-        # Check if product is available
-        is_available = True
-        use_stock_tracking = True
-        
-        # Indices: use_stock_tracking=12, is_available=13
-        if len(product) > 12:
-            use_stock_tracking = product[12] if product[12] is not None else 1
-            if use_stock_tracking == 0:  # Availability mode
-                is_available = product[13] if product[13] is not None else 1
+        # Available = at least one unit can be sold (own stock/availability and ingredients)
+        is_available = self.sellability.can_sell(product[0])
         
         card = ctk.CTkFrame(parent, fg_color=COLORS["dark"], corner_radius=10)
         
@@ -165,7 +149,7 @@ class ProductGrid:
                 stock_color = COLORS["danger"]
         else:
             # Stock tracking mode - show stock count
-            stock_val = product[4]
+            stock_val = self.sellability.stock(product[0])
             stock_text = f"Stock: {stock_val}"
             stock_color = COLORS["danger"] if stock_val < 10 else COLORS["text_secondary"]
         
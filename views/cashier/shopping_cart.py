@@ -1,17 +1,37 @@
 """
 Shopping cart component for cashier view
 Handles cart display and management
+The cart shows the active order of an OrderBook (several open orders, e.g.
+per table); item rows are kept and reused while their content is unchanged,
+so adding an item or switching orders only builds the rows that differ.
+Item changes go through the OrderBook, which journals them (cart_journal)
+so a crash mid-order is recovered on the next login. The order files are
+locked while a cashier window uses them; another window on the same computer
+gets its own numbered set (parked_orders.2.json, cart_journal.2.log, ...).
 """
+import os
 import customtkinter as ctk
 from tkinter import messagebox
-from config import COLORS, CURRENCY_SYMBOL, TAX_RATE
+from config import COLORS, CURRENCY_SYMBOL, TAX_RATE, PARKED_ORDERS_FILE, CART_JOURNAL_FILE
+from order_book import OrderBook
+from cart_journal import CartJournal
+from file_lock import FileLock
+
+# Cashier windows on one computer that get their own set of order files
+MAX_ORDER_FILE_SETS = 9
 
 
 class ShoppingCart:
     def __init__(self, parent, database):
         self.parent = parent
         self.database = database
-        self.cart_items = []
+        self.orders_lock = None
+        self.orders = self.open_orders(os.path.dirname(database.db_path))
+        self.cart_items = self.orders.active.items
+        self.item_rows = []  # Rendered item rows in display order
+        self.empty_label = None
+        self.order_menu = None
+        self.cart_header = None
         self.cart_frame = None
         self.subtotal_label = None
         self.tax_label = None
@@ -26,20 +46,59 @@ class ShoppingCart:
         right_panel.pack_propagate(False)
         
         # Cart header
-        cart_header = ctk.CTkLabel(
+        self.cart_header = ctk.CTkLabel(
             right_panel,
             text="🛍️ Current Sale",
             font=ctk.CTkFont(size=18, weight="bold"),
             text_color=COLORS["text_primary"]
         )
-        cart_header.pack(pady=(20, 10), padx=20, anchor="w")
+        self.cart_header.pack(pady=(20, 10), padx=20, anchor="w")
+        
+        # Open orders (switch, park as a new order, rename)
+        orders_frame = ctk.CTkFrame(right_panel, fg_color="transparent")
+        orders_frame.pack(fill="x", padx=20, pady=(0, 10))
+        
+        self.order_menu = ctk.CTkOptionMenu(
+            orders_frame,
+            values=self.orders.names(),
+            command=self.switch_order,
+            height=30,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color=COLORS["dark"],
+            button_color=COLORS["primary"]
+        )
+        self.order_menu.pack(side="left", fill="x", expand=True)
+        
+        ctk.CTkButton(
+            orders_frame,
+            text="✎",
+            command=self.rename_order,
+            width=30,
+            height=30,
+            font=ctk.CTkFont(size=14),
+            fg_color=COLORS["dark"],
+            hover_color=COLORS["secondary"],
+            corner_radius=6
+        ).pack(side="left", padx=(6, 0))
+        
+        ctk.CTkButton(
+            orders_frame,
+            text="+ New Order",
+            command=self.park_order,
+            width=110,
+            height=30,
+            font=ctk.CTkFont(size=11, weight="bold"),
+            fg_color=COLORS["secondary"],
+            hover_color=COLORS["primary"],
+            corner_radius=6
+        ).pack(side="left", padx=(6, 0))
         
         # Order Type Selection
         order_type_frame = ctk.CTkFrame(right_panel, fg_color=COLORS["dark"], corner_radius=10)
         order_type_frame.pack(fill="x", padx=20, pady=(0, 10))
         
         # Order type state
-        self.order_type = "Regular"  # Default: Regular, Dine In, Take Out
+        self.order_type = self.orders.active.order_type  # Regular, Dine In, Take Out
         
         # Order type label
         ctk.CTkLabel(
@@ -175,7 +234,7 @@ class ShoppingCart:
         checkout_btn.pack(fill="x")
         
         # Initial display
-        self.update_cart_display()
+        self.show_active_order()
         
         return right_panel
     
@@ -183,7 +242,7 @@ class ShoppingCart:
         """Add item to cart, strictly merging duplicates"""
         # Search for identical item in cart
         found = False
-        for existing_item in self.cart_items:
+        for idx, existing_item in enumerate(self.cart_items):
             # Check for exact match of product, variant, and modifiers
             # Use .get() with None default to handle missing keys safely
             same_product = existing_item.get('product_id') == item.get('product_id')
@@ -197,55 +256,98 @@ class ShoppingCart:
             
             if same_product and same_variant and same_modifiers:
                 # Merge: Update quantity and subtotal
-                existing_item['quantity'] += item.get('quantity', 1)
-                existing_item['subtotal'] = existing_item['quantity'] * existing_item['price']
+                self.orders.set_quantity(idx, existing_item['quantity'] + item.get('quantity', 1))
                 found = True
                 break
         
         if not found:
-            self.cart_items.append(item)
+            self.orders.add_item(item)
             
         self.update_cart_display()
     
     def remove_item(self, item):
         """Remove item from cart"""
-        self.cart_items.remove(item)
+        idx = self.index_of(item)
+        if idx is not None:
+            self.orders.remove_item(idx)
         self.update_cart_display()
     
     def clear_cart(self):
-        """Clear all items"""
-        self.cart_items = []
+        """Clear all items of the active order"""
+        self.orders.clear()
         self.update_cart_display()
     
+    def index_of(self, item):
+        """Position of this very item (not just an equal one) in the cart"""
+        for idx, existing_item in enumerate(self.cart_items):
+            if existing_item is item:
+                return idx
+        return None
+    
+    def set_quantity(self, item, quantity):
+        """Change the quantity (and subtotal) of a cart item"""
+        idx = self.index_of(item)
+        if idx is not None:
+            self.orders.set_quantity(idx, quantity)
+            self.update_cart_display()
+    
     def get_items(self):
         """Get all cart items"""
         return self.cart_items
     
+    def row_key(self, item):
+        """What a cart row shows; rows with the same key can be reused for another item"""
+        return (item['name'], item['quantity'], item['price'], item['subtotal'])
+    
     def update_cart_display(self):
-        """Update cart display"""
-        # Clear cart frame
-        for widget in self.cart_frame.winfo_children():
-            widget.destroy()
+        """Update cart display, building only the rows whose content changed"""
+        spare = {}
+        for row in self.item_rows:
+            spare.setdefault(row['key'], []).append(row)
+        
+        rows = []
+        for item in self.cart_items:
+            key = self.row_key(item)
+            if spare.get(key):
+                row = spare[key].pop(0)
+                row['item'] = item
+            else:
+                row = self.create_cart_item(item)
+            rows.append(row)
+        
+        # Keep the unchanged leading rows packed; repack from the first difference
+        start = 0
+        while start < len(rows) and start < len(self.item_rows) and rows[start] is self.item_rows[start]:
+            start += 1
+        for row in self.item_rows[start:]:
+            row['frame'].pack_forget()
+        for unused in spare.values():
+            for row in unused:
+                row['frame'].destroy()
+        for row in rows[start:]:
+            row['frame'].pack(fill="x", padx=5, pady=3)
+        self.item_rows = rows
         
         if not self.cart_items:
-            empty_label = ctk.CTkLabel(
-                self.cart_frame,
-                text="Cart is empty\nAdd products to get started",
-                font=ctk.CTkFont(size=13),
-                text_color=COLORS["text_secondary"]
-            )
-            empty_label.pack(pady=50)
-        else:
-            for item in self.cart_items:
-                self.create_cart_item(item)
+            if self.empty_label is None:
+                self.empty_label = ctk.CTkLabel(
+                    self.cart_frame,
+                    text="Cart is empty\nAdd products to get started",
+                    font=ctk.CTkFont(size=13),
+                    text_color=COLORS["text_secondary"]
+                )
+            self.empty_label.pack(pady=50)
+        elif self.empty_label is not None:
+            self.empty_label.pack_forget()
         
         # Update summary
         self.update_summary()
     
     def create_cart_item(self, item):
-        """Create compact cart item widget"""
+        """Create compact cart item widget (packed by update_cart_display)"""
         item_frame = ctk.CTkFrame(self.cart_frame, fg_color=COLORS["card_bg"], corner_radius=6)
-        item_frame.pack(fill="x", padx=5, pady=3)
+        # Buttons act on row['item'], so the row can be reused for an identical item
+        row = {'frame': item_frame, 'item': item, 'key': self.row_key(item)}
         
         # Layout: Horizontal Container
         content_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
@@ -296,39 +398,36 @@ class ShoppingCart:
             ctk.CTkButton(
                 btns_row, text="✎", width=24, height=24,
                 font=ctk.CTkFont(size=14), fg_color=COLORS["warning"], hover_color="#f39c12",
-                command=lambda i=item: self.edit_callback(i)
+                command=lambda r=row: self.edit_callback(r['item'])
             ).pack(side="left", padx=2)
             
         ctk.CTkButton(
             btns_row, text="×", width=24, height=24,
             font=ctk.CTkFont(size=16, weight="bold"), fg_color=COLORS["danger"], hover_color="#c0392b",
-            command=lambda i=item: self.remove_item(i)
+            command=lambda r=row: self.remove_item(r['item'])
         ).pack(side="left", padx=0)
         
+        return row
 
     
     def increase_quantity(self, item):
         """Increase item quantity"""
         product = self.database.get_product_by_id(item['product_id'])
         if item['quantity'] < product[4]:
-            item['quantity'] += 1
-            item['subtotal'] = item['quantity'] * item['price']
-            self.update_cart_display()
+            self.set_quantity(item, item['quantity'] + 1)
         else:
             messagebox.showwarning("Stock Limit", "Not enough stock available")
     
     def decrease_quantity(self, item):
         """Decrease item quantity"""
         if item['quantity'] > 1:
-            item['quantity'] -= 1
-            item['subtotal'] = item['quantity'] * item['price']
-            self.update_cart_display()
+            self.set_quantity(item, item['quantity'] - 1)
     
     def replace_item(self, old_item, new_item):
         """Replace an existing item with a modified one"""
-        if old_item in self.cart_items:
-            idx = self.cart_items.index(old_item)
-            self.cart_items[idx] = new_item
+        idx = self.index_of(old_item)
+        if idx is not None:
+            self.orders.replace_item(idx, new_item)
             self.update_cart_display()
 
     def update_summary(self):
@@ -347,6 +446,7 @@ class ShoppingCart:
     def set_order_type(self, order_type):
         """Set the order type and update button states"""
         self.order_type = order_type
+        self.orders.set_order_type(order_type)
         
         # Update button colors to show selection
         if order_type == "Regular":
@@ -365,4 +465,69 @@ class ShoppingCart:
     def get_order_type(self):
         """Get the current order type"""
         return self.order_type
-
+    
+    def show_active_order(self):
+        """Point the cart at the active order and refresh header, order list and rows"""
+        order = self.orders.active
+        self.cart_items = order.items
+        self.cart_header.configure(text=f"🛍️ {order.name}")
+        names = self.orders.names()
+        if list(self.order_menu.cget("values")) != names:
+            self.order_menu.configure(values=names)
+        self.order_menu.set(order.name)
+        self.set_order_type(order.order_type)
+        self.update_cart_display()
+    
+    def switch_order(self, name):
+        """Switch to another open order"""
+        if name != self.orders.active.name:
+            self.orders.switch(name)
+            self.show_active_order()
+    
+    def ask_order_name(self, title, text):
+        dialog = ctk.CTkInputDialog(text=text, title=title)
+        return dialog.get_input()
+    
+    def park_order(self):
+        """Keep the current order open and start a new one (named after a table or customer)"""
+        name = self.ask_order_name("New Order", f"Table or customer name (empty for {self.orders.next_name()}):")
+        if name is None:
+            return
+        self.orders.park(name)
+        self.show_active_order()
+    
+    def rename_order(self):
+        name = self.ask_order_name("Rename Order", f"New name for {self.orders.active.name}:")
+        if name and name.strip():
+            self.orders.rename(self.orders.active, name)
+            self.show_active_order()
+    
+    def complete_order(self):
+        """The active order was checked out: close it and continue with the next open order"""
+        self.orders.close_active()
+        self.show_active_order()
+    
+    def open_orders(self, data_dir):
+        """Open the first set of order files no other cashier window is using"""
+        orders_name, orders_ext = os.path.splitext(PARKED_ORDERS_FILE)
+        journal_name, journal_ext = os.path.splitext(CART_JOURNAL_FILE)
+        for n in range(1, MAX_ORDER_FILE_SETS + 1):
+            suffix = f".{n}" if n > 1 else ""
+            orders_path = os.path.join(data_dir, f"{orders_name}{suffix}{orders_ext}")
+            lock = FileLock(orders_path + ".lock")
+            if lock.acquire():
+                self.orders_lock = lock
+                break
+        else:
+            print("Open orders: all order files are in use, sharing the first set")
+            orders_path, suffix = os.path.join(data_dir, PARKED_ORDERS_FILE), ""
+        journal_path = os.path.join(data_dir, f"{journal_name}{suffix}{journal_ext}")
+        return OrderBook(orders_path, CartJournal(journal_path))
+    
+    def save_orders(self):
+        """Write the open orders snapshot and close the journal (e.g. on logout)"""
+        self.orders.close()
+        if self.orders_lock is not None:
+            # The lock file stays, so a window opening right now cannot end up sharing the set
+            self.orders_lock.release(remove=False)
+            self.orders_lock = None
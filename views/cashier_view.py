@@ -10,7 +10,12 @@ from config import COLORS
 from views.cashier.product_grid import ProductGrid
 from views.cashier.shopping_cart import ShoppingCart
 from views.cashier.variant_selector import VariantSelector
-from views.cashier.payment_dialog import PaymentDialog
+from views.debounce import Debouncer
+from product_index import NAME, CATEGORY
+
+# Imported on first checkout (pulls in PIL via the receipt renderer);
+# main.py pre-warms these in the background after login
+PREWARM_MODULES = ("views.cashier.payment_dialog",)
 
 
 class CashierView(ctk.CTkFrame):
@@ -23,8 +28,28 @@ class CashierView(ctk.CTkFrame):
         # Initialize components
         self.product_grid = None
         self.shopping_cart = None
+        self.variant_selector = None
+        
+        # Preload add-ons and alternative prices so the customization dialog opens without queries
+        self.database.get_modifier_catalog(reload=True)
         
         self.setup_ui()
+        
+        # Keep open orders (including the current cart) across logout and exit
+        self.bind("<Destroy>", self.on_destroy)
+        
+        # Build the customization dialog (hidden) once the view is up, so the first tap is fast too
+        self.after(500, lambda: self.get_variant_selector().prepare(self.database.get_modifier_catalog().global_modifiers))
+    
+    def get_variant_selector(self):
+        """The customization dialog, built once and reused for every product"""
+        if self.variant_selector is None:
+            self.variant_selector = VariantSelector(self)
+        return self.variant_selector
+    
+    def on_destroy(self, event):
+        if event.widget is self and self.shopping_cart is not None:
+            self.shopping_cart.save_orders()
     
     def setup_ui(self):
         """Setup the cashier POS interface"""
@@ -113,80 +138,26 @@ class CashierView(ctk.CTkFrame):
     
     def add_to_cart(self, product):
         """Add product to cart with customization and quantity dialog"""
-        # Check stock/availability first
-        # Indices: use_stock_tracking=12, is_available=13
-        use_stock = product[12] if len(product) > 12 and product[12] is not None else 1
-        is_avail = product[13] if len(product) > 13 and product[13] is not None else 1
-        
-        can_add = False
-        if use_stock == 0:
-            can_add = (is_avail == 1)
-        else:
-            can_add = (product[4] > 0)
-            
-        if not can_add:
-            msg = "This product is currently unavailable" if use_stock == 0 else "This product is out of stock"
-            messagebox.showwarning("Unavailable", msg)
-            return
-
+        # Check stock/availability (own stock and ingredient recipe) in the sellability index
         product_id = product[0]
+        sellability = self.database.get_sellability_index()
+        if not sellability.can_sell(product_id):
+            messagebox.showwarning("Unavailable", sellability.reason(product_id) or "This product is out of stock")
+            return
         
-        # --- NEW: Check Linked Ingredients Stock (Composite Inventory) ---
-        try:
-            # Check if this product has linked ingredients
-            if hasattr(self.database, 'get_product_ingredients'):
-                ingredients = self.database.get_product_ingredients(product_id)
-                if ingredients:
-                    for ing in ingredients:
-                        # ing: [link_id, ingredient_id, ingredient_name, qty_per_product, price, cost]
-                        ing_id = ing[1]
-                        qty_needed = ing[3]
-                        
-                        # Get current stock of the ingredient
-                        # We use direct cursor execution to be safe and accurate
-                        self.database.cursor.execute("SELECT name, stock FROM products WHERE id=?", (ing_id,))
-                        ing_result = self.database.cursor.fetchone()
-                        
-                        if ing_result:
-                            ing_real_name = ing_result[0]
-                            ing_current_stock = ing_result[1]
-                            
-                            # Check 1: Is ingredient completely out of stock?
-                            if ing_current_stock <= 0:
-                                messagebox.showwarning(
-                                    "Unavailable", 
-                                    f"Cannot sell {product[1]}.\n\nReason: Ingredient '{ing_real_name}' is Out of Stock!"
-                                )
-                                return
-                                
-                            # Check 2: Is there enough ingredient stock for at least ONE unit of this product?
-                            if ing_current_stock < qty_needed:
-                                messagebox.showwarning(
-                                    "Unavailable", 
-                                    f"Cannot sell {product[1]}.\n\nReason: Not enough '{ing_real_name}'.\n(Need {qty_needed}, Have {ing_current_stock})"
-                                )
-                                return
-        except Exception as e:
-            print(f"Ingredient stock check error: {e}")
-        # -----------------------------------------------------------------
-        
-        # Get global modifiers (Add-ons)
-        global_modifiers = self.database.get_all_global_modifiers()
-        
-        # Get alternative prices
-        prices = self.database.get_product_prices(product_id)
+        # Global modifiers (Add-ons) and alternative prices from the preloaded catalog
+        catalog = self.database.get_modifier_catalog()
+        global_modifiers = catalog.global_modifiers
+        prices = catalog.prices_for(product_id)
         
         # Show details/quantity dialog
         # Pass global_modifiers instead of product-specific lists
-        selector = VariantSelector(
-            self,
+        self.get_variant_selector().open(
             product,
-            [], # Variants deprecated
             global_modifiers,
             self.add_customized_item_to_cart,
             prices
         )
-        selector.show()
     
     def add_simple_product_to_cart(self, product):
         """Add simple product to cart"""
@@ -219,9 +190,7 @@ class CashierView(ctk.CTkFrame):
                         can_increment = False
                 
                 if can_increment:
-                    item['quantity'] += 1
-                    item['subtotal'] = item['quantity'] * item['price']
-                    self.shopping_cart.update_cart_display()
+                    self.shopping_cart.set_quantity(item, item['quantity'] + 1)
                     return
                 else:
                     messagebox.showwarning("Stock Limit", "Not enough stock available")
@@ -253,21 +222,19 @@ class CashierView(ctk.CTkFrame):
             messagebox.showerror("Error", "Product not found")
             return
 
-        # Fetch dependencies
-        global_modifiers = self.database.get_all_global_modifiers()
-        prices = self.database.get_product_prices(product_id)
+        # Fetch dependencies (preloaded catalog, no database round trip)
+        catalog = self.database.get_modifier_catalog()
+        global_modifiers = catalog.global_modifiers
+        prices = catalog.prices_for(product_id)
         
         # Open Selector with Initial State
-        selector = VariantSelector(
-            self,
+        self.get_variant_selector().open(
             product,
-            [], # Variants deprecated
             global_modifiers,
             lambda new_item: self.shopping_cart.replace_item(item, new_item),
             prices,
             initial_state=item
         )
-        selector.show()
     
     def clear_cart(self):
         """Clear all items from cart"""
@@ -292,6 +259,7 @@ class CashierView(ctk.CTkFrame):
         order_type = self.shopping_cart.get_order_type()
         
         # Show payment dialog
+        from views.cashier.payment_dialog import PaymentDialog
         payment = PaymentDialog(
             self,
             self.database,
@@ -302,13 +270,15 @@ class CashierView(ctk.CTkFrame):
             tax,
             order_type  # Pass order type
         )
-        payment.show(self.on_checkout_success)
+        payment.show(self.on_checkout_success, self.on_order_paid)
     
     
+    def on_order_paid(self):
+        """The sale is saved: close the paid order (continues with the next open order, if any)"""
+        self.shopping_cart.complete_order()
+    
     def on_checkout_success(self):
         """Handle successful checkout"""
-        # Clear cart
-        self.shopping_cart.clear_cart()
         # Reload products (to update stock display)
         self.product_grid.load_products()
     
@@ -316,7 +286,6 @@ class CashierView(ctk.CTkFrame):
     def show_items(self):
         """Show all items with stock levels and real-time search - OPTIMIZED"""
         from config import CURRENCY_SYMBOL
-        from datetime import datetime
         
         # Refresh product grid to show latest data
         self.product_grid.load_products()
@@ -413,15 +382,8 @@ class CashierView(ctk.CTkFrame):
         )
         list_frame.pack(fill="both", expand=True, padx=0, pady=0)
         
-        # Cache products for this dialog session
-        if not hasattr(self, '_cashier_products_cache') or not hasattr(self, '_cashier_products_cache_time'):
-            self._cashier_products_cache = self.database.get_all_products()
-            self._cashier_products_cache_time = datetime.now()
-        else:
-            # Refresh cache if older than 30 seconds
-            if (datetime.now() - self._cashier_products_cache_time).seconds > 30:
-                self._cashier_products_cache = self.database.get_all_products()
-                self._cashier_products_cache_time = datetime.now()
+        # Shared in-memory product index for this dialog session (no DB hits while typing)
+        product_index = self.database.get_product_index()
         
         def display_products(search_term=""):
             """Display products filtered by search term and tab - WITH LAZY LOADING"""
@@ -429,29 +391,16 @@ class CashierView(ctk.CTkFrame):
             for widget in list_frame.winfo_children():
                 widget.destroy()
             
-            # Use cached products
-            all_products = self._cashier_products_cache
-            
-            filtered_products = []
-            
-            search_lower = search_term.lower() if search_term else ""
             target_stock_mode = 1 if current_tab[0] == "stock" else 0
             
-            for p in all_products:
-                # Filter by Tab
-                # Indices: use_stock_tracking=12
+            # Filter by Tab
+            # Indices: use_stock_tracking=12
+            def in_tab(p):
                 use_stock = p[12] if len(p) > 12 and p[12] is not None else 1
-                if use_stock != target_stock_mode:
-                    continue
-                    
-                # Filter by Search
-                if search_lower:
-                    name_match = search_lower in p[1].lower()
-                    cat_match = (p[2] and search_lower in p[2].lower())
-                    if not (name_match or cat_match):
-                        continue
-                        
-                filtered_products.append(p)
+                return use_stock == target_stock_mode
+            
+            # Filter by Search (name or category)
+            filtered_products = product_index.search(search_term, fields=(NAME, CATEGORY), predicate=in_tab)
             
             # Display products with LAZY LOADING
             if filtered_products:
@@ -547,10 +496,11 @@ class CashierView(ctk.CTkFrame):
                 load_more_btn.pack(pady=10, padx=15, fill="x")
                 dialog._load_more_btn = load_more_btn
         
-        def on_search(*args):
+        def on_search():
             display_products(search_entry.get())
         
-        search_entry.bind("<KeyRelease>", on_search)
+        search_debouncer = Debouncer(dialog, 150, on_search)
+        search_entry.bind("<KeyRelease>", search_debouncer.trigger)
         
         # Initial display
         display_products()
@@ -0,0 +1,39 @@
+"""
+Input debouncing helper for views
+"""
+
+
+class Debouncer:
+    """
+    Delays a callback until input has been idle for `delay` milliseconds.
+    Each trigger() cancels the pending call, so fast typing runs it once.
+    """
+
+    def __init__(self, widget, delay, callback):
+        self.widget = widget
+        self.delay = delay
+        self.callback = callback
+        self._after_id = None
+
+    def trigger(self, *args):
+        """Schedule the callback (extra args from Tk traces/bindings are ignored)"""
+        self.cancel()
+        self._after_id = self.widget.after(self.delay, self._fire)
+
+    def cancel(self):
+        """Cancel the pending call, if any"""
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _fire(self):
+        self._after_id = None
+        try:
+            if not self.widget.winfo_exists():
+                return
+        except Exception:
+            return
+        self.callback()